@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -37,10 +38,11 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',"auth_system","rest_framework",
-    'rest_framework_simplejwt',"warehouse",'inventory','corsheaders','tasks','loading','api'
+    'rest_framework_simplejwt',"warehouse",'inventory','corsheaders','tasks','loading','api','monitoring'
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,6 +82,11 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # SQLite ignores SELECT ... FOR UPDATE; BEGIN IMMEDIATE takes the write lock up front so
+        # concurrent postings queue on the busy timeout instead of failing to upgrade a read lock
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 20},
+        # A file rather than shared-cache memory, so threaded tests wait on locks like real workers
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -132,12 +139,50 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Stock posting: 'locking' takes row locks (SELECT ... FOR UPDATE in pk order) before
+# posting, 'conditional' relies only on guarded UPDATE statements.
+INVENTORY_POSTING_MODE = 'locking'
+
+# inventory/cache.py keeps a generation counter per item and location here. The default
+# LocMemCache holds only 300 entries, which would keep culling generations (and so every
+# entry stamped with them) on any real catalogue; size it with INVENTORY_CACHE_MAX_ENTRIES,
+# and use a shared cache such as Redis when running more than one process.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('INVENTORY_CACHE_MAX_ENTRIES', 200000))},
+    }
+}
+
+# Process-local LRU of scanned barcode/SKU answers (ScanLookupService)
+INVENTORY_SCAN_LOOKUP_CACHE_SIZE = 20000
+
+# Per-request query count, SQL/serializer time and latency, logged on 'monitoring.requests'
+# and served at /monitoring/requests/. Off by default; see monitoring/middleware.py.
+REQUEST_PROFILING = False
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'monitoring': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    'PAGE_SIZE': 50,
 }
 
+# PAGE_SIZE sizes the PageNumberPagination that list views set explicitly; no default
+# pagination class is wanted, which is what DRF's W001 check warns about
+SILENCED_SYSTEM_CHECKS = ['rest_framework.W001']
+
 
 
 # JWT Configuration
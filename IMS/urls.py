@@ -25,4 +25,5 @@ urlpatterns = [
     path('tasks/', include('tasks.urls')),
     path('loading/', include('loading.urls')),
     path('api/', include('api.urls')),
+    path('monitoring/', include('monitoring.urls')),
 ]
@@ -11,6 +11,13 @@ class ItemAdmin(admin.ModelAdmin):
     search_fields = ('name',)
     list_filter = ('is_active',)
 
+@admin.register(ItemCode)
+class ItemCodeAdmin(admin.ModelAdmin):
+    list_display = ('id', 'code', 'code_type', 'item', 'pack_quantity', 'supplier', 'primary')
+    search_fields = ('code', 'item__name')
+    list_filter = ('code_type', 'primary')
+    raw_id_fields = ('item', 'supplier')
+
 # @admin.register(Inward)
 # class InwardAdmin(admin.ModelAdmin):
 #     list_display = ('id','item', 'location', 'quantity', 'received_by', 'date', 'created_at', 'updated_at')
@@ -35,23 +42,33 @@ class ItemAdmin(admin.ModelAdmin):
 #     search_fields = ('item__name', 'location__name', 'dispatched_by__username')
 #     list_filter = ('location', 'dispatched_by')
 
-# @admin.register(InventoryLog)
-# class InventoryLogAdmin(admin.ModelAdmin):
-#     list_display = [
-#         'id',
-#         'item',
-#         'location',
-#         'action_type',
-#         'quantity_before',
-#         'quantity_changed',
-#         'quantity_after',
-#         'reference_type',
-#         'reference_id',
-#         'changed_by',
-#         'timestamp'
-#     ]
-#     list_filter = ['action_type', 'item', 'location', 'timestamp']
-#     search_fields = ['item__name', 'location__code', 'reference_type', 'remarks']
+@admin.register(InventoryLog)
+class InventoryLogAdmin(admin.ModelAdmin):
+    list_display = [
+        'id',
+        'item',
+        'location',
+        'action',
+        'quantity_before',
+        'quantity_changed',
+        'quantity_after',
+        'reference_type',
+        'reference_id',
+        'changed_by',
+        'timestamp'
+    ]
+    list_filter = ['action', 'timestamp']
+    search_fields = ['item__name', 'location__code', 'reference_type', 'remarks']
+
+    # The ledger is append-only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Inventory)
@@ -94,11 +111,12 @@ class QualityStatusAdmin(admin.ModelAdmin):
 #     search_fields = ('item__name', 'location__code')
 #     list_filter = ('is_defective', 'return_date')
 
-# @admin.register(CycleCount)
-# class CycleCountAdmin(admin.ModelAdmin):
-#     list_display = ('id', 'item', 'location', 'system_quantity', 'counted_quantity', 'discrepancy', 'count_date')
-#     search_fields = ('item__name', 'location__code')
-#     list_filter = ('count_date',)
+@admin.register(CycleCount)
+class CycleCountAdmin(admin.ModelAdmin):
+    list_display = ('id', 'reference', 'item', 'location', 'system_quantity', 'counted_quantity', 'discrepancy', 'count_date')
+    search_fields = ('reference', 'item__name', 'item__sku', 'location__code')
+    list_filter = ('count_date',)
+    raw_id_fields = ('item', 'location', 'batch', 'lot', 'adjustment')
 
 
 @admin.register(Supplier)
@@ -166,3 +184,25 @@ class InventoryTransactionAdmin(admin.ModelAdmin):
     list_filter = ('process_type', 'created_at', 'deleted')
     search_fields = ('item__name', 'reference_number', 'remarks')
     readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(InventorySnapshot)
+class InventorySnapshotAdmin(admin.ModelAdmin):
+    list_display = ['snapshot_date', 'item', 'location', 'quantity', 'average_rate', 'value']
+    list_filter = ['snapshot_date']
+    search_fields = ['item__name', 'location__code']
+
+
+@admin.register(InventorySummary)
+class InventorySummaryAdmin(admin.ModelAdmin):
+    list_display = ['item', 'location', 'total_quantity', 'reserved_quantity', 'updated_at']
+    search_fields = ['item__name', 'location__code']
+    readonly_fields = ['item', 'location', 'total_quantity', 'reserved_quantity', 'updated_at']
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['id', 'item', 'location', 'sales_order', 'quantity', 'consumed_quantity', 'status', 'expires_at']
+    list_filter = ['status', 'expires_at']
+    search_fields = ['item__name', 'location__code']
+    readonly_fields = ['inventory', 'quantity', 'consumed_quantity', 'status', 'created_by', 'created_at']
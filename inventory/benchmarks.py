@@ -0,0 +1,241 @@
+"""
+Benchmarks for the inventory write and read paths, run by `manage.py run_benchmarks`.
+
+Written in the pytest-benchmark style: each `bench_*` function receives a `benchmark`
+runner and the seeded Dataset, prepares its inputs and hands one operation to
+`benchmark(...)`, which runs it for the configured number of rounds and records timing
+and query statistics. Results are written as JSON shaped like pytest-benchmark's, so two
+runs can be compared with `run_benchmarks --compare`.
+
+This is a command-only harness: pytest-benchmark is not a dependency and neither pytest nor
+`manage.py test` collects these functions. The test suite only runs them once on a small
+dataset to check that they still work.
+"""
+import statistics
+from time import perf_counter
+
+from django.db import connection
+from rest_framework.test import APIClient
+
+from monitoring.profiling import RequestProfile
+
+from .services import InventoryTransactionService, ScanLookupService
+
+BENCHMARKS = []
+BULK_LINES = 50
+
+
+def register(group):
+    def decorator(func):
+        BENCHMARKS.append((group, func.__name__[len('bench_'):], func))
+        return func
+    return decorator
+
+
+class Benchmark:
+    """Times one operation over `rounds` runs after `warmup` untimed runs"""
+
+    def __init__(self, rounds=100, warmup=5):
+        self.rounds = rounds
+        self.warmup = warmup
+        self.stats = None
+        self.extra_info = {}
+
+    def __call__(self, func, *args, **kwargs):
+        for _ in range(self.warmup):
+            func(*args, **kwargs)
+
+        timings = []
+        profile = RequestProfile()
+        with connection.execute_wrapper(profile.record_query):
+            for _ in range(self.rounds):
+                started = perf_counter()
+                result = func(*args, **kwargs)
+                timings.append(perf_counter() - started)
+
+        mean = statistics.fmean(timings)
+        self.stats = {
+            'min': min(timings),
+            'max': max(timings),
+            'mean': mean,
+            'stddev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+            'median': statistics.median(timings),
+            'p95': sorted(timings)[min(len(timings) - 1, int(0.95 * len(timings)))],
+            'rounds': self.rounds,
+            'ops': 1 / mean if mean else 0.0,
+            'queries': profile.queries / self.rounds,
+        }
+        return result
+
+
+def _check(result):
+    if not result.success:
+        raise RuntimeError(f"Posting failed: {result.errors or result.message}")
+
+
+def _client(data):
+    client = APIClient()
+    client.force_authenticate(data.user)
+    return client
+
+
+def _get(client, path):
+    response = client.get(path)
+    if response.status_code != 200:
+        raise RuntimeError(f"GET {path} returned {response.status_code}")
+    return response
+
+
+# ------------------- WRITE PATH ------------------- #
+@register('posting')
+def bench_inward(benchmark, data, random):
+    service = InventoryTransactionService(data.user)
+
+    def post():
+        _check(service.create_transaction({
+            'process_type': 'INWARD',
+            'item': random.choice(data.items),
+            'location': random.choice(data.locations),
+            'quantity': random.randint(1, 10),
+        }))
+    benchmark(post)
+
+
+@register('posting')
+def bench_outward(benchmark, data, random):
+    service = InventoryTransactionService(data.user)
+
+    def post():
+        item, location = random.choice(data.stock)
+        _check(service.create_transaction({
+            'process_type': 'OUTWARD', 'item': item, 'location': location, 'quantity': 1,
+        }))
+    benchmark(post)
+
+
+@register('posting')
+def bench_transfer(benchmark, data, random):
+    service = InventoryTransactionService(data.user)
+
+    def post():
+        item, source = random.choice(data.stock)
+        target = random.choice([location for location in data.locations[:10] if location != source])
+        _check(service.create_transaction({
+            'process_type': 'TRANSFER', 'item': item, 'from_location': source, 'to_location': target,
+            'quantity': 1,
+        }))
+    benchmark(post)
+
+
+@register('posting')
+def bench_bulk_inward(benchmark, data, random):
+    service = InventoryTransactionService(data.user)
+
+    def post():
+        result = service.create_transactions_bulk([
+            {
+                'process_type': 'INWARD',
+                'item': random.choice(data.items).pk,
+                'location': random.choice(data.locations).pk,
+                'quantity': random.randint(1, 10),
+            }
+            for _ in range(BULK_LINES)
+        ])
+        if result.posted != BULK_LINES:
+            raise RuntimeError(f"Bulk posting failed: {result.message}")
+    benchmark(post)
+    benchmark.extra_info['lines_per_round'] = BULK_LINES
+    benchmark.extra_info['lines_per_second'] = benchmark.stats['ops'] * BULK_LINES
+
+
+# ------------------- READ PATH ------------------- #
+@register('reads')
+def bench_inventory_list(benchmark, data, random):
+    client = _client(data)
+    pages = max(1, len(data.stock) // 50)
+    benchmark(lambda: _get(client, f"/inventory/inventory-list/?page={random.randint(1, pages)}"))
+
+
+@register('reads')
+def bench_stock_summary(benchmark, data, random):
+    client = _client(data)
+    benchmark(lambda: _get(client, f"/inventory/stock-summary/?location={random.choice(data.locations).pk}"))
+
+
+@register('reads')
+def bench_warehouse_storage(benchmark, data, random):
+    client = _client(data)
+    benchmark(lambda: _get(client, "/warehouse/warehouse-storage/"))
+
+
+@register('reads')
+def bench_warehouse_storage_by_location(benchmark, data, random):
+    client = _client(data)
+    warehouses = [warehouse.pk for warehouse in data.warehouses]
+    benchmark(lambda: _get(client, f"/warehouse/warehouse-storage/by-location/?warehouse={random.choice(warehouses)}"))
+
+
+@register('reads')
+def bench_barcode_lookup(benchmark, data, random):
+    client = _client(data)
+    benchmark(lambda: _get(client, f"/inventory/barcode-search/?barcode={random.choice(data.items).barcode}"))
+
+
+# ------------------- SCANNING ------------------- #
+SCAN_BATCH = 20
+
+
+def _warm_scan_cache(data):
+    # Pickers rescan a working set, so steady state is every code cached
+    codes = [item.barcode for item in data.items]
+    for start in range(0, len(codes), ScanLookupService.MAX_CODES):
+        ScanLookupService.lookup(codes[start:start + ScanLookupService.MAX_CODES])
+
+
+@register('scan')
+def bench_scan_lookup(benchmark, data, random):
+    client = _client(data)
+    _warm_scan_cache(data)
+    benchmark(lambda: _get(client, f"/inventory/scan/?code={random.choice(data.items).barcode}"))
+
+
+@register('scan')
+def bench_scan_batch(benchmark, data, random):
+    client = _client(data)
+    _warm_scan_cache(data)
+
+    def scan():
+        codes = "&".join(f"code={item.barcode}" for item in random.sample(data.items, SCAN_BATCH))
+        _get(client, f"/inventory/scan/?{codes}")
+    benchmark(scan)
+    benchmark.extra_info['codes_per_round'] = SCAN_BATCH
+
+
+@register('scan')
+def bench_scan_service(benchmark, data, random):
+    _warm_scan_cache(data)
+    benchmark(lambda: ScanLookupService.lookup([random.choice(data.items).barcode]))
+
+
+@register('scan')
+def bench_code_search(benchmark, data, random):
+    client = _client(data)
+    # Typeahead after the first few characters of a barcode
+    benchmark(lambda: _get(client, f"/inventory/item-codes/search/?q={random.choice(data.items).barcode[:-3]}"))
+
+
+def run(data, random, rounds=100, warmup=5, only=None):
+    """Run the registered benchmarks (those whose group or name is in `only`, if given) in order"""
+    results = []
+    for group, name, func in BENCHMARKS:
+        if only and group not in only and name not in only:
+            continue
+        benchmark = Benchmark(rounds=rounds, warmup=warmup)
+        func(benchmark, data, random)
+        results.append({
+            'group': group,
+            'name': name,
+            'stats': benchmark.stats,
+            'extra_info': benchmark.extra_info,
+        })
+    return results
@@ -0,0 +1,92 @@
+"""
+Generation-stamped caching for inventory reads.
+
+Every cached value is stored under a key that embeds the current generation of each item
+and location it depends on. Writes never delete keys; they bump the relevant generations
+so the next read derives a new key and misses, and the old entries simply age out. Stock
+postings bump their items and locations on commit, and Item/Location saves bump their own
+generation (see signals.py), so cached reads can use long TTLs without serving stale data.
+
+Generations live in the configured Django cache, so processes only see each other's bumps
+when that cache is shared (Redis/Memcached); the default LocMemCache is per process.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+KEY_PREFIX = "inventory"
+
+ITEM = "item"
+LOCATION = "location"
+PROCESS_TYPES = "process_types"
+
+DEFAULT_TIMEOUT = 3600
+
+
+def _generation_key(scope, object_id=None):
+    return f"{KEY_PREFIX}:gen:{scope}:{object_id}" if object_id is not None else f"{KEY_PREFIX}:gen:{scope}"
+
+
+def _fresh_generation():
+    # Seed from the clock so a counter evicted from the cache never restarts at a value
+    # whose keys may still be cached
+    return time.time_ns()
+
+
+def generations(scope, object_ids):
+    """Current generation of each object id in `scope`, seeding any that are missing"""
+    keys = {object_id: _generation_key(scope, object_id) for object_id in object_ids}
+    found = cache.get_many(list(keys.values()))
+    result = {}
+    for object_id, key in keys.items():
+        if key not in found:
+            cache.add(key, _fresh_generation(), None)
+            found[key] = cache.get(key)
+        result[object_id] = found[key]
+    return result
+
+
+def bump(scope, object_ids=(None,)):
+    """Invalidate everything cached against these objects"""
+    keys = [_generation_key(scope, object_id) for object_id in set(object_ids)]
+    # A missing generation has nothing cached against it that the next, freshly seeded
+    # generation could match, so only the generations in use need incrementing
+    for key in cache.get_many(keys):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_generation(), None)
+
+
+def bump_on_commit(items=(), locations=()):
+    """Bump item and location generations once the current transaction commits"""
+    items = {item_id for item_id in items if item_id}
+    locations = {location_id for location_id in locations if location_id}
+    if not items and not locations:
+        return
+
+    def _bump():
+        if items:
+            bump(ITEM, items)
+        if locations:
+            bump(LOCATION, locations)
+    transaction.on_commit(_bump)
+
+
+def make_key(name, *parts, items=(), locations=(), scopes=()):
+    """Cache key for `name` and `parts`, stamped with the generations it depends on"""
+    stamps = [f"{scope}.{generations(scope, [None])[None]}" for scope in scopes]
+    stamps += [f"i{item_id}.{gen}" for item_id, gen in sorted(generations(ITEM, items).items())]
+    stamps += [f"l{location_id}.{gen}" for location_id, gen in sorted(generations(LOCATION, locations).items())]
+    return ":".join([KEY_PREFIX, name, *[str(part) for part in parts], *stamps])
+
+
+def get_or_set(name, builder, *parts, items=(), locations=(), scopes=(), timeout=DEFAULT_TIMEOUT):
+    """Return the cached value for the stamped key, computing and storing it on a miss"""
+    key = make_key(name, *parts, items=items, locations=locations, scopes=scopes)
+    value = cache.get(key)
+    if value is None:
+        value = builder()
+        cache.set(key, value, timeout)
+    return value
@@ -0,0 +1,572 @@
+"""
+Synthetic inventory data for benchmarks and load tests.
+
+Everything is drawn from random.Random(seed), so the same seed, sizes and end date produce
+the same dataset, and every generated name carries the generator's tag so it cannot collide
+with real rows. Rows are written with bulk_create in chunks of `chunk_size`.
+
+Transaction history is generated in time order against running balances held in memory,
+so it never oversells, and the Inventory rows, InventorySummary and (optionally) the
+InventoryLog ledger written alongside it agree with the transactions exactly. Item velocity
+follows a Pareto distribution: a few SKUs account for most of the movements. Generation
+assigns transaction and inventory ids itself, so nothing else should write those tables
+while it runs.
+"""
+import itertools
+import random
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+
+from tasks.models import TaskType
+from warehouse.models import Location, Warehouse
+
+from . import cache as inventory_cache
+from .models import (
+    Customer, Inventory, InventoryLog, InventoryProcessType, InventorySummary, InventoryTransaction, Item, ItemBatch,
+    ItemCategory, ItemCode, ItemLot, PurchaseOrder, PurchaseOrderItem, SalesOrder, SalesOrderItem, Supplier,
+)
+from .services import InventorySummaryService
+
+PROCESS_TYPES = ['INWARD', 'OUTWARD', 'TRANSFER', 'ADJUSTMENT', 'RETURN']
+TASK_TYPES = ['PUTAWAY', 'PICKUP', 'TRANSFER']
+
+# Share of generated transactions per process type; an outward or transfer drawn for an
+# item with nothing on hand is written as an inward instead
+PROCESS_MIX = {'INWARD': 0.40, 'OUTWARD': 0.45, 'TRANSFER': 0.10, 'ADJUSTMENT': 0.03, 'RETURN': 0.02}
+# Chance that an inward starts a new batch for its item, and number of batches per lot
+NEW_BATCH_RATE = 0.1
+BATCHES_PER_LOT = 5
+DEFECTIVE_RETURN_RATE = 0.1
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the auto_now / auto_now_add values already set on instances"""
+    fields = [
+        model_field for model in models for model_field in model._meta.concrete_fields
+        if getattr(model_field, 'auto_now', False) or getattr(model_field, 'auto_now_add', False)
+    ]
+    saved = [(model_field, model_field.auto_now, model_field.auto_now_add) for model_field in fields]
+    for model_field in fields:
+        model_field.auto_now = model_field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for model_field, auto_now, auto_now_add in saved:
+            model_field.auto_now, model_field.auto_now_add = auto_now, auto_now_add
+
+
+@dataclass
+class Dataset:
+    user: Any
+    warehouses: List[Warehouse] = field(default_factory=list)
+    locations: List[Location] = field(default_factory=list)
+    items: List[Item] = field(default_factory=list)
+    # (item, location) of every seeded inventory row
+    stock: List[Tuple[Item, Location]] = field(default_factory=list)
+
+
+class DataGenerator:
+    CHUNK_SIZE = 5000
+
+    def __init__(self, seed: int = 0, tag: Optional[str] = None, chunk_size: Optional[int] = None):
+        self.random = random.Random(seed)
+        self.tag = tag or f"SYN{seed}"
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+
+    def _bulk(self, model, objects):
+        return model.objects.bulk_create(objects, batch_size=self.chunk_size)
+
+    def _insert(self, model, fields, rows) -> None:
+        """INSERT rows of already database-ready values for `fields`, through executemany"""
+        quote = connection.ops.quote_name
+        sql = "INSERT INTO %s (%s) VALUES (%s)" % (
+            quote(model._meta.db_table),
+            ", ".join(quote(model._meta.get_field(name).column) for name in fields),
+            ", ".join(["%s"] * len(fields)),
+        )
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), self.chunk_size):
+                cursor.executemany(sql, rows[start:start + self.chunk_size])
+
+    @staticmethod
+    def reset_sequences(*models) -> None:
+        """Move primary key sequences past ids that were assigned explicitly"""
+        with connection.cursor() as cursor:
+            for statement in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(statement)
+
+    def reference_data(self) -> None:
+        """Process and task types the posting path needs"""
+        for code in PROCESS_TYPES:
+            InventoryProcessType.objects.get_or_create(code=code, defaults={'name': code.title()})
+        for code in TASK_TYPES:
+            TaskType.objects.get_or_create(code=code, defaults={'name': code.title()})
+        inventory_cache.bump(inventory_cache.PROCESS_TYPES)
+
+    def user(self):
+        user, _ = get_user_model().objects.get_or_create(username=f"{self.tag.lower()}-generator")
+        return user
+
+    def warehouses(self, count: int, owner) -> List[Warehouse]:
+        return self._bulk(Warehouse, [
+            Warehouse(name=f"{self.tag} Warehouse {number}", address="-", owner=owner)
+            for number in range(1, count + 1)
+        ])
+
+    def locations(self, warehouses: List[Warehouse], count: int) -> List[Location]:
+        """`count` bins spread evenly over the warehouses"""
+        return self._bulk(Location, [
+            Location(warehouse=warehouses[number % len(warehouses)], code=f"{self.tag}-BIN{number:06d}")
+            for number in range(count)
+        ])
+
+    def categories(self, count: int) -> List[ItemCategory]:
+        return self._bulk(ItemCategory, [
+            ItemCategory(name=f"{self.tag} Category {number}") for number in range(1, count + 1)
+        ])
+
+    def items(self, count: int, categories: List[ItemCategory]) -> List[Item]:
+        items = self._bulk(Item, [
+            Item(
+                name=f"{self.tag} Item {number:07d}",
+                sku=f"{self.tag}-SKU{number:07d}",
+                barcode=f"{self.tag}{number:010d}",
+                unit='pcs',
+                category=self.random.choice(categories) if categories else None,
+                reorder_point=self.random.randint(0, 50),
+            )
+            for number in range(count)
+        ])
+        self._bulk(ItemCode, [
+            ItemCode(item=item, code=code, code_type=code_type, primary=True)
+            for item in items for code, code_type in ((item.barcode, ItemCode.BARCODE), (item.sku, ItemCode.SKU))
+        ])
+        inventory_cache.bump(inventory_cache.ITEM, [item.pk for item in items])
+        return items
+
+    def item_codes(self, items: List[Item], suppliers: List[Supplier], gtin_rate: float = 0.3,
+                   part_rate: float = 0.5) -> int:
+        """Case GTINs for a share of the items and supplier part numbers for another; returns the count"""
+        codes = []
+        for number, item in enumerate(items):
+            if self.random.random() < gtin_rate:
+                codes.append(ItemCode(item=item, code=f"{self.tag}C{number:010d}", code_type=ItemCode.GTIN,
+                                      pack_quantity=self.random.choice([6, 12, 24])))
+            if suppliers and self.random.random() < part_rate:
+                codes.append(ItemCode(item=item, code=f"{self.tag}-P{number:08d}", code_type=ItemCode.SUPPLIER_PART,
+                                      supplier=self.random.choice(suppliers)))
+        self._bulk(ItemCode, codes)
+        return len(codes)
+
+    def stock(self, items: List[Item], locations: List[Location], rows: int, user,
+              quantity: Tuple[int, int] = (1000, 5000)) -> List[Tuple[Item, Location]]:
+        """
+        One un-batched inventory row, with its summary row, for each of `rows` distinct
+        (item, location) pairs
+        """
+        rows = min(rows, len(items) * len(locations))
+        pairs = [
+            (items[index // len(locations)], locations[index % len(locations)])
+            for index in sorted(self.random.sample(range(len(items) * len(locations)), rows))
+        ]
+        quantities = [float(self.random.randint(*quantity)) for _ in pairs]
+        self._bulk(Inventory, [
+            Inventory(item=item, location=location, quantity=on_hand, reserved_quantity=0, created_by=user)
+            for (item, location), on_hand in zip(pairs, quantities)
+        ])
+        self._bulk(InventorySummary, [
+            InventorySummary(item=item, location=location, total_quantity=on_hand, reserved_quantity=0)
+            for (item, location), on_hand in zip(pairs, quantities)
+        ])
+        inventory_cache.bump(inventory_cache.LOCATION, [location.pk for location in locations])
+        return pairs
+
+    def stock_dataset(self, items: int = 1000, locations: int = 100, warehouses: int = 2,
+                      stock_rows: int = 5000, categories: int = 20) -> Dataset:
+        """Items, bins and stocked inventory rows, enough to drive postings and stock reads"""
+        self.reference_data()
+        user = self.user()
+        dataset = Dataset(user=user)
+        dataset.warehouses = self.warehouses(warehouses, user)
+        dataset.locations = self.locations(dataset.warehouses, locations)
+        dataset.items = self.items(items, self.categories(categories))
+        dataset.stock = self.stock(dataset.items, dataset.locations, stock_rows, user)
+        return dataset
+
+    # ------------------- WAREHOUSE HISTORY ------------------- #
+    def location_hierarchy(self, warehouses: List[Warehouse], zones: int, aisles: int, racks: int,
+                           bins: int) -> List[Location]:
+        """Zone / aisle / rack / bin locations in every warehouse, coded like Z01-A02-R03-B04"""
+        return self._bulk(Location, [
+            Location(
+                warehouse=warehouse,
+                code=f"Z{zone:02d}-A{aisle:02d}-R{rack:02d}-B{bin_number:02d}",
+                description=f"Zone {zone}, aisle {aisle}, rack {rack}, bin {bin_number}",
+            )
+            for warehouse in warehouses
+            for zone, aisle, rack, bin_number in itertools.product(
+                range(1, zones + 1), range(1, aisles + 1), range(1, racks + 1), range(1, bins + 1)
+            )
+        ])
+
+    def suppliers(self, count: int) -> List[Supplier]:
+        return self._bulk(Supplier, [
+            Supplier(
+                name=f"{self.tag} Supplier {number}",
+                payment_terms=self.random.choice(['Advance', 'Net 15', 'Net 30', 'Net 60']),
+                supplier_rating=self.random.randint(1, 5),
+            )
+            for number in range(1, count + 1)
+        ])
+
+    def customers(self, count: int) -> List[Customer]:
+        return self._bulk(Customer, [
+            Customer(name=f"{self.tag} Customer {number}", email=f"customer{number}@{self.tag.lower()}.example")
+            for number in range(1, count + 1)
+        ])
+
+    def velocity(self, count: int, alpha: float) -> List[float]:
+        """Cumulative Pareto weights, for drawing item indexes with random.choices(cum_weights=...)"""
+        return list(itertools.accumulate(self.random.paretovariate(alpha) for _ in range(count)))
+
+    def _moments(self, count: int, start: datetime, end: datetime) -> List[datetime]:
+        span = (end - start).total_seconds()
+        return sorted(start + timedelta(seconds=self.random.uniform(0, span)) for _ in range(count))
+
+    def purchase_orders(self, count: int, suppliers: List[Supplier], items: List[Item], velocity: List[float],
+                        prices: List[float], user, start: datetime, end: datetime) -> Dict[int, List[Tuple[int, int, int]]]:
+        """Orders of one to five lines; returns item index -> [(purchase order id, line id, supplier id)]"""
+        orders, lines = [], []
+        for number, moment in enumerate(self._moments(count, start, end), start=1):
+            order = PurchaseOrder(
+                supplier=self.random.choice(suppliers), reference_number=f"{self.tag}-PO{number:07d}",
+                order_date=moment.date(), expected_delivery_date=(moment + timedelta(days=self.random.randint(3, 30))).date(),
+                created_by=user, created_at=moment,
+            )
+            orders.append(order)
+            for index in set(self.random.choices(range(len(items)), cum_weights=velocity, k=self.random.randint(1, 5))):
+                lines.append((order, index))
+
+        with explicit_timestamps(PurchaseOrder):
+            self._bulk(PurchaseOrder, orders)
+        order_lines = self._bulk(PurchaseOrderItem, [
+            PurchaseOrderItem(purchase_order=order, item=items[index], quantity=float(self.random.randint(50, 1000)),
+                              rate=prices[index])
+            for order, index in lines
+        ])
+        by_item = {}
+        for (order, index), line in zip(lines, order_lines):
+            by_item.setdefault(index, []).append((order.pk, line.pk, order.supplier_id))
+        return by_item
+
+    def sales_orders(self, count: int, customers: List[Customer], items: List[Item], velocity: List[float],
+                     prices: List[float], user, start: datetime, end: datetime) -> Dict[int, List[int]]:
+        """Orders of one to five lines; returns item index -> [sales order id]"""
+        orders, lines = [], []
+        for number, moment in enumerate(self._moments(count, start, end), start=1):
+            order = SalesOrder(
+                customer=self.random.choice(customers), reference_number=f"{self.tag}-SO{number:07d}",
+                order_date=moment.date(), created_by=user, created_at=moment, updated_at=moment,
+            )
+            orders.append(order)
+            for index in set(self.random.choices(range(len(items)), cum_weights=velocity, k=self.random.randint(1, 5))):
+                lines.append((order, index))
+
+        with explicit_timestamps(SalesOrder):
+            self._bulk(SalesOrder, orders)
+        self._bulk(SalesOrderItem, [
+            SalesOrderItem(sales_order=order, item=items[index], quantity=float(self.random.randint(1, 100)),
+                           rate=round(prices[index] * 1.3, 2))
+            for order, index in lines
+        ])
+        by_item = {}
+        for order, index in lines:
+            by_item.setdefault(index, []).append(order.pk)
+        return by_item
+
+    def warehouse_dataset(self, warehouses: int = 2, zones: int = 4, aisles: int = 10, racks: int = 8, bins: int = 4,
+                          items: int = 10000, categories: int = 50, suppliers: int = 100, customers: int = 500,
+                          purchase_orders: int = 2000, sales_orders: int = 5000, transactions: int = 100000,
+                          days: int = 365, end: Optional[datetime] = None, alpha: float = 1.16,
+                          ledger: bool = True, progress=None) -> Dict[str, int]:
+        """Master data, orders and `transactions` movements over the `days` before `end`"""
+        end = end or timezone.now()
+        start = end - timedelta(days=days)
+
+        self.reference_data()
+        user = self.user()
+        warehouse_rows = self.warehouses(warehouses, user)
+        locations = self.location_hierarchy(warehouse_rows, zones, aisles, racks, bins)
+        item_rows = self.items(items, self.categories(categories))
+        prices = [round(self.random.uniform(10, 1000), 2) for _ in item_rows]
+        velocity = self.velocity(len(item_rows), alpha)
+        supplier_rows = self.suppliers(suppliers)
+        item_codes = self.item_codes(item_rows, supplier_rows)
+        purchases = self.purchase_orders(purchase_orders, supplier_rows, item_rows, velocity, prices, user, start, end)
+        sales = self.sales_orders(sales_orders, self.customers(customers), item_rows, velocity, prices, user, start, end)
+
+        history = TransactionHistory(
+            self, user, item_rows, locations, velocity, prices, supplier_rows, purchases, sales, ledger=ledger,
+        )
+        history.generate(transactions, start, end, progress=progress)
+        inventory_cache.bump(inventory_cache.LOCATION, [location.pk for location in locations])
+        inventory_cache.bump(inventory_cache.ITEM, [item.pk for item in item_rows])
+
+        return {
+            'warehouses': len(warehouse_rows),
+            'locations': len(locations),
+            'items': len(item_rows),
+            'suppliers': len(supplier_rows),
+            'item_codes': item_codes,
+            'purchase_orders': purchase_orders,
+            'sales_orders': sales_orders,
+            'batches': len(history.batches),
+            'lots': len(history.lots),
+            'inventory_rows': len(history.rows),
+            'transactions': history.written,
+            'ledger_entries': history.ledger_entries,
+        }
+
+
+class TransactionHistory:
+    """
+    Draws transactions in time order against running balances and writes them, with the
+    batches, lots, inventory rows and ledger entries they imply, one chunk at a time.
+    Stock keys are (item index, location index, batch index, lot index) into the lists below.
+
+    Transactions and ledger entries are written with one INSERT run through executemany per
+    chunk rather than bulk_create, which prepares every field of every row in Python and held
+    generation to ~1.5k transactions/s. Transaction and inventory ids are assigned here, so
+    ledger entries can point at them without reading them back; inventory rows are inserted
+    once, with their closing balance, after the history is written.
+    """
+
+    TRANSACTION_COLUMNS = (
+        'id', 'process_type', 'item', 'quantity', 'rate', 'location', 'from_location', 'to_location',
+        'batch_number', 'supplier', 'purchase_order', 'purchase_order_item', 'sales_order', 'is_dispatched', 'dispatched_by',
+        'dispatched_at', 'reason', 'is_defective', 'reference_number', 'created_by', 'created_at',
+        'updated_at', 'deleted',
+    )
+    LEDGER_COLUMNS = (
+        'inventory', 'item', 'location', 'batch', 'lot', 'action', 'transaction', 'reference_id',
+        'reference_type', 'quantity_before', 'quantity_changed', 'quantity_after', 'changed_by', 'timestamp',
+    )
+    INVENTORY_COLUMNS = (
+        'id', 'item', 'location', 'batch', 'lot', 'quantity', 'reserved_quantity', 'deleted', 'created_by',
+        'created_at', 'updated_at',
+    )
+
+    def __init__(self, generator: DataGenerator, user, items: List[Item], locations: List[Location],
+                 velocity: List[float], prices: List[float], suppliers: List[Supplier],
+                 purchases: Dict[int, List[Tuple[int, int, int]]], sales: Dict[int, List[int]], ledger: bool = True):
+        self.generator = generator
+        self.random = generator.random
+        self.tag = generator.tag
+        self.user_id = user.pk
+        self.item_ids = [item.pk for item in items]
+        self.location_ids = [location.pk for location in locations]
+        self.velocity = velocity
+        self.prices = prices
+        self.supplier_ids = [supplier.pk for supplier in suppliers]
+        self.purchases = purchases
+        self.sales = sales
+        self.ledger = ledger
+        self.process_types = dict(InventoryProcessType.objects.filter(code__in=PROCESS_TYPES).values_list('code', 'pk'))
+
+        # Each item is slotted in one to three bins of one warehouse
+        by_warehouse = {}
+        for index, location in enumerate(locations):
+            by_warehouse.setdefault(location.warehouse_id, []).append(index)
+        bins = list(by_warehouse.values())
+        self.warehouse_bins = {}
+        self.homes = []
+        for _ in items:
+            candidates = self.random.choice(bins)
+            homes = self.random.sample(candidates, min(len(candidates), self.random.randint(1, 3)))
+            self.homes.append(homes)
+            self.warehouse_bins[homes[0]] = candidates
+
+        self.batches, self.lots = [], []
+        self.batch_lot = []
+        self.current_batch = [None] * len(items)
+        self.batch_count = [0] * len(items)
+        self.balances = {}
+        # Keys holding stock per item, oldest first, so outwards pick FIFO
+        self.on_hand = [{} for _ in items]
+        # key -> (inventory id, moment first stocked)
+        self.rows = {}
+
+        self.next_transaction_id = self._next_id(InventoryTransaction)
+        self.next_inventory_id = self._next_id(Inventory)
+        self.written = 0
+        self.ledger_entries = 0
+        self._reset_chunk()
+
+    @staticmethod
+    def _next_id(model) -> int:
+        return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+    def _reset_chunk(self):
+        self.new_batches, self.new_lots = [], []
+        self.transactions, self.movements = [], []
+
+    def _new_batch(self, item: int) -> int:
+        if self.batch_count[item] % BATCHES_PER_LOT == 0:
+            lot = ItemLot(lot_number=f"{self.tag}-L{len(self.lots):08d}")
+            self.lots.append(lot)
+            self.new_lots.append(lot)
+        batch = ItemBatch(batch_number=f"{self.tag}-B{len(self.batches):08d}")
+        self.batches.append(batch)
+        self.new_batches.append(batch)
+        self.batch_lot.append(len(self.lots) - 1)
+        self.batch_count[item] += 1
+        self.current_batch[item] = len(self.batches) - 1
+        return self.current_batch[item]
+
+    def _key(self, item: int, location: int, batch: int) -> Tuple[int, int, int, int]:
+        return (item, location, batch, self.batch_lot[batch])
+
+    def _move(self, key, delta: float, action: str, moment) -> None:
+        if key not in self.rows:
+            self.rows[key] = (self.next_inventory_id, moment)
+            self.next_inventory_id += 1
+        before = self.balances.get(key, 0.0)
+        after = before + delta
+        self.balances[key] = after
+        stocked = self.on_hand[key[0]]
+        if after > 0:
+            stocked[key] = after
+        else:
+            stocked.pop(key, None)
+        self.movements.append((self.next_transaction_id, key, delta, before, after, action, moment))
+
+    def _transaction(self, code: str, item: int, quantity: float, moment, batch: int, location=None,
+                     from_location=None, to_location=None, supplier=None, purchase_order=None, purchase_order_item=None,
+                     sales_order=None, dispatched=False, reason=None, defective=False) -> None:
+        transaction_id = self.next_transaction_id
+        self.next_transaction_id += 1
+        self.transactions.append((
+            transaction_id, self.process_types[code], self.item_ids[item], quantity, self.prices[item],
+            None if location is None else self.location_ids[location],
+            None if from_location is None else self.location_ids[from_location],
+            None if to_location is None else self.location_ids[to_location],
+            self.batches[batch].batch_number, supplier, purchase_order, purchase_order_item, sales_order,
+            dispatched, self.user_id if dispatched else None, moment if dispatched else None,
+            reason, defective, f"{self.tag}-T{transaction_id:09d}", self.user_id, moment, moment, False,
+        ))
+
+    def _draw(self, code: str, item: int, moment) -> None:
+        """Append one transaction of type `code` for `item` and the movements it makes"""
+        stocked = self.on_hand[item]
+        if code in ('OUTWARD', 'TRANSFER', 'ADJUSTMENT') and not stocked:
+            code = 'INWARD'
+        if code == 'RETURN' and self.current_batch[item] is None:
+            code = 'INWARD'
+
+        if code == 'INWARD':
+            batch = self.current_batch[item]
+            if batch is None or self.random.random() < NEW_BATCH_RATE:
+                batch = self._new_batch(item)
+            location = self.random.choice(self.homes[item])
+            quantity = float(self.random.randint(10, 500))
+            order, line, supplier = None, None, self.random.choice(self.supplier_ids)
+            if item in self.purchases and self.random.random() < 0.8:
+                order, line, supplier = self.random.choice(self.purchases[item])
+            self._move(self._key(item, location, batch), quantity, 'INWARD', moment)
+            self._transaction(code, item, quantity, moment, batch, location=location, supplier=supplier,
+                              purchase_order=order, purchase_order_item=line)
+
+        elif code == 'OUTWARD':
+            key, balance = next(iter(stocked.items()))
+            quantity = min(balance, float(self.random.randint(1, 50)))
+            order = self.random.choice(self.sales[item]) if item in self.sales and self.random.random() < 0.8 else None
+            self._move(key, -quantity, 'OUTWARD', moment)
+            self._transaction(code, item, quantity, moment, key[2], location=key[1], sales_order=order,
+                              dispatched=True)
+
+        elif code == 'TRANSFER':
+            key, balance = next(iter(stocked.items()))
+            targets = [home for home in self.homes[item] if home != key[1]] or [
+                location for location in self.warehouse_bins[self.homes[item][0]] if location != key[1]
+            ]
+            if not targets:
+                return self._draw('INWARD', item, moment)
+            target = self.random.choice(targets)
+            quantity = min(balance, float(self.random.randint(1, 100)))
+            self._move(key, -quantity, 'TRANSFER_OUT', moment)
+            self._move(self._key(item, target, key[2]), quantity, 'TRANSFER_IN', moment)
+            self._transaction(code, item, quantity, moment, key[2], from_location=key[1], to_location=target)
+
+        elif code == 'ADJUSTMENT':
+            key = self.random.choice(list(stocked))
+            delta = float(self.random.choice([-5, -4, -3, -2, -1, 1, 2, 3, 4, 5]))
+            delta = max(delta, -stocked[key])
+            self._move(key, delta, 'ADJUSTMENT', moment)
+            self._transaction(code, item, delta, moment, key[2], location=key[1], reason="Cycle count difference")
+
+        else:
+            batch = self.current_batch[item]
+            location = self.random.choice(self.homes[item])
+            quantity = float(self.random.randint(1, 10))
+            defective = self.random.random() < DEFECTIVE_RETURN_RATE
+            # Defective returns are recorded but never restocked
+            if not defective:
+                self._move(self._key(item, location, batch), quantity, 'RETURN', moment)
+            self._transaction(code, item, quantity, moment, batch, location=location, defective=defective)
+
+    def _flush(self) -> None:
+        self.generator._bulk(ItemLot, self.new_lots)
+        self.generator._bulk(ItemBatch, self.new_batches)
+        self.generator._insert(InventoryTransaction, self.TRANSACTION_COLUMNS, self.transactions)
+
+        if self.ledger:
+            entries = [
+                (
+                    self.rows[key][0], self.item_ids[key[0]], self.location_ids[key[1]],
+                    self.batches[key[2]].pk, self.lots[key[3]].pk, action, transaction_id, transaction_id,
+                    'InventoryTransaction', before, delta, after, self.user_id, moment,
+                )
+                for transaction_id, key, delta, before, after, action, moment in self.movements
+            ]
+            self.generator._insert(InventoryLog, self.LEDGER_COLUMNS, entries)
+            self.ledger_entries += len(entries)
+
+        self.written += len(self.transactions)
+        self._reset_chunk()
+
+    def generate(self, count: int, start: datetime, end: datetime, progress=None) -> None:
+        codes = list(PROCESS_MIX)
+        mix = list(itertools.accumulate(PROCESS_MIX.values()))
+        step = (end - start) / max(count, 1)
+        as_db_value = connection.ops.adapt_datetimefield_value
+        chunk_size = self.generator.chunk_size
+
+        for offset in range(0, count, chunk_size):
+            size = min(chunk_size, count - offset)
+            drawn_codes = self.random.choices(codes, cum_weights=mix, k=size)
+            drawn_items = self.random.choices(range(len(self.item_ids)), cum_weights=self.velocity, k=size)
+            for number, (code, item) in enumerate(zip(drawn_codes, drawn_items), start=offset):
+                self._draw(code, item, as_db_value(start + step * number))
+            self._flush()
+            if progress:
+                progress(self.written)
+
+        self.generator._insert(Inventory, self.INVENTORY_COLUMNS, [
+            (
+                inventory_id, self.item_ids[item], self.location_ids[location], self.batches[batch].pk,
+                self.lots[lot].pk, self.balances[key], 0.0, False, self.user_id, moment, moment,
+            )
+            for key, (inventory_id, moment) in self.rows.items()
+            for item, location, batch, lot in [key]
+        ])
+        self.generator.reset_sequences(InventoryTransaction, Inventory)
+        InventorySummaryService.rebuild()
@@ -0,0 +1,93 @@
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from inventory.models import Inventory, InventoryProcessType, Item, ItemBatch
+from inventory.services import STOCK_KEY_INDEX, InventoryTransactionService
+from warehouse.models import Location, Warehouse
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure inward posting throughput with and without the stock-key index. "
+        "Runs inside a transaction that is rolled back, so no data is kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--postings', type=int, default=500, help="Inward postings per variant")
+        parser.add_argument('--batches', type=int, default=50,
+                            help="Batch rows held by the benchmark item at its location")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixture = self._fixture(options['batches'])
+            results = [
+                self._run("legacy (instance pickled to cache)", fixture, options['postings'], index=False, legacy=True),
+                self._run("key lookup", fixture, options['postings'], index=False),
+                self._run("stock-key index", fixture, options['postings'], index=True),
+            ]
+            transaction.set_rollback(True)
+
+        baseline = results[0][1]
+        for label, per_second, queries in results:
+            self.stdout.write(
+                f"{label:<38} {per_second:>9.1f} postings/s  {queries:>5.1f} queries/posting  "
+                f"{per_second / baseline:>5.2f}x"
+            )
+
+    def _fixture(self, batches):
+        tag = uuid.uuid4().hex[:8]
+        user = get_user_model().objects.create(username=f"benchmark-{tag}")
+        warehouse = Warehouse.objects.create(name=f"Benchmark {tag}", address="-", owner=user)
+        location = Location.objects.create(warehouse=warehouse, code=f"BENCH-{tag}")
+        item = Item.objects.create(name=f"Benchmark item {tag}", sku=f"BENCH-{tag}")
+        InventoryProcessType.objects.get_or_create(code='INWARD', defaults={'name': 'Inward'})
+
+        batch_rows = ItemBatch.objects.bulk_create(
+            [ItemBatch(batch_number=f"BENCH-{tag}-{n}") for n in range(batches + 1)]
+        )
+        Inventory.objects.bulk_create([
+            Inventory(item=item, location=location, batch=batch, quantity=0, reserved_quantity=0)
+            for batch in batch_rows
+        ])
+        return {"user": user, "location": location, "item": item, "batch": batch_rows[-1]}
+
+    def _run(self, label, fixture, postings, index, legacy=False):
+        STOCK_KEY_INDEX.clear()
+        original_size = STOCK_KEY_INDEX.max_size
+        STOCK_KEY_INDEX.max_size = STOCK_KEY_INDEX.max_size if index else 0
+
+        service = InventoryTransactionService(fixture["user"])
+        data = {
+            'process_type': 'INWARD',
+            'item': fixture["item"],
+            'location': fixture["location"],
+            'batch': fixture["batch"],
+            'quantity': 1,
+        }
+        cache_key = f"inventory_{fixture['item'].id}_{fixture['location'].id}_{fixture['batch'].id}_None"
+
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for _ in range(postings):
+                    if legacy:
+                        # What InwardProcessor used to do around every posting
+                        cache.set(cache_key, Inventory.objects.get(
+                            item=fixture["item"], location=fixture["location"], batch=fixture["batch"], lot=None,
+                        ), 300)
+                        cache.get(cache_key)
+                        cache.delete(cache_key)
+                    result = service.create_transaction(data)
+                    if not result.success:
+                        raise RuntimeError(result.errors)
+                elapsed = time.perf_counter() - started
+        finally:
+            STOCK_KEY_INDEX.max_size = original_size
+
+        return label, postings / elapsed, len(queries.captured_queries) / postings
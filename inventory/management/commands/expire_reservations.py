@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from inventory.services import StockReservationService
+
+
+class Command(BaseCommand):
+    help = (
+        "Release stock held by reservations past their expiry. Schedule it every few "
+        "minutes, e.g. from cron: `*/5 * * * * python manage.py expire_reservations`."
+    )
+
+    def handle(self, *args, **options):
+        expired = StockReservationService(None).expire()
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} reservations"))
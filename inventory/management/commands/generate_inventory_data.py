@@ -0,0 +1,74 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+from django.utils import timezone
+
+from inventory.datagen import DataGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic warehouse for load testing: warehouses with a zone/aisle/rack/bin "
+        "location hierarchy, categorised items, suppliers, customers, purchase and sales orders, "
+        "and a transaction history with Pareto-distributed SKU velocity, plus the batches, lots, "
+        "inventory rows, summary and ledger it implies. Deterministic for a given --seed and "
+        "--end-date. Everything is written in one database transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transactions', type=int, default=100000)
+        parser.add_argument('--items', type=int, default=10000)
+        parser.add_argument('--categories', type=int, default=50)
+        parser.add_argument('--warehouses', type=int, default=2)
+        parser.add_argument('--zones', type=int, default=4, help="Zones per warehouse")
+        parser.add_argument('--aisles', type=int, default=10, help="Aisles per zone")
+        parser.add_argument('--racks', type=int, default=8, help="Racks per aisle")
+        parser.add_argument('--bins', type=int, default=4, help="Bins per rack")
+        parser.add_argument('--suppliers', type=int, default=100)
+        parser.add_argument('--customers', type=int, default=500)
+        parser.add_argument('--purchase-orders', type=int, default=2000)
+        parser.add_argument('--sales-orders', type=int, default=5000)
+        parser.add_argument('--days', type=int, default=365, help="Length of the transaction history")
+        parser.add_argument('--end-date', help="Last day of the history, YYYY-MM-DD (default: today)")
+        parser.add_argument('--alpha', type=float, default=1.16,
+                            help="Pareto shape of SKU velocity; 1.16 gives roughly 80/20")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--tag', help="Prefix of generated names (default: SYN<seed>)")
+        parser.add_argument('--chunk-size', type=int, default=DataGenerator.CHUNK_SIZE)
+        parser.add_argument('--no-ledger', action='store_true', help="Skip the InventoryLog entries")
+
+    def handle(self, *args, **options):
+        end = timezone.now()
+        if options['end_date']:
+            day = parse_date(options['end_date'])
+            if day is None:
+                raise CommandError(f"Invalid --end-date: {options['end_date']}")
+            end = timezone.make_aware(timezone.datetime.combine(day, timezone.datetime.max.time()))
+
+        generator = DataGenerator(seed=options['seed'], tag=options['tag'], chunk_size=options['chunk_size'])
+        started = time.perf_counter()
+
+        def progress(written):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{written:>10} transactions  {written / elapsed:>8.0f}/s", ending='\r')
+            self.stdout.flush()
+
+        with transaction.atomic():
+            counts = generator.warehouse_dataset(
+                warehouses=options['warehouses'], zones=options['zones'], aisles=options['aisles'],
+                racks=options['racks'], bins=options['bins'], items=options['items'],
+                categories=options['categories'], suppliers=options['suppliers'], customers=options['customers'],
+                purchase_orders=options['purchase_orders'], sales_orders=options['sales_orders'],
+                transactions=options['transactions'], days=options['days'], end=end, alpha=options['alpha'],
+                ledger=not options['no_ledger'], progress=progress,
+            )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write("")
+        for name, value in counts.items():
+            self.stdout.write(f"{name:<16} {value:>10}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated in {elapsed:.1f}s ({counts['transactions'] / elapsed:.0f} transactions/s)"
+        ))
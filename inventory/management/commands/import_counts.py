@@ -0,0 +1,69 @@
+import csv
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.services import CycleCountService
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a physical count or go-live opening balances from CSV or NDJSON with columns "
+        "sku, location, batch, lot, counted_quantity and notes. Differences from the system "
+        "quantity are posted as ADJUSTMENT transactions under the count's reference."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or NDJSON file")
+        parser.add_argument('--format', choices=[CycleCountService.CSV, CycleCountService.NDJSON],
+                            help="File format (default: from the file extension, else csv)")
+        parser.add_argument('--reference', help="Reference grouping this count (default: COUNT-<timestamp>)")
+        parser.add_argument('--warehouse', type=int, help="Warehouse id used to resolve location codes")
+        parser.add_argument('--user', help="Username recorded on the counts and adjustments")
+        parser.add_argument('--chunk-size', type=int, default=CycleCountService.CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help="Report the variance without posting")
+        parser.add_argument('--report', help="Write the variance report to this CSV file")
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Unknown user: {options['user']}")
+
+        service = CycleCountService(
+            user, reference=options['reference'], warehouse=options['warehouse'], chunk_size=options['chunk_size'],
+        )
+        file_format = options['format'] or service.detect_format(options['path'])
+
+        started = time.perf_counter()
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as stream:
+                result = service.import_stream(stream, file_format, dry_run=options['dry_run'])
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(e)
+        elapsed = time.perf_counter() - started
+
+        if options['report']:
+            variance = result.variance if options['dry_run'] else service.variance_report(result.reference)
+            columns = ['item__sku', 'location__code', 'batch__batch_number', 'lot__lot_number',
+                       'system_quantity', 'counted_quantity', 'discrepancy', 'adjustment']
+            with open(options['report'], 'w', newline='', encoding='utf-8') as report:
+                writer = csv.writer(report)
+                writer.writerow(['sku', 'location', 'batch', 'lot', 'system_quantity', 'counted_quantity',
+                                 'discrepancy', 'adjustment'])
+                for line in variance:
+                    writer.writerow([line[column] for column in columns])
+
+        summary = result.summary
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.reference}{' (dry run)' if options['dry_run'] else ''}: {result.total} rows in {elapsed:.1f}s, "
+            f"{result.counted} counted, {result.adjusted} adjusted, {result.unchanged} unchanged, "
+            f"{result.failed} rejected. Gain {summary['gain']}, loss {summary['loss']}, net {summary['net']}"
+        ))
+        for error in result.errors[:20]:
+            self.stdout.write(f"  line {error['line']}: {'; '.join(error['errors'])}")
+        if len(result.errors) > 20:
+            self.stdout.write(f"  ... {len(result.errors) - 20} more")
@@ -0,0 +1,57 @@
+import csv
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.services import ItemImportService
+
+
+class Command(BaseCommand):
+    help = (
+        "Import an item catalogue from CSV or NDJSON, upserting on sku. Columns: sku (required), "
+        "name, barcode, description, unit, category, brand, model, supplier, minimum_stock_level, "
+        "reorder_point, is_active. Only the columns present are written."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or NDJSON file")
+        parser.add_argument('--format', choices=[ItemImportService.CSV, ItemImportService.NDJSON],
+                            help="File format (default: from the file extension, else csv)")
+        parser.add_argument('--chunk-size', type=int, default=ItemImportService.CHUNK_SIZE,
+                            help="Rows per upsert statement")
+        parser.add_argument('--no-create-categories', action='store_true',
+                            help="Reject rows whose category does not exist instead of creating it")
+        parser.add_argument('--report', help="Write rejected rows to this CSV file")
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or ItemImportService.detect_format(options['path'])
+        service = ItemImportService(
+            chunk_size=options['chunk_size'], create_categories=not options['no_create_categories'],
+        )
+
+        started = time.perf_counter()
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as stream:
+                result = service.import_stream(stream, file_format)
+        except ValidationError as e:
+            raise CommandError("; ".join(e.messages))
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(e)
+        elapsed = time.perf_counter() - started
+
+        if options['report']:
+            with open(options['report'], 'w', newline='', encoding='utf-8') as report:
+                writer = csv.writer(report)
+                writer.writerow(['line', 'sku', 'errors'])
+                for error in result.errors:
+                    writer.writerow([error['line'], error['sku'], '; '.join(error['errors'])])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.total} rows in {elapsed:.1f}s ({result.total / elapsed if elapsed else 0:.0f} rows/s): "
+            f"{result.created} created, {result.updated} updated, {result.failed} rejected"
+        ))
+        for error in result.errors[:20]:
+            self.stdout.write(f"  line {error['line']} sku {error['sku']}: {'; '.join(error['errors'])}")
+        if len(result.errors) > 20:
+            self.stdout.write(f"  ... {len(result.errors) - 20} more")
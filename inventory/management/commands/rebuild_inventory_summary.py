@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from inventory.services import InventorySummaryService
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the InventorySummary table from Inventory. Postings keep it current; "
+        "run this only after stock rows were changed outside the ORM."
+    )
+
+    def handle(self, *args, **options):
+        rows = InventorySummaryService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} summary rows"))
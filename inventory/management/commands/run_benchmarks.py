@@ -0,0 +1,123 @@
+import json
+import platform
+import random
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from inventory import benchmarks
+from inventory.datagen import DataGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic items, locations and stock, then benchmark posting throughput through "
+        "InventoryTransactionService and the latency of the main stock reads. Runs inside a "
+        "transaction that is rolled back, so no data is kept; postings therefore release a "
+        "savepoint rather than commit. Results are written as JSON for comparison between commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1000)
+        parser.add_argument('--locations', type=int, default=100)
+        parser.add_argument('--warehouses', type=int, default=2)
+        parser.add_argument('--stock-rows', type=int, default=5000, help="Seeded inventory rows")
+        parser.add_argument('--rounds', type=int, default=100, help="Timed runs per benchmark")
+        parser.add_argument('--warmup', type=int, default=5, help="Untimed runs per benchmark")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--only', nargs='+', help="Benchmark groups or names to run")
+        parser.add_argument('--output', help="Write the results to this JSON file")
+        parser.add_argument('--compare', help="JSON results of an earlier run to compare against")
+        parser.add_argument('--fail-threshold', type=float,
+                            help="Exit with an error if any mean is this many percent slower than --compare")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as stream:
+                    baseline = json.load(stream)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {options['compare']}: {e}")
+
+        started = time.perf_counter()
+        # The read benchmarks go through the test client, which calls itself 'testserver'
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            generator = DataGenerator(seed=options['seed'])
+            data = generator.stock_dataset(
+                items=options['items'], locations=options['locations'],
+                warehouses=options['warehouses'], stock_rows=options['stock_rows'],
+            )
+            seeded = time.perf_counter() - started
+            results = benchmarks.run(
+                data, random.Random(options['seed']),
+                rounds=options['rounds'], warmup=options['warmup'], only=options['only'],
+            )
+            transaction.set_rollback(True)
+
+        report = {
+            'datetime': timezone.now().isoformat(),
+            'commit_info': self._commit_info(),
+            'machine_info': {
+                'python_version': platform.python_version(),
+                'django_version': django.get_version(),
+                'database': f"{connection.vendor} {connection.Database.sqlite_version if connection.vendor == 'sqlite' else ''}".strip(),
+                'machine': platform.machine(),
+                'system': platform.system(),
+            },
+            'params': {
+                key: options[key] for key in ('items', 'locations', 'warehouses', 'stock_rows', 'rounds', 'warmup', 'seed')
+            },
+            'seed_seconds': seeded,
+            'benchmarks': results,
+        }
+
+        self.stdout.write(f"Seeded {options['items']} items, {options['locations']} locations and "
+                          f"{options['stock_rows']} stock rows in {seeded:.1f}s")
+        regressions = self._print(results, baseline, options['fail_threshold'])
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if regressions:
+            raise CommandError(f"{len(regressions)} benchmark(s) slower than the baseline: {', '.join(regressions)}")
+
+    @staticmethod
+    def _commit_info():
+        try:
+            commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                                    cwd=settings.BASE_DIR).stdout.strip()
+            dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True,
+                                        text=True, check=True, cwd=settings.BASE_DIR).stdout.strip())
+        except (OSError, subprocess.CalledProcessError):
+            return {}
+        return {'id': commit, 'dirty': dirty}
+
+    def _print(self, results, baseline, threshold):
+        previous = {
+            (entry['group'], entry['name']): entry['stats'] for entry in (baseline or {}).get('benchmarks', [])
+        }
+        regressions = []
+        for entry in results:
+            stats = entry['stats']
+            line = (
+                f"{entry['group'] + '/' + entry['name']:<40} mean {stats['mean'] * 1000:>9.3f} ms  "
+                f"median {stats['median'] * 1000:>9.3f} ms  p95 {stats['p95'] * 1000:>9.3f} ms  "
+                f"{stats['ops']:>9.1f} ops/s  {stats['queries']:>6.1f} queries"
+            )
+            before = previous.get((entry['group'], entry['name']))
+            if before:
+                change = (stats['mean'] - before['mean']) / before['mean'] * 100
+                line += f"  {change:+6.1f}% vs baseline"
+                if threshold is not None and change > threshold:
+                    regressions.append(entry['name'])
+            self.stdout.write(line)
+        return regressions
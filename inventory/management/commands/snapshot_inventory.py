@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from inventory.services import StockSnapshotService
+
+
+class Command(BaseCommand):
+    help = (
+        "Materialize daily stock snapshots. Without --date, snapshots every completed day "
+        "since the last snapshot; schedule it nightly, e.g. from cron: "
+        "`5 0 * * * python manage.py snapshot_inventory`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Snapshot (or re-snapshot) a single day, YYYY-MM-DD")
+
+    def handle(self, *args, **options):
+        if options['date']:
+            day = parse_date(options['date'])
+            if day is None:
+                raise CommandError("--date must be YYYY-MM-DD")
+            taken = [(day, StockSnapshotService.take_snapshot(day))]
+        else:
+            taken = StockSnapshotService.run_scheduled()
+
+        for day, rows in taken:
+            self.stdout.write(f"{day}: {rows} snapshot rows")
+        self.stdout.write(self.style.SUCCESS(f"Snapshotted {len(taken)} day(s)"))
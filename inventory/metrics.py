@@ -0,0 +1,43 @@
+"""
+Write-path metrics for stock posting, served at /monitoring/metrics/.
+
+Failure reasons are a fixed set so label cardinality stays bounded:
+process_type (missing or unknown), invalid_data (unresolvable references or quantity, bulk
+only), validation (processor checks, including the availability check of a single
+posting), stock (movement guards rejected the posting), batch_rejected (valid lines dropped
+by an all-or-nothing bulk post) and error (unexpected exception).
+"""
+from monitoring.metrics import Counter, Histogram
+
+TRANSACTIONS_POSTED = Counter(
+    'inventory_transactions_posted_total', 'Inventory transactions posted',
+    ['process_type', 'path'],
+)
+TRANSACTION_FAILURES = Counter(
+    'inventory_transaction_failures_total', 'Inventory transactions rejected, by reason',
+    ['process_type', 'reason'],
+)
+POSTING_SECONDS = Histogram(
+    'inventory_posting_seconds', 'Time to validate and post one transaction, commit included',
+    ['process_type'],
+)
+BULK_POSTING_SECONDS = Histogram(
+    'inventory_bulk_posting_seconds', 'Time to validate and post one bulk request, commit included',
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+LOCK_WAIT_SECONDS = Histogram(
+    'inventory_lock_wait_seconds', 'Time to read (and in locking mode, lock) the inventory rows of a posting',
+    ['mode'],
+)
+VALIDATION_CACHE = Counter(
+    'inventory_validation_cache_total', 'InventoryValidationService cache lookups',
+    ['check', 'result'],
+)
+TASKS_CREATED = Counter(
+    'inventory_tasks_created_total', 'Tasks created for posted transactions',
+    ['task_type'],
+)
+SCAN_LOOKUPS = Counter(
+    'inventory_scan_lookups_total', 'Scanned codes looked up, by result (hit, miss or not_found)',
+    ['result'],
+)
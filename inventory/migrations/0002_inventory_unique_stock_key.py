@@ -0,0 +1,51 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:28
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Value
+from django.db.models.functions import Coalesce
+
+
+def merge_duplicate_stock_rows(apps, schema_editor):
+    """
+    Fold rows that share an (item, location, batch, lot) key into the oldest live one, which
+    the unique constraint below would otherwise reject. Earlier get_or_create paths could
+    create such rows, since unique_together lets NULL batch/lot values repeat. Quantities of
+    soft-deleted duplicates are dropped, as every stock total already leaves them out.
+    """
+    Inventory = apps.get_model('inventory', 'Inventory')
+    duplicates = Inventory.objects.filter(item__isnull=False, location__isnull=False).values(
+        'item', 'location', batch_key=Coalesce('batch', Value(0)), lot_key=Coalesce('lot', Value(0)),
+    ).annotate(rows=Count('id')).filter(rows__gt=1).order_by()
+
+    for key in duplicates:
+        rows = list(Inventory.objects.filter(
+            item_id=key['item'], location_id=key['location'],
+            **({'batch_id': key['batch_key']} if key['batch_key'] else {'batch__isnull': True}),
+            **({'lot_id': key['lot_key']} if key['lot_key'] else {'lot__isnull': True}),
+        ).order_by('deleted', 'pk'))
+        keeper, others = rows[0], rows[1:]
+        if not keeper.deleted:
+            live = [row for row in rows if not row.deleted]
+            keeper.quantity = sum(row.quantity or 0 for row in live)
+            keeper.reserved_quantity = sum(row.reserved_quantity or 0 for row in live)
+            keeper.save(update_fields=['quantity', 'reserved_quantity'])
+        Inventory.objects.filter(pk__in=[row.pk for row in others]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0001_initial'),
+        ('warehouse', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_stock_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='inventory',
+            constraint=models.UniqueConstraint(models.F('item'), models.F('location'), django.db.models.functions.comparison.Coalesce('batch', models.Value(0)), django.db.models.functions.comparison.Coalesce('lot', models.Value(0)), name='inventory_unique_stock_key'),
+        ),
+    ]
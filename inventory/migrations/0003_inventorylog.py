@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:29
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_inventory_unique_stock_key'),
+        ('warehouse', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(blank=True, max_length=50, null=True)),
+                ('reference_id', models.IntegerField(blank=True, null=True)),
+                ('reference_type', models.CharField(blank=True, max_length=50, null=True)),
+                ('quantity_before', models.FloatField(blank=True, null=True)),
+                ('quantity_changed', models.FloatField(blank=True, null=True)),
+                ('quantity_after', models.FloatField(blank=True, null=True)),
+                ('remarks', models.TextField(blank=True, null=True)),
+                ('timestamp', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('batch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='inventory.itembatch')),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('inventory', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='logs', to='inventory.inventory')),
+                ('item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='inventory.item')),
+                ('location', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='warehouse.location')),
+                ('lot', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='inventory.itemlot')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='logs', to='inventory.inventorytransaction')),
+            ],
+            options={
+                'ordering': ['-timestamp', '-id'],
+                'indexes': [models.Index(fields=['inventory', 'timestamp'], name='inventorylog_row_time_idx'), models.Index(fields=['item', 'location', 'timestamp'], name='inventorylog_item_loc_time_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_inventorylog'),
+        ('warehouse', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_date', models.DateField()),
+                ('quantity', models.FloatField(default=0)),
+                ('average_rate', models.FloatField(blank=True, null=True)),
+                ('value', models.FloatField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, to='inventory.item')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, to='warehouse.location')),
+            ],
+            options={
+                'ordering': ['-snapshot_date', 'item', 'location'],
+                'indexes': [models.Index(fields=['item', 'location', 'snapshot_date'], name='inventorysnap_item_loc_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('snapshot_date', 'item', 'location'), name='inventorysnapshot_unique_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def populate_summary(apps, schema_editor):
+    Inventory = apps.get_model('inventory', 'Inventory')
+    InventorySummary = apps.get_model('inventory', 'InventorySummary')
+    totals = Inventory.objects.filter(
+        deleted=False, item__isnull=False, location__isnull=False
+    ).values('item', 'location').annotate(
+        total_quantity=Sum('quantity'), reserved_quantity=Sum('reserved_quantity')
+    ).order_by()
+    InventorySummary.objects.bulk_create([
+        InventorySummary(
+            item_id=row['item'],
+            location_id=row['location'],
+            total_quantity=row['total_quantity'] or 0,
+            reserved_quantity=row['reserved_quantity'] or 0,
+        )
+        for row in totals
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_inventorysnapshot'),
+        ('warehouse', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_quantity', models.FloatField(default=0)),
+                ('reserved_quantity', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, to='inventory.item')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, to='warehouse.location')),
+            ],
+            options={
+                'ordering': ['item', 'location'],
+                'indexes': [models.Index(fields=['location', 'item'], name='inventorysum_location_item_idx')],
+                'constraints': [models.UniqueConstraint(fields=('item', 'location'), name='inventorysummary_unique_item_location')],
+            },
+        ),
+        migrations.RunPython(populate_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_stockreservation'),
+        ('warehouse', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['item', 'created_at', 'id'], name='inventory_live_item_fifo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['location', 'item'], name='inventory_live_loc_item_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorytransaction',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['process_type', '-created_at'], name='invtxn_live_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorytransaction',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['item', '-created_at'], name='invtxn_live_item_created_idx'),
+        ),
+    ]
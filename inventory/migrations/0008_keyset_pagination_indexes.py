@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_hot_query_indexes'),
+        ('warehouse', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='inventorytransaction',
+            name='invtxn_live_type_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['-created_at', '-id'], name='customer_live_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['-created_at', '-id'], name='inventory_live_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorytransaction',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['process_type', '-created_at', '-id'], name='invtxn_live_type_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['-created_at', '-id'], name='item_live_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(fields=['-created_at', '-id'], name='supplier_created_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.4 on 2026-10-18 06:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_primary_codes(apps, schema_editor):
+    Item = apps.get_model('inventory', 'Item')
+    ItemCode = apps.get_model('inventory', 'ItemCode')
+    codes = []
+    for item_id, barcode, sku in Item.objects.values_list('id', 'barcode', 'sku').iterator():
+        if barcode:
+            codes.append(ItemCode(item_id=item_id, code=barcode, code_type='barcode', primary=True))
+        if sku:
+            codes.append(ItemCode(item_id=item_id, code=sku, code_type='sku', primary=True))
+    ItemCode.objects.bulk_create(codes, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_purchase_order_item_receipts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=100)),
+                ('code_type', models.CharField(choices=[('barcode', 'Barcode'), ('sku', 'SKU'), ('gtin', 'Pack GTIN'), ('supplier_part', 'Supplier part number')], default='barcode', max_length=20)),
+                ('pack_quantity', models.FloatField(default=1)),
+                ('primary', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, null=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='codes', to='inventory.item')),
+                ('supplier', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='inventory.supplier')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['code'], name='itemcode_code_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('code_type__in', ['barcode', 'gtin'])), fields=('code',), name='itemcode_unique_scan_code'), models.UniqueConstraint(condition=models.Q(('code_type', 'sku')), fields=('code',), name='itemcode_unique_sku'), models.UniqueConstraint(condition=models.Q(('code_type', 'supplier_part')), fields=('supplier', 'code'), name='itemcode_unique_supplier_part'), models.CheckConstraint(condition=models.Q(('pack_quantity__gt', 0)), name='itemcode_pack_quantity_positive')],
+            },
+        ),
+        migrations.RunPython(populate_primary_codes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 07:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_item_codes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorytransaction',
+            name='lot_number',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+    ]
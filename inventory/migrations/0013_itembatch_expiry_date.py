@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 07:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_inventorytransaction_lot_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itembatch',
+            name='expiry_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
-from django.db.models import Sum
+from django.utils import timezone
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
 
 
 class ItemCategory(models.Model):
@@ -13,6 +15,7 @@ class ItemCategory(models.Model):
 class ItemBatch(models.Model):
     batch_number = models.CharField(max_length=100, unique=True)
     description = models.TextField(null=True, blank=True)
+    expiry_date = models.DateField(null=True, blank=True)  # FEFO allocation picks the earliest first
 
     def __str__(self):
         return self.batch_number
@@ -56,9 +59,65 @@ class Item(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], condition=Q(deleted=False), name='item_live_created_idx'),
+        ]
+
     def __str__(self):
         return self.name or ''
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The codes as loaded, so saving an item only resyncs its ItemCodes when they changed
+        instance._primary_codes = (instance.__dict__.get('barcode'), instance.__dict__.get('sku'))
+        return instance
+
+
+
+class ItemCode(models.Model):
+    """
+    Every code an item can be scanned or searched by, in one indexed table: the item's own
+    barcode and SKU (mirrored from Item, primary=True), alternate barcodes, pack-level GTINs
+    whose scan stands for pack_quantity units, and supplier part numbers.
+    """
+    BARCODE = 'barcode'
+    SKU = 'sku'
+    GTIN = 'gtin'
+    SUPPLIER_PART = 'supplier_part'
+    CODE_TYPE_CHOICES = [
+        (BARCODE, 'Barcode'),
+        (SKU, 'SKU'),
+        (GTIN, 'Pack GTIN'),
+        (SUPPLIER_PART, 'Supplier part number'),
+    ]
+    # Scanned codes share one namespace, so a barcode and a pack GTIN can never collide
+    SCAN_TYPES = (BARCODE, GTIN)
+
+    item = models.ForeignKey('Item', on_delete=models.CASCADE, related_name='codes')
+    code = models.CharField(max_length=100)
+    code_type = models.CharField(max_length=20, choices=CODE_TYPE_CHOICES, default=BARCODE)
+    pack_quantity = models.FloatField(default=1)  # units of the item one scan of this code stands for
+    supplier = models.ForeignKey('Supplier', on_delete=models.CASCADE, null=True, blank=True)
+    primary = models.BooleanField(default=False)  # mirrored from Item.barcode / Item.sku
+
+    created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['code'], condition=Q(code_type__in=['barcode', 'gtin']), name='itemcode_unique_scan_code'),
+            models.UniqueConstraint(fields=['code'], condition=Q(code_type='sku'), name='itemcode_unique_sku'),
+            models.UniqueConstraint(fields=['supplier', 'code'], condition=Q(code_type='supplier_part'), name='itemcode_unique_supplier_part'),
+            models.CheckConstraint(condition=Q(pack_quantity__gt=0), name='itemcode_pack_quantity_positive'),
+        ]
+        indexes = [
+            # Exact lookups and prefix (range) searches over every code type
+            models.Index(fields=['code'], name='itemcode_code_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.code} ({self.get_code_type_display()}) -> {self.item_id}"
 
 
 class Inventory(models.Model):
@@ -101,12 +160,32 @@ class Inventory(models.Model):
 
     class Meta:
         unique_together = ('item', 'location', 'batch', 'lot')
+        constraints = [
+            # unique_together lets NULL batch/lot rows repeat; this closes that gap for concurrent postings
+            models.UniqueConstraint(
+                'item', 'location', Coalesce('batch', models.Value(0)), Coalesce('lot', models.Value(0)),
+                name='inventory_unique_stock_key',
+            ),
+        ]
+        indexes = [
+            # FIFO allocation walks an item's live rows in creation order
+            models.Index(fields=['item', 'created_at', 'id'], condition=Q(deleted=False), name='inventory_live_item_fifo_idx'),
+            models.Index(fields=['location', 'item'], condition=Q(deleted=False), name='inventory_live_loc_item_idx'),
+            models.Index(fields=['-created_at', '-id'], condition=Q(deleted=False), name='inventory_live_created_idx'),
+        ]
 
     def __str__(self):
         if self.item and self.location:
             return f"{self.item.name} at {self.location.code} - {self.quantity}"
         return "Inventory Entry"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The summary key as loaded, so a direct edit that moves the row also refreshes the old one
+        instance._summary_key = (instance.__dict__.get('item_id'), instance.__dict__.get('location_id'))
+        return instance
+
 #!---------------------------------------------------------------------------
 class InventoryProcessType(models.Model):
     code = models.CharField(max_length=20, unique=True)  # e.g., INWARD, OUTWARD, TRANSFER
@@ -131,10 +210,12 @@ class InventoryTransaction(models.Model):
     to_location = models.ForeignKey('warehouse.Location', on_delete=models.DO_NOTHING, null=True, blank=True, related_name='transfers_to')
 
     batch_number = models.CharField(max_length=100, null=True, blank=True)
+    lot_number = models.CharField(max_length=100, null=True, blank=True)
     # expiry_date = models.DateField(null=True, blank=True)
 
     supplier = models.ForeignKey('inventory.Supplier', on_delete=models.DO_NOTHING, null=True, blank=True)
     purchase_order = models.ForeignKey('inventory.PurchaseOrder', on_delete=models.SET_NULL, null=True, blank=True)
+    purchase_order_item = models.ForeignKey('inventory.PurchaseOrderItem', on_delete=models.SET_NULL, null=True, blank=True, related_name='receipts')
     delivery_note = models.CharField(max_length=100, null=True, blank=True)
 
     sales_order = models.ForeignKey('inventory.SalesOrder', on_delete=models.SET_NULL, null=True, blank=True)
@@ -164,10 +245,22 @@ class InventoryTransaction(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Inward/outward lists: one process type, newest first
+            models.Index(fields=['process_type', '-created_at', '-id'], condition=Q(deleted=False), name='invtxn_live_type_keyset_idx'),
+            models.Index(fields=['item', '-created_at'], condition=Q(deleted=False), name='invtxn_live_item_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.process_type.name} | {self.item.name} | Qty: {self.quantity}"
 
+    def save(self, *args, **kwargs):
+        # A transaction saved outside InventoryTransactionService is posted by the post_save
+        # handler; one atomic block keeps the record from outliving a failed posting. Inside
+        # the service's own block no savepoint is needed.
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+
 
 #!---------------------------------------------------------------------------
 
@@ -281,21 +374,27 @@ class InventoryTransaction(models.Model):
 #         return f"Return of {self.item.name} from {self.location.code}"
 
 #inventory reconciliation / physical counting
-# class CycleCount(models.Model):
-#     item = models.ForeignKey(Item, on_delete=models.DO_NOTHING, null=True, blank=True)
-#     location = models.ForeignKey('warehouse.Location', on_delete=models.DO_NOTHING, null=True, blank=True)
+class CycleCount(models.Model):
+    item = models.ForeignKey(Item, on_delete=models.DO_NOTHING, null=True, blank=True)
+    location = models.ForeignKey('warehouse.Location', on_delete=models.DO_NOTHING, null=True, blank=True)
+    batch = models.ForeignKey('ItemBatch', on_delete=models.SET_NULL, null=True, blank=True)
+    lot = models.ForeignKey('ItemLot', on_delete=models.SET_NULL, null=True, blank=True)
 
-#     system_quantity = models.FloatField(null=True, blank=True)
-#     counted_quantity = models.FloatField(null=True, blank=True)
-#     discrepancy = models.FloatField(null=True, blank=True)
-#     notes = models.TextField(null=True, blank=True)
-#     count_date = models.DateField(auto_now_add=True)
+    # Groups the lines of one count (or one go-live opening balance load)
+    reference = models.CharField(max_length=100, db_index=True)
 
-#     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, related_name='cycle_count_created_by', null=True, blank=True)
-#     created_at = models.DateTimeField(auto_now_add=True)
+    system_quantity = models.FloatField(null=True, blank=True)
+    counted_quantity = models.FloatField(null=True, blank=True)
+    discrepancy = models.FloatField(null=True, blank=True)
+    adjustment = models.ForeignKey('InventoryTransaction', on_delete=models.SET_NULL, null=True, blank=True, related_name='cycle_counts')
+    notes = models.TextField(null=True, blank=True)
+    count_date = models.DateField(auto_now_add=True)
 
-#     def __str__(self):
-#         return f"Cycle count for {self.item.name} at {self.location.code}"
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, related_name='cycle_count_created_by', null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Cycle count for {self.item.name} at {self.location.code}"
 
 
 class Supplier(models.Model):
@@ -310,6 +409,11 @@ class Supplier(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='supplier_created_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -328,6 +432,26 @@ class PurchaseOrder(models.Model):
         return f"PO#{self.id} - {self.supplier.name}"
 
 
+class PurchaseOrderItemQuerySet(models.QuerySet):
+    def with_fulfilment(self):
+        """
+        Annotate received_quantity (live INWARD receipts against the line) and
+        outstanding_quantity, grouped in the same query as the lines themselves
+        """
+        received = Coalesce(
+            Sum('receipts__quantity', filter=Q(receipts__process_type__code='INWARD', receipts__deleted=False)),
+            models.Value(0.0),
+        )
+        return self.annotate(
+            received_quantity=received,
+            outstanding_quantity=Coalesce('quantity', models.Value(0.0)) - received,
+        )
+
+    def open(self):
+        """Lines still awaiting stock"""
+        return self.with_fulfilment().filter(outstanding_quantity__gt=0)
+
+
 class PurchaseOrderItem(models.Model):
     purchase_order = models.ForeignKey('PurchaseOrder', on_delete=models.CASCADE, related_name='items')
     item = models.ForeignKey('inventory.Item', on_delete=models.DO_NOTHING)
@@ -335,14 +459,19 @@ class PurchaseOrderItem(models.Model):
     rate = models.FloatField(null=True, blank=True)  
     remarks = models.TextField(null=True, blank=True)
 
+    objects = PurchaseOrderItemQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.item.name} x {self.quantity} (PO#{self.purchase_order.id})"
 
     @property
     def fulfilled_quantity(self):
-        total = InventoryTransaction.objects.filter(
+        # Lines loaded through with_fulfilment() already carry the total
+        if hasattr(self, 'received_quantity'):
+            return self.received_quantity
+        total = self.receipts.filter(
             process_type__code='INWARD',
-            purchase_order_item=self
+            deleted=False,
         ).aggregate(total_received=Sum('quantity'))['total_received'] or 0
         return total
 
@@ -358,25 +487,138 @@ class PurchaseOrderItem(models.Model):
 #     def __str__(self):
 #         return self.name
 
-# class InventoryLog(models.Model):
-#     inventory = models.ForeignKey('Inventory', on_delete=models.CASCADE, null=True, blank=True)
-#     item = models.ForeignKey('Item', on_delete=models.DO_NOTHING, null=True, blank=True)
-#     location = models.ForeignKey('warehouse.Location', on_delete=models.DO_NOTHING, null=True, blank=True)
+class InventoryLog(models.Model):
+    """
+    Append-only stock ledger: one row per movement posted by StockPostingService, carrying
+    the running balance of its (item, location, batch, lot) row before and after the change.
+    """
+    inventory = models.ForeignKey('Inventory', on_delete=models.DO_NOTHING, null=True, blank=True, related_name='logs')
+    item = models.ForeignKey('Item', on_delete=models.DO_NOTHING, null=True, blank=True)
+    location = models.ForeignKey('warehouse.Location', on_delete=models.DO_NOTHING, null=True, blank=True)
+    batch = models.ForeignKey('ItemBatch', on_delete=models.DO_NOTHING, null=True, blank=True)
+    lot = models.ForeignKey('ItemLot', on_delete=models.DO_NOTHING, null=True, blank=True)
 
-#     action_type = models.ForeignKey('InventoryActionType', on_delete=models.SET_NULL, null=True, blank=True)
-#     reference_id = models.IntegerField(null=True, blank=True)       # ID from related model
-#     reference_type = models.CharField(max_length=50, null=True, blank=True)
+    action = models.CharField(max_length=50, null=True, blank=True)  # e.g., 'INWARD', 'TRANSFER_OUT'
+    transaction = models.ForeignKey('InventoryTransaction', on_delete=models.DO_NOTHING, null=True, blank=True, related_name='logs')
+    reference_id = models.IntegerField(null=True, blank=True)       # ID from related model
+    reference_type = models.CharField(max_length=50, null=True, blank=True)
 
-#     quantity_before = models.FloatField(null=True, blank=True)
-#     quantity_changed = models.FloatField(null=True, blank=True)
-#     quantity_after = models.FloatField(null=True, blank=True)
+    quantity_before = models.FloatField(null=True, blank=True)
+    quantity_changed = models.FloatField(null=True, blank=True)
+    quantity_after = models.FloatField(null=True, blank=True)
 
-#     remarks = models.TextField(null=True, blank=True)
-#     changed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
-#     timestamp = models.DateTimeField(auto_now_add=True)
+    remarks = models.TextField(null=True, blank=True)
+    changed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
 
-#     def __str__(self):
-#         return f"{self.item.name} at {self.location.code} - {self.action_type.name if self.action_type else 'Unknown'}"
+    class Meta:
+        ordering = ['-timestamp', '-id']
+        indexes = [
+            models.Index(fields=['inventory', 'timestamp'], name='inventorylog_row_time_idx'),
+            models.Index(fields=['item', 'location', 'timestamp'], name='inventorylog_item_loc_time_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("InventoryLog entries are append-only")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("InventoryLog entries are append-only")
+
+    def __str__(self):
+        return f"{self.item.name if self.item else 'Unknown'} at {self.location.code if self.location else 'Unknown'} - {self.action or 'Unknown'}"
+
+class InventorySnapshot(models.Model):
+    """Closing balance and valuation of one (item, location) at the end of a day"""
+    snapshot_date = models.DateField()
+    item = models.ForeignKey('Item', on_delete=models.DO_NOTHING)
+    location = models.ForeignKey('warehouse.Location', on_delete=models.DO_NOTHING)
+
+    quantity = models.FloatField(default=0)
+    average_rate = models.FloatField(null=True, blank=True)  # moving average cost per unit
+    value = models.FloatField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-snapshot_date', 'item', 'location']
+        constraints = [
+            models.UniqueConstraint(fields=['snapshot_date', 'item', 'location'], name='inventorysnapshot_unique_day'),
+        ]
+        indexes = [
+            models.Index(fields=['item', 'location', 'snapshot_date'], name='inventorysnap_item_loc_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item.name} at {self.location.code} on {self.snapshot_date}: {self.quantity}"
+
+class InventorySummary(models.Model):
+    """Running stock totals per (item, location), kept current by the stock-posting path"""
+    item = models.ForeignKey('Item', on_delete=models.DO_NOTHING)
+    location = models.ForeignKey('warehouse.Location', on_delete=models.DO_NOTHING)
+
+    total_quantity = models.FloatField(default=0)
+    reserved_quantity = models.FloatField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['item', 'location']
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'location'], name='inventorysummary_unique_item_location'),
+        ]
+        indexes = [
+            models.Index(fields=['location', 'item'], name='inventorysum_location_item_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item.name} at {self.location.code}: {self.total_quantity}"
+
+class StockReservation(models.Model):
+    """Quantity of one stock row held for a sales order line or a pickup task"""
+    ACTIVE = 'active'
+    CONSUMED = 'consumed'
+    RELEASED = 'released'
+    EXPIRED = 'expired'
+    STATUS_CHOICES = [
+        (ACTIVE, 'Active'),
+        (CONSUMED, 'Consumed'),
+        (RELEASED, 'Released'),
+        (EXPIRED, 'Expired'),
+    ]
+
+    inventory = models.ForeignKey('Inventory', on_delete=models.DO_NOTHING, related_name='reservations')
+    item = models.ForeignKey('Item', on_delete=models.DO_NOTHING)
+    location = models.ForeignKey('warehouse.Location', on_delete=models.DO_NOTHING)
+
+    sales_order = models.ForeignKey('SalesOrder', on_delete=models.DO_NOTHING, null=True, blank=True, related_name='reservations')
+    sales_order_item = models.ForeignKey('SalesOrderItem', on_delete=models.DO_NOTHING, null=True, blank=True, related_name='reservations')
+    task = models.ForeignKey('tasks.InventoryTask', on_delete=models.DO_NOTHING, null=True, blank=True, related_name='reservations')
+
+    quantity = models.FloatField()
+    consumed_quantity = models.FloatField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=ACTIVE)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, null=True, blank=True, related_name='reservations_created')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='reservation_status_exp_idx'),
+            models.Index(fields=['sales_order', 'status'], name='reservation_order_status_idx'),
+            models.Index(fields=['inventory', 'status'], name='reservation_row_status_idx'),
+        ]
+
+    @property
+    def remaining_quantity(self):
+        return self.quantity - self.consumed_quantity
+
+    def __str__(self):
+        return f"{self.item.name} x {self.quantity} at {self.location.code} ({self.status})"
 
 # class Notification(models.Model):
 #     NOTIFICATION_TYPES = [
@@ -415,6 +657,11 @@ class Customer(models.Model):
     updated_at = models.DateTimeField(auto_now=True,blank=True, null=True)
     deleted = models.BooleanField(default=False,blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], condition=Q(deleted=False), name='customer_live_created_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
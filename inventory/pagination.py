@@ -0,0 +1,91 @@
+import base64
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward cursor pagination on (created_at, id), newest first. Each page is one range read
+    on a (created_at, id) index that continues after the last row of the previous page, so
+    deep pages cost the same as the first and no COUNT(*) is run. Rows without a created_at
+    are served after all others, by id.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        created_at, last_id = self.decode_cursor(request)
+
+        if created_at is None and last_id is None:
+            dated = queryset.filter(created_at__isnull=False)
+        elif created_at is not None:
+            dated = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=last_id))
+        else:
+            dated = None
+
+        rows = list(dated.order_by('-created_at', '-id')[:self.page_size + 1]) if dated is not None else []
+        if len(rows) <= self.page_size:
+            undated = queryset.filter(created_at__isnull=True)
+            if created_at is None and last_id is not None:
+                undated = undated.filter(id__lt=last_id)
+            rows += list(undated.order_by('-id')[:self.page_size + 1 - len(rows)])
+
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+            if requested > 0:
+                return min(requested, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size or 50
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, None
+        try:
+            created_at, last_id = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii').split('|')
+            parsed = parse_datetime(created_at) if created_at else None
+            if created_at and parsed is None:
+                raise ValueError(created_at)
+            return parsed, int(last_id)
+        except (TypeError, ValueError, UnicodeError):
+            raise ValidationError({self.cursor_query_param: [self.invalid_cursor_message]})
+
+    def encode_cursor(self, row):
+        position = f"{row.created_at.isoformat() if row.created_at else ''}|{row.id}"
+        encoded = base64.urlsafe_b64encode(position.encode('ascii')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+def paginator_for(request, default_class):
+    """KeysetPagination when the client opts in (?pagination=cursor or a cursor), else `default_class`"""
+    if request.query_params.get('pagination') == 'cursor' or KeysetPagination.cursor_query_param in request.query_params:
+        return KeysetPagination()
+    return default_class()
@@ -1,5 +1,7 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import *
+from .eager_loading import eager_load
 
 
 class ItemSerializer(serializers.ModelSerializer):
@@ -7,6 +9,45 @@ class ItemSerializer(serializers.ModelSerializer):
         model = Item
         fields = '__all__'
 
+    def _check_code(self, value, code_types):
+        # The item's own primary codes are rewritten on save; any other holder of the code
+        # would fail the ItemCode unique constraints
+        taken = ItemCode.objects.filter(code=value, code_type__in=code_types)
+        if self.instance is not None:
+            taken = taken.exclude(item=self.instance, primary=True)
+        if value and taken.exists():
+            raise serializers.ValidationError("This code is already in use.")
+        return value
+
+    def validate_barcode(self, value):
+        return self._check_code(value, ItemCode.SCAN_TYPES)
+
+    def validate_sku(self, value):
+        return self._check_code(value, [ItemCode.SKU])
+
+class ItemCodeSerializer(serializers.ModelSerializer):
+    item_name = serializers.CharField(source='item.name', read_only=True)
+
+    class Meta:
+        model = ItemCode
+        fields = ['id', 'item', 'item_name', 'code', 'code_type', 'pack_quantity', 'supplier', 'primary', 'created_at']
+        read_only_fields = ['primary', 'created_at']
+
+    def validate_code(self, value):
+        return value.strip()
+
+    def validate(self, data):
+        code_type = data.get('code_type', ItemCode.BARCODE)
+        if code_type == ItemCode.SKU:
+            raise serializers.ValidationError("SKU codes mirror Item.sku; change the item's sku instead.")
+        if code_type == ItemCode.SUPPLIER_PART and not data.get('supplier'):
+            raise serializers.ValidationError("Supplier part numbers require a supplier.")
+        if code_type != ItemCode.SUPPLIER_PART and data.get('supplier'):
+            raise serializers.ValidationError("Only supplier part numbers take a supplier.")
+        if data.get('pack_quantity', 1) <= 0:
+            raise serializers.ValidationError("pack_quantity must be greater than 0.")
+        return data
+
 class ItemCategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = ItemCategory
@@ -88,17 +129,18 @@ class InventorySerializer(serializers.ModelSerializer):
 #         ]
 
 
-# class InventoryLogSerializer(serializers.ModelSerializer):
-#     item_name = serializers.CharField(source='item.name', read_only=True)
-#     location_code = serializers.CharField(source='location.code', read_only=True)
+class InventoryLogSerializer(serializers.ModelSerializer):
+    item_name = serializers.CharField(source='item.name', read_only=True)
+    location_code = serializers.CharField(source='location.code', read_only=True)
 
-#     class Meta:
-#         model = InventoryLog
-#         fields = [
-#             'id', 'item', 'location', 'quantity', 'movement_type',
-#             'reference_id', 'created_at', 'updated_at',
-#             'item_name', 'location_code'
-#             ]
+    class Meta:
+        model = InventoryLog
+        fields = [
+            'id', 'inventory', 'item', 'item_name', 'location', 'location_code',
+            'batch', 'lot', 'action', 'transaction', 'reference_id', 'reference_type',
+            'quantity_before', 'quantity_changed', 'quantity_after',
+            'changed_by', 'timestamp',
+        ]
 
 # class InventoryTransferSerializer(serializers.ModelSerializer):
 #     class Meta:
@@ -166,12 +208,79 @@ class SupplierSerializer(serializers.ModelSerializer):
 
 
 
+class InBulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key field that, inside a BulkCreateListSerializer, looks its id up among the
+    objects the list loaded for every row at once instead of querying per row
+    """
+
+    def to_internal_value(self, data):
+        loaded = getattr(self.parent.parent, 'loaded', {}).get(self.field_name) if self.parent else None
+        if loaded is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in loaded:
+            self.fail('does_not_exist', pk_value=data)
+        return loaded[pk]
+
+
+class BulkCreateListSerializer(serializers.ListSerializer):
+    """
+    Nested lines validated with one in_bulk query per InBulkPrimaryKeyRelatedField across all
+    rows, and written by the parent with a single bulk_create (see create_lines)
+    """
+
+    def to_internal_value(self, data):
+        self.loaded = {}
+        if isinstance(data, list):
+            for name, field in self.child.fields.items():
+                if not isinstance(field, InBulkPrimaryKeyRelatedField) or field.read_only:
+                    continue
+                ids = set()
+                for row in data:
+                    value = row.get(name) if isinstance(row, dict) else None
+                    if isinstance(value, (int, str)) and not isinstance(value, bool) and str(value).isdigit():
+                        ids.add(int(value))
+                self.loaded[name] = field.get_queryset().in_bulk(ids)
+        return super().to_internal_value(data)
+
+    def create_lines(self, rows, **parent):
+        model = self.child.Meta.model
+        return model.objects.bulk_create([model(**parent, **row) for row in rows], batch_size=1000)
+
+
 class PurchaseOrderItemSerializer(serializers.ModelSerializer):
+    item = InBulkPrimaryKeyRelatedField(queryset=Item.objects.all())
     item_name = serializers.CharField(source='item.name', read_only=True)
 
     class Meta:
         model = PurchaseOrderItem
         fields = ['id', 'item', 'item_name', 'quantity', 'rate', 'remarks']
+        list_serializer_class = BulkCreateListSerializer
+
+
+
+class PurchaseOrderFulfilmentSerializer(serializers.ModelSerializer):
+    """PO line with its receipts; expects lines from PurchaseOrderItem.objects.with_fulfilment()"""
+    item_name = serializers.CharField(source='item.name', read_only=True)
+    supplier = serializers.IntegerField(source='purchase_order.supplier_id', read_only=True)
+    supplier_name = serializers.CharField(source='purchase_order.supplier.name', read_only=True)
+    reference_number = serializers.CharField(source='purchase_order.reference_number', read_only=True)
+    expected_delivery_date = serializers.DateField(source='purchase_order.expected_delivery_date', read_only=True)
+    received_quantity = serializers.FloatField(read_only=True)
+    outstanding_quantity = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = PurchaseOrderItem
+        fields = [
+            'id', 'purchase_order', 'reference_number', 'supplier', 'supplier_name', 'expected_delivery_date',
+            'item', 'item_name', 'quantity', 'rate', 'received_quantity', 'outstanding_quantity',
+        ]
 
 
 
@@ -188,18 +297,19 @@ class PurchaseOrderSerializer(serializers.ModelSerializer):
             'created_by', 'created_at',
             'items'
         ]
+        read_only_fields = ['created_by', 'created_at']
 
+    @transaction.atomic
     def create(self, validated_data):
         items_data = validated_data.pop('items')
         request = self.context.get('request')
         created_by = request.user if request else None
 
         po = PurchaseOrder.objects.create(**validated_data, created_by=created_by)
+        self.fields['items'].create_lines(items_data, purchase_order=po)
 
-        for item_data in items_data:
-            PurchaseOrderItem.objects.create(purchase_order=po, **item_data)
-
-        return po
+        # Reload with the order's lines and their items for the response
+        return eager_load(type(self), PurchaseOrder.objects.all()).get(pk=po.pk)
 
 class InventorySummarySerializer(serializers.ModelSerializer):
     item_name = serializers.CharField(source='item.name', read_only=True)
@@ -217,11 +327,13 @@ class CustomerSerializer(serializers.ModelSerializer):
 
 
 class SalesOrderItemSerializer(serializers.ModelSerializer):
+    item = InBulkPrimaryKeyRelatedField(queryset=Item.objects.all())
     item_name = serializers.CharField(source='item.name', read_only=True)
 
     class Meta:
         model = SalesOrderItem
         fields = ['id', 'item', 'item_name', 'quantity', 'rate', 'remarks']
+        list_serializer_class = BulkCreateListSerializer
 
 class SalesOrderSerializer(serializers.ModelSerializer):
     customer_name = serializers.CharField(source='customer.name', read_only=True)
@@ -235,17 +347,16 @@ class SalesOrderSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_by', 'created_at', 'updated_at']
 
+    @transaction.atomic
     def create(self, validated_data):
         items_data = validated_data.pop('items')
         request = self.context.get('request')
         created_by = request.user if request else None
 
         sales_order = SalesOrder.objects.create(created_by=created_by, **validated_data)
+        self.fields['items'].create_lines(items_data, sales_order=sales_order)
 
-        for item_data in items_data:
-            SalesOrderItem.objects.create(sales_order=sales_order, **item_data)
-
-        return sales_order
+        return eager_load(type(self), SalesOrder.objects.all()).get(pk=sales_order.pk)
 
 #! invoice
 class InvoiceSerializer(serializers.ModelSerializer):
@@ -260,3 +371,17 @@ class InvoiceSerializer(serializers.ModelSerializer):
             "invoice_date", "total_amount", "payment_status", "remarks", "created_at"
         ]
 
+
+class StockReservationSerializer(serializers.ModelSerializer):
+    item_name = serializers.CharField(source='item.name', read_only=True)
+    location_code = serializers.CharField(source='location.code', read_only=True)
+    remaining_quantity = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = StockReservation
+        fields = [
+            'id', 'inventory', 'item', 'item_name', 'location', 'location_code',
+            'sales_order', 'sales_order_item', 'task',
+            'quantity', 'consumed_quantity', 'remaining_quantity', 'status', 'expires_at',
+            'created_by', 'created_at',
+        ]
@@ -1,20 +1,40 @@
-from django.db import transaction
+from django.db import IntegrityError, connection, models, transaction
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from django.core.cache import cache
+from . import cache as inventory_cache
+from . import metrics as inventory_metrics
 from rest_framework import status
 from rest_framework.response import Response
 from typing import Dict, Any, Optional, Tuple, List
+import csv
+import json
 import logging
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from enum import Enum
 
 from .models import *
 from tasks.models import *
+from warehouse.models import Location
+from django.contrib.auth import get_user_model
+from django.db.models import (
+    Case, CharField, Count, Expression, ExpressionWrapper, F, FloatField, IntegerField, Max, OuterRef, Q, RowRange,
+    Subquery, Sum, Value, When, Window,
+)
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThanOrEqual
+from datetime import datetime, time, timedelta
+from time import perf_counter
 
 logger = logging.getLogger(__name__)
 
+# Stock reads are invalidated by generation bumps, so the TTL only bounds memory use
+STOCK_CACHE_TIMEOUT = getattr(settings, 'INVENTORY_STOCK_CACHE_TIMEOUT', 3600)
+
 
 class TransactionType(Enum):
     """Enum for transaction types to avoid magic strings"""
@@ -46,6 +66,515 @@ class TransactionResult:
             self.errors = []
 
 
+@dataclass
+class BulkTransactionResult:
+    """Data class for bulk transaction results, one entry in `lines` per submitted line"""
+    success: bool
+    message: str
+    total: int = 0
+    posted: int = 0
+    failed: int = 0
+    lines: List[Dict[str, Any]] = None
+
+    def __post_init__(self):
+        if self.lines is None:
+            self.lines = []
+
+
+@dataclass
+class ItemImportResult:
+    """Data class for catalogue import results, one entry in `errors` per rejected row"""
+    total: int = 0
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: List[Dict[str, Any]] = None
+
+    def __post_init__(self):
+        if self.errors is None:
+            self.errors = []
+
+
+@dataclass
+class CycleCountResult:
+    """Data class for count import results, one entry in `errors` per rejected or unposted row"""
+    reference: str
+    total: int = 0
+    counted: int = 0
+    adjusted: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    errors: List[Dict[str, Any]] = None
+    summary: Dict[str, Any] = None
+    variance: List[Dict[str, Any]] = None  # dry runs only, since their rows are not kept
+
+    def __post_init__(self):
+        if self.errors is None:
+            self.errors = []
+
+
+@dataclass
+class StockMovement:
+    """A signed quantity change against one (item, location, batch, lot) inventory row"""
+    location: Any
+    delta: float
+    action: str
+    must_exist: bool = True
+    guard: Optional[str] = None  # 'available', 'on_hand' or 'non_negative'
+    release: float = 0  # reserved quantity freed by this movement, when it consumes a reservation
+
+
+class LRUCache:
+    """Thread-safe, process-local map that drops its least recently used entries beyond max_size"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys) -> Dict[Any, Any]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = value
+        return found
+
+    def set_many(self, mapping: Dict[Any, Any]) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            for key, value in mapping.items():
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, keys) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class StockKeyIndex(LRUCache):
+    """
+    Process-local LRU map from a stock key (item_id, location_id, batch_id, lot_id) to the
+    Inventory primary key holding it. Entries are hints, not truth: StockPostingService.load
+    verifies every hit against the row it fetches, so nothing here needs invalidating on
+    writes made by other processes.
+    """
+
+
+STOCK_KEY_INDEX = StockKeyIndex(getattr(settings, 'INVENTORY_STOCK_KEY_INDEX_SIZE', 50000))
+SCAN_LOOKUP_CACHE = LRUCache(getattr(settings, 'INVENTORY_SCAN_LOOKUP_CACHE_SIZE', 20000))
+
+
+class ValuesByKey(Expression):
+    """
+    CASE WHEN <key columns> = <key> THEN <value> ... ELSE <default> END over literal keys and
+    values, e.g. ValuesByKey(['pk'], {(1,): 5.0, (2,): -3.0}). It renders the SQL that
+    Case(When(pk=1, then=Value(5.0)), ...) would, but resolves the key columns once instead
+    of one lookup per row, which dominated the cost of grouped UPDATEs over hundreds of rows.
+    """
+
+    def __init__(self, fields: List[str], values: Dict[Tuple, Any], default: Any = None, output_field=None):
+        super().__init__(output_field=output_field)
+        self.columns = [F(field) for field in fields]
+        self.values = values
+        self.default = default
+
+    def get_source_expressions(self):
+        return self.columns
+
+    def set_source_expressions(self, exprs):
+        self.columns = exprs
+
+    def as_sql(self, compiler, connection):
+        columns = [compiler.compile(column) for column in self.columns]
+        whens, params = [], []
+        for key, value in self.values.items():
+            conditions = []
+            for (column_sql, column_params), part in zip(columns, key):
+                conditions.append(f"{column_sql} = %s")
+                params += [*column_params, part]
+            whens.append(f"WHEN {' AND '.join(conditions)} THEN %s")
+            params.append(value)
+        if not whens:
+            return "%s", [self.default]
+        return f"CASE {' '.join(whens)} ELSE %s END", [*params, self.default]
+
+
+class StockPostingService:
+    """
+    Single write path for stock quantities. Every InventoryTransaction reaches Inventory
+    through here exactly once, whether it was posted by InventoryTransactionService, in
+    bulk, or saved directly (admin, fixtures). Rows are read with one query, checked
+    against the movement guards, and changed with one set of UPDATE statements that apply
+    deltas with F() expressions.
+
+    Two posting modes are available through settings.INVENTORY_POSTING_MODE:
+    'locking' (default) reads the rows with SELECT ... FOR UPDATE in primary key order, so
+    transfers touching the same rows in opposite directions cannot deadlock; 'conditional'
+    skips the row locks. In both modes every decrement is written as a conditional UPDATE
+    (quantity - reserved_quantity >= requested), so concurrent pickers can never oversell.
+    """
+
+    UPDATE_CHUNK_SIZE = 500
+    # Stock keys matched per OR'd lookup; SQLite rejects expression trees deeper than 1000
+    KEY_LOOKUP_CHUNK_SIZE = 250
+    DEFER_FLAG = '_stock_posting_deferred'
+    MODE_LOCKING = 'locking'
+    MODE_CONDITIONAL = 'conditional'
+
+    def __init__(self, user, mode: Optional[str] = None, use_index: bool = True):
+        self.user = user
+        self.mode = mode or getattr(settings, 'INVENTORY_POSTING_MODE', self.MODE_LOCKING)
+        self.index = STOCK_KEY_INDEX if use_index else None
+
+    @classmethod
+    def defer(cls, transaction_obj: InventoryTransaction) -> None:
+        """Mark a transaction whose stock will be posted by the caller rather than the post_save signal"""
+        setattr(transaction_obj, cls.DEFER_FLAG, True)
+
+    @classmethod
+    def is_deferred(cls, transaction_obj: InventoryTransaction) -> bool:
+        return getattr(transaction_obj, cls.DEFER_FLAG, False)
+
+    @staticmethod
+    def stock_key(data: Dict[str, Any], movement: StockMovement) -> Tuple:
+        """(item_id, location_id, batch_id, lot_id) of the row a movement applies to"""
+        batch, lot = data.get('batch'), data.get('lot')
+        return (data['item'].id, movement.location.id, batch.id if batch else None, lot.id if lot else None)
+
+    @staticmethod
+    def _key_condition(keys) -> Q:
+        """Rows matching exactly these (item_id, location_id, batch_id, lot_id) keys"""
+        condition = Q(pk__in=[])
+        for item_id, location_id, batch_id, lot_id in keys:
+            condition |= Q(
+                item_id=item_id,
+                location_id=location_id,
+                **({'batch_id': batch_id} if batch_id else {'batch__isnull': True}),
+                **({'lot_id': lot_id} if lot_id else {'lot__isnull': True}),
+            )
+        return condition
+
+    def load(self, keys) -> Dict[Tuple, Dict[str, Any]]:
+        """
+        Load (and in locking mode, lock) the inventory rows for the given stock keys with a single
+        query. Keys found in the stock-key index are fetched by primary key; the rest are matched
+        on their exact key, so only the rows being posted to are locked. Index entries are checked
+        against the row they point at, so a stale entry only costs one extra query.
+        """
+        keys = set(keys)
+        stock = {}
+        if not keys:
+            return stock
+
+        indexed = self.index.get_many(keys) if self.index is not None else {}
+        missing = list(keys - set(indexed))
+        pks = list(indexed.values())
+        # Beyond one chunk of exact keys, the extra keys are resolved to primary keys first
+        # (without locks), so every row is still read and locked by one pk-ordered query
+        for start in range(self.KEY_LOOKUP_CHUNK_SIZE, len(missing), self.KEY_LOOKUP_CHUNK_SIZE):
+            chunk = missing[start:start + self.KEY_LOOKUP_CHUNK_SIZE]
+            pks += Inventory.objects.filter(self._key_condition(chunk)).values_list('pk', flat=True)
+        condition = Q(pk__in=pks) | self._key_condition(missing[:self.KEY_LOOKUP_CHUNK_SIZE])
+
+        rows = Inventory.objects.filter(condition)
+        if self.mode == self.MODE_LOCKING:
+            # Always lock in primary key order to avoid deadlocks between opposing transfers
+            rows = rows.select_for_update().order_by('pk')
+        with inventory_metrics.LOCK_WAIT_SECONDS.time(mode=self.mode):
+            rows = list(rows)
+        for row in rows:
+            key = (row.item_id, row.location_id, row.batch_id, row.lot_id)
+            if key in keys:
+                stock[key] = {
+                    "row": row,
+                    "usable": not row.deleted,
+                    "quantity": row.quantity or 0,
+                    "reserved": row.reserved_quantity or 0,
+                }
+
+        if self.index is not None:
+            stale = set(indexed) - set(stock)
+            if stale:
+                self.index.discard(stale)
+                stock.update(self.load(stale))
+            self.index.set_many({key: state["row"].pk for key, state in stock.items()})
+        return stock
+
+    def plan(self, data: Dict[str, Any], movements: List[StockMovement], stock: Dict[Tuple, Dict[str, Any]]):
+        """
+        Apply one transaction's movements to running balances held in memory.
+        Returns (pending states by key, per-movement before/after, error message or None);
+        `stock` itself is left untouched so a failed transaction can simply be dropped.
+        """
+        pending, results = {}, []
+        for movement in movements:
+            key = self.stock_key(data, movement)
+            state = pending.get(key) or dict(stock.get(key) or {
+                "row": None, "usable": False, "quantity": 0, "reserved": 0,
+            })
+            quantity = state["quantity"]
+
+            if movement.must_exist and not state["usable"]:
+                return {}, [], f"No inventory found for item {data['item'].name} at location {movement.location.code}"
+            if state["row"] is not None and not state["usable"]:
+                # Stock arriving on a soft-deleted row starts it afresh, as a new row would:
+                # what it held when deleted is counted nowhere and is not brought back
+                state.update(usable=True, revive=True, quantity=0, reserved=0)
+                quantity = 0
+
+            requested = -movement.delta
+            reserved = state["reserved"] - movement.release
+            if movement.guard == 'available' and quantity - reserved < requested:
+                return {}, [], f"Insufficient stock. Available: {quantity - reserved}, Requested: {requested}"
+            if movement.guard == 'on_hand' and quantity < requested:
+                return {}, [], f"Insufficient stock at source. Available: {quantity}, Requested: {requested}"
+            if movement.guard == 'non_negative' and quantity + movement.delta < 0:
+                return {}, [], f"Adjustment would result in negative stock: {quantity + movement.delta}"
+
+            if state["row"] is None and "defaults" not in state:
+                quality_status = data.get('quality_status')
+                if movement.action == 'TRANSFER_IN':
+                    source = stock.get(self.stock_key(data, movements[0]))
+                    quality_status = source["row"].quality_status if source and source["row"] else None
+                state["usable"] = True
+                state["defaults"] = {'quality_status': quality_status, 'created_by': self.user}
+
+            state["quantity"] = quantity + movement.delta
+            state["reserved"] = reserved
+            pending[key] = state
+            results.append({"key": key, "quantity_before": quantity, "quantity_after": state["quantity"]})
+
+        return pending, results, None
+
+    def create_missing(self, stock: Dict[Tuple, Dict[str, Any]]) -> None:
+        """Insert the inventory rows first touched by the planned movements"""
+        new_rows = []
+        for (item_id, location_id, batch_id, lot_id), state in stock.items():
+            if state["row"] is None and "defaults" in state:
+                state["row"] = Inventory(
+                    item_id=item_id,
+                    location_id=location_id,
+                    batch_id=batch_id,
+                    lot_id=lot_id,
+                    quantity=0,
+                    reserved_quantity=0,
+                    **state["defaults"],
+                )
+                new_rows.append(state["row"])
+        if not new_rows:
+            return
+
+        try:
+            with transaction.atomic():
+                Inventory.objects.bulk_create(new_rows)
+            if self.index is not None:
+                self.index.set_many({
+                    (row.item_id, row.location_id, row.batch_id, row.lot_id): row.pk
+                    for row in new_rows if row.pk
+                })
+        except IntegrityError:
+            # A concurrent posting created some of these rows after they were loaded;
+            # insert the rest and pick up the existing rows instead.
+            Inventory.objects.bulk_create(new_rows, ignore_conflicts=True)
+            created_keys = [(row.item_id, row.location_id, row.batch_id, row.lot_id) for row in new_rows]
+            reloaded = self.load(created_keys)
+            for key in created_keys:
+                stock[key]["row"] = reloaded[key]["row"]
+
+    @staticmethod
+    def _per_row(chunk, field: str, output_field):
+        """Per-row value of `field` for an UPDATE over `chunk`; a plain value when only one row is updated"""
+        if len(chunk) == 1:
+            return Value(chunk[0][1][field], output_field=output_field)
+        return ValuesByKey(['pk'], {(pk,): update[field] for pk, update in chunk}, output_field=output_field)
+
+    def apply(self, postings: List[Tuple[InventoryTransaction, Dict[str, Any], List[StockMovement]]], stock: Dict[Tuple, Dict[str, Any]]) -> None:
+        """Collapse every movement into one net delta per row and write them with grouped UPDATEs"""
+        row_updates = {}
+        for transaction_obj, data, movements in postings:
+            for movement in movements:
+                state = stock[self.stock_key(data, movement)]
+                row = state["row"]
+                update = row_updates.setdefault(row.pk, {"row": row, "state": state, "delta": 0, "release": 0})
+                update["delta"] += movement.delta
+                update["release"] += movement.release
+                update["action"] = movement.action
+                update["changed"] = movement.delta
+                update["reference_id"] = transaction_obj.id
+                if movement.guard == 'available' or (movement.guard and not update.get("guard")):
+                    update["guard"] = movement.guard
+
+        revived = [pk for pk, update in row_updates.items() if update["state"].pop("revive", False)]
+        for pk in revived:
+            row_updates[pk]["row"].deleted = False
+        if revived:
+            Inventory.objects.filter(pk__in=revived, deleted=True).update(deleted=False, quantity=0, reserved_quantity=0)
+
+        now = timezone.now()
+        pending_updates = list(row_updates.items())
+        for start in range(0, len(pending_updates), self.UPDATE_CHUNK_SIZE):
+            chunk = pending_updates[start:start + self.UPDATE_CHUNK_SIZE]
+
+            # Net decrements only apply while the row still holds enough stock: on hand (less
+            # what stays reserved, for the 'available' guard) must cover the decrement
+            guarded = {pk: update for pk, update in chunk if update.get("guard") and update["delta"] < 0}
+            condition = Q(pk__in=[pk for pk, _ in chunk if pk not in guarded])
+            if guarded:
+                headroom = Coalesce(F('quantity'), Value(0.0)) - Coalesce(F('reserved_quantity'), Value(0.0)) * ValuesByKey(
+                    ['pk'], {(pk,): 1.0 if update["guard"] == 'available' else 0.0 for pk, update in guarded.items()},
+                    default=0.0, output_field=FloatField(),
+                )
+                needed = ValuesByKey(
+                    ['pk'],
+                    {
+                        (pk,): -update["delta"] - (update["release"] if update["guard"] == 'available' else 0)
+                        for pk, update in guarded.items()
+                    },
+                    default=0.0, output_field=FloatField(),
+                )
+                condition |= Q(pk__in=list(guarded)) & GreaterThanOrEqual(headroom, needed)
+
+            reserved = {}
+            if any(update["release"] for _, update in chunk):
+                reserved["reserved_quantity"] = Coalesce(F('reserved_quantity'), Value(0.0)) - self._per_row(chunk, "release", FloatField())
+
+            updated = Inventory.objects.filter(condition).update(
+                **reserved,
+                quantity=Coalesce(F('quantity'), Value(0.0)) + self._per_row(chunk, "delta", FloatField()),
+                last_action=self._per_row(chunk, "action", CharField()),
+                last_changed_quantity=self._per_row(chunk, "changed", FloatField()),
+                last_reference_id=self._per_row(chunk, "reference_id", IntegerField()),
+                last_reference_type='InventoryTransaction',
+                updated_by=self.user,
+                updated_at=now,
+            )
+            if updated != len(chunk):
+                raise ValidationError("Insufficient stock: quantities changed while posting, please retry")
+
+        summary_deltas = {}
+        for update in row_updates.values():
+            key = (update["row"].item_id, update["row"].location_id)
+            quantity, reserved = summary_deltas.get(key, (0, 0))
+            summary_deltas[key] = (quantity + update["delta"], reserved - update["release"])
+        InventorySummaryService.apply_deltas(summary_deltas)
+        inventory_cache.bump_on_commit(
+            items={item_id for item_id, _ in summary_deltas},
+            locations={location_id for _, location_id in summary_deltas},
+        )
+
+        self._write_ledger(postings, stock, now)
+
+    def _write_ledger(self, postings, stock: Dict[Tuple, Dict[str, Any]], now) -> None:
+        """
+        Append one InventoryLog entry per movement with a single INSERT. Running balances are
+        walked back from each row's final quantity: the planned value in locking mode, or the
+        value read back under the UPDATE's write lock in conditional mode.
+        """
+        rows = {}
+        for _, data, movements in postings:
+            for movement in movements:
+                state = stock[self.stock_key(data, movement)]
+                rows[state["row"].pk] = state
+        running = {pk: state["quantity"] for pk, state in rows.items()}
+        if self.mode != self.MODE_LOCKING:
+            running.update(Inventory.objects.filter(pk__in=list(rows)).values_list('pk', 'quantity'))
+
+        entries = []
+        for transaction_obj, data, movements in reversed(postings):
+            for movement in reversed(movements):
+                row = stock[self.stock_key(data, movement)]["row"]
+                quantity_after = running[row.pk] or 0
+                running[row.pk] = quantity_after - movement.delta
+                entries.append(InventoryLog(
+                    inventory_id=row.pk,
+                    item_id=row.item_id,
+                    location_id=row.location_id,
+                    batch_id=row.batch_id,
+                    lot_id=row.lot_id,
+                    action=movement.action,
+                    transaction_id=transaction_obj.id,
+                    reference_id=transaction_obj.id,
+                    reference_type='InventoryTransaction',
+                    quantity_before=running[row.pk],
+                    quantity_changed=movement.delta,
+                    quantity_after=quantity_after,
+                    changed_by=self.user,
+                    timestamp=now,
+                ))
+        entries.reverse()
+        InventoryLog.objects.bulk_create(entries, batch_size=self.UPDATE_CHUNK_SIZE)
+
+    def post(self, transaction_obj: InventoryTransaction, data: Dict[str, Any], movements: List[StockMovement]) -> List[Dict[str, Any]]:
+        """
+        Post the movements of one saved transaction.
+        Returns the inventory row and quantity before/after for each movement;
+        raises ValidationError if a movement cannot be applied.
+        """
+        stock = self.load(self.stock_key(data, movement) for movement in movements)
+        pending, results, error = self.plan(data, movements, stock)
+        if error:
+            raise ValidationError(error)
+
+        stock.update(pending)
+        self.create_missing(stock)
+        self.apply([(transaction_obj, data, movements)], stock)
+
+        for result in results:
+            result["inventory"] = stock[result.pop("key")]["row"]
+        return results
+
+    def post_transaction(self, transaction_obj: InventoryTransaction) -> List[Dict[str, Any]]:
+        """Post a transaction that was saved directly instead of through InventoryTransactionService"""
+        processor_class = PROCESSOR_CLASSES.get(transaction_obj.process_type.code)
+        if not processor_class:
+            return []
+
+        # Batch and lot numbers are unique across items; an unknown number is an error rather
+        # than a silent post to the item's unbatched stock
+        errors = []
+        references = {}
+        for field, model, number in (
+            ('batch', ItemBatch, transaction_obj.batch_number),
+            ('lot', ItemLot, transaction_obj.lot_number),
+        ):
+            references[field] = model.objects.filter(**{f'{field}_number': number}).first() if number else None
+            if number and not references[field]:
+                errors.append(f"Unknown {field} number: {number}")
+        if errors:
+            raise ValidationError(errors)
+
+        data = {
+            'item': transaction_obj.item,
+            'location': transaction_obj.location,
+            'from_location': transaction_obj.from_location,
+            'to_location': transaction_obj.to_location,
+            'quantity': transaction_obj.quantity,
+            'batch': references['batch'],
+            'lot': references['lot'],
+            'is_defective': transaction_obj.is_defective,
+        }
+
+        processor = processor_class(self.user)
+        errors = processor.validate_fields(data)
+        if errors:
+            raise ValidationError(errors)
+        return self.post(transaction_obj, data, processor.stock_movements(data))
+
+
 class TransactionProcessor(ABC):
     """Abstract base class for transaction processors"""
     
@@ -62,6 +591,15 @@ class TransactionProcessor(ABC):
         """Validate transaction data and return list of errors"""
         pass
 
+    def validate_fields(self, data: Dict[str, Any]) -> List[str]:
+        """Validate transaction data without querying stock (used by bulk posting)"""
+        return self.validate(data)
+
+    @abstractmethod
+    def stock_movements(self, data: Dict[str, Any]) -> List[StockMovement]:
+        """Describe the inventory rows this transaction touches and the delta on each"""
+        pass
+
 
 class InwardProcessor(TransactionProcessor):
     """Processor for inward transactions"""
@@ -74,50 +612,38 @@ class InwardProcessor(TransactionProcessor):
             errors.append("Location is required for inward transaction")
         if not data.get('quantity') or data['quantity'] <= 0:
             errors.append("Valid quantity is required for inward transaction")
+        errors.extend(self._validate_purchase_order_item(data))
         return errors
+
+    def _validate_purchase_order_item(self, data: Dict[str, Any]) -> List[str]:
+        """An inward may receive against a PO line, which must be for the same item (and order, if given)"""
+        line = data.get('purchase_order_item')
+        if not line:
+            return []
+        if not isinstance(line, PurchaseOrderItem):
+            line = data['purchase_order_item'] = PurchaseOrderItem.objects.filter(pk=line).first()
+            if not line:
+                return ["Purchase order line not found"]
+
+        purchase_order = data.get('purchase_order')
+        if (
+            (data.get('item') and data['item'].id != line.item_id)
+            or (purchase_order and purchase_order.id != line.purchase_order_id)
+        ):
+            return [f"Purchase order line {line.pk} is not for this item and purchase order"]
+        return []
+
+    def stock_movements(self, data: Dict[str, Any]) -> List[StockMovement]:
+        return [StockMovement(data['location'], data['quantity'], 'INWARD', must_exist=False)]
     
     def process(self, transaction_obj: InventoryTransaction, data: Dict[str, Any]) -> Dict[str, Any]:
-        item = transaction_obj.item
-        location = transaction_obj.location
         quantity = transaction_obj.quantity
-        
-        # Get or create inventory record with caching
-        cache_key = f"inventory_{item.id}_{location.id}_{data.get('batch', '')}_{data.get('lot', '')}"
-        inventory = cache.get(cache_key)
-        
-        if not inventory:
-            inventory, created = Inventory.objects.get_or_create(
-                item=item,
-                location=location,
-                batch=data.get('batch'),
-                lot=data.get('lot'),
-                defaults={
-                    'quantity': 0,
-                    'reserved_quantity': 0,
-                    'quality_status': data.get('quality_status'),
-                    'expiry_date': data.get('expiry_date'),
-                    'created_by': self.user,
-                }
-            )
-            cache.set(cache_key, inventory, 300)  # Cache for 5 minutes
-        
-        # Update inventory
-        old_quantity = inventory.quantity or 0
-        inventory.quantity = old_quantity + quantity
-        inventory.updated_by = self.user
-        inventory.last_action = 'INWARD'
-        inventory.last_changed_quantity = quantity
-        inventory.last_reference_id = transaction_obj.id
-        inventory.last_reference_type = 'InventoryTransaction'
-        inventory.save()
-        
-        # Invalidate cache
-        cache.delete(cache_key)
+        posting, = StockPostingService(self.user).post(transaction_obj, data, self.stock_movements(data))
         
         return {
             "inventory_updated": True,
-            "quantity_before": old_quantity,
-            "quantity_after": inventory.quantity,
+            "quantity_before": posting["quantity_before"],
+            "quantity_after": posting["quantity_after"],
             "quantity_added": quantity,
         }
 
@@ -125,7 +651,7 @@ class InwardProcessor(TransactionProcessor):
 class OutwardProcessor(TransactionProcessor):
     """Processor for outward transactions"""
     
-    def validate(self, data: Dict[str, Any]) -> List[str]:
+    def validate_fields(self, data: Dict[str, Any]) -> List[str]:
         errors = []
         if not data.get('item'):
             errors.append("Item is required for outward transaction")
@@ -133,70 +659,70 @@ class OutwardProcessor(TransactionProcessor):
             errors.append("Location is required for outward transaction")
         if not data.get('quantity') or data['quantity'] <= 0:
             errors.append("Valid quantity is required for outward transaction")
+        errors.extend(self._validate_reservation(data))
+        return errors
+
+    def _validate_reservation(self, data: Dict[str, Any]) -> List[str]:
+        """An outward may consume a reservation on the row it picks from; batch and lot default to the reserved row's"""
+        reservation = data.get('reservation')
+        if not reservation:
+            return []
+        if not isinstance(reservation, StockReservation):
+            reservation = data['reservation'] = StockReservation.objects.select_related('inventory').filter(pk=reservation).first()
+            if not reservation:
+                return ["Reservation not found"]
+        if reservation.status != StockReservation.ACTIVE:
+            return [f"Reservation {reservation.pk} is {reservation.status}"]
+
+        row = reservation.inventory
+        data['batch'] = data.get('batch') or row.batch
+        data['lot'] = data.get('lot') or row.lot
+        if (
+            (data.get('item') and data['item'].id != row.item_id)
+            or (data.get('location') and data['location'].id != row.location_id)
+            or (data['batch'].id if data['batch'] else None) != row.batch_id
+            or (data['lot'].id if data['lot'] else None) != row.lot_id
+        ):
+            return [f"Reservation {reservation.pk} does not cover this item, location, batch and lot"]
+        return []
+
+    @staticmethod
+    def reserved_release(data: Dict[str, Any]) -> float:
+        """Reserved quantity an outward frees by consuming its reservation"""
+        reservation = data.get('reservation')
+        return min(data['quantity'], reservation.remaining_quantity) if reservation else 0
+
+    def validate(self, data: Dict[str, Any]) -> List[str]:
+        errors = self.validate_fields(data)
         
         # Check stock availability
-        if data.get('item') and data.get('location'):
-            available = self._check_stock_availability(
-                data['item'], data['location'], data['quantity'],
-                data.get('batch'), data.get('lot')
+        if not errors:
+            available = InventoryValidationService.available_quantity(
+                data['item'], data['location'], data.get('batch'), data.get('lot')
             )
-            if not available:
+            if available is None or available + self.reserved_release(data) < data['quantity']:
                 errors.append("Insufficient stock available")
         
         return errors
-    
-    def _check_stock_availability(self, item, location, quantity, batch=None, lot=None) -> bool:
-        try:
-            inventory = Inventory.objects.get(
-                item=item,
-                location=location,
-                batch=batch,
-                lot=lot,
-                deleted=False
-            )
-            available_quantity = (inventory.quantity or 0) - (inventory.reserved_quantity or 0)
-            return available_quantity >= quantity
-        except Inventory.DoesNotExist:
-            return False
+
+    def stock_movements(self, data: Dict[str, Any]) -> List[StockMovement]:
+        return [StockMovement(
+            data['location'], -data['quantity'], 'OUTWARD', guard='available', release=self.reserved_release(data),
+        )]
     
     def process(self, transaction_obj: InventoryTransaction, data: Dict[str, Any]) -> Dict[str, Any]:
-        item = transaction_obj.item
-        location = transaction_obj.location
         quantity = transaction_obj.quantity
         
-        # Get inventory record
-        try:
-            inventory = Inventory.objects.get(
-                item=item,
-                location=location,
-                batch=data.get('batch'),
-                lot=data.get('lot'),
-                deleted=False
-            )
-        except Inventory.DoesNotExist:
-            raise ValidationError(f"No inventory found for item {item.name} at location {location.code}")
-        
-        # Check stock availability again (double-check)
-        available_quantity = (inventory.quantity or 0) - (inventory.reserved_quantity or 0)
-        if available_quantity < quantity:
-            raise ValidationError(
-                f"Insufficient stock. Available: {available_quantity}, Requested: {quantity}"
-            )
-        
-        # Update inventory
-        old_quantity = inventory.quantity or 0
-        inventory.quantity = old_quantity - quantity
-        inventory.updated_by = self.user
-        inventory.last_action = 'OUTWARD'
-        inventory.last_changed_quantity = -quantity
-        inventory.last_reference_id = transaction_obj.id
-        inventory.last_reference_type = 'InventoryTransaction'
-        inventory.save()
+        # Stock availability is checked again against the locked row while posting
+        movement, = self.stock_movements(data)
+        posting, = StockPostingService(self.user).post(transaction_obj, data, [movement])
+        if movement.release:
+            StockReservationService(self.user).consume({data['reservation'].pk: movement.release})
         
         return {
             "inventory_updated": True,
-            "quantity_before": old_quantity,
-            "quantity_after": inventory.quantity,
+            "quantity_before": posting["quantity_before"],
+            "quantity_after": posting["quantity_after"],
             "quantity_deducted": quantity,
         }
 
@@ -204,7 +730,7 @@ class OutwardProcessor(TransactionProcessor):
 class TransferProcessor(TransactionProcessor):
     """Processor for transfer transactions"""
     
-    def validate(self, data: Dict[str, Any]) -> List[str]:
+    def validate_fields(self, data: Dict[str, Any]) -> List[str]:
         errors = []
         if not data.get('item'):
             errors.append("Item is required for transfer transaction")
@@ -217,6 +743,10 @@ class TransferProcessor(TransactionProcessor):
         
         if data.get('from_location') == data.get('to_location'):
             errors.append("From and to locations cannot be the same")
+        return errors
+
+    def validate(self, data: Dict[str, Any]) -> List[str]:
+        errors = self.validate_fields(data)
         
         # Check source stock availability
         if data.get('item') and data.get('from_location') and data.get('quantity'):
@@ -241,71 +771,25 @@ class TransferProcessor(TransactionProcessor):
             return (inventory.quantity or 0) >= quantity
         except Inventory.DoesNotExist:
             return False
+
+    def stock_movements(self, data: Dict[str, Any]) -> List[StockMovement]:
+        return [
+            StockMovement(data['from_location'], -data['quantity'], 'TRANSFER_OUT', guard='on_hand'),
+            StockMovement(data['to_location'], data['quantity'], 'TRANSFER_IN', must_exist=False),
+        ]
     
     def process(self, transaction_obj: InventoryTransaction, data: Dict[str, Any]) -> Dict[str, Any]:
-        item = transaction_obj.item
-        from_location = transaction_obj.from_location
-        to_location = transaction_obj.to_location
         quantity = transaction_obj.quantity
         
-        # Get source inventory
-        try:
-            source_inventory = Inventory.objects.get(
-                item=item,
-                location=from_location,
-                batch=data.get('batch'),
-                lot=data.get('lot'),
-                deleted=False
-            )
-        except Inventory.DoesNotExist:
-            raise ValidationError(f"No inventory found at source location {from_location.code}")
-        
-        # Check source stock availability
-        source_quantity = source_inventory.quantity or 0
-        if source_quantity < quantity:
-            raise ValidationError(
-                f"Insufficient stock at source. Available: {source_quantity}, Requested: {quantity}"
-            )
-        
-        # Get or create destination inventory
-        dest_inventory, created = Inventory.objects.get_or_create(
-            item=item,
-            location=to_location,
-            batch=data.get('batch'),
-            lot=data.get('lot'),
-            defaults={
-                'quantity': 0,
-                'reserved_quantity': 0,
-                'quality_status': source_inventory.quality_status,
-                'expiry_date': source_inventory.expiry_date,
-                'created_by': self.user,
-            }
-        )
-        
-        # Update both inventories atomically
-        source_inventory.quantity = source_quantity - quantity
-        source_inventory.updated_by = self.user
-        source_inventory.last_action = 'TRANSFER_OUT'
-        source_inventory.last_changed_quantity = -quantity
-        source_inventory.last_reference_id = transaction_obj.id
-        source_inventory.last_reference_type = 'InventoryTransaction'
-        source_inventory.save()
-        
-        dest_old_quantity = dest_inventory.quantity or 0
-        dest_inventory.quantity = dest_old_quantity + quantity
-        dest_inventory.updated_by = self.user
-        dest_inventory.last_action = 'TRANSFER_IN'
-        dest_inventory.last_changed_quantity = quantity
-        dest_inventory.last_reference_id = transaction_obj.id
-        dest_inventory.last_reference_type = 'InventoryTransaction'
-        dest_inventory.save()
+        # Both rows are updated in the same posting
+        source, dest = StockPostingService(self.user).post(transaction_obj, data, self.stock_movements(data))
         
         return {
             "inventory_updated": True,
-            "source_quantity_before": source_quantity,
-            "source_quantity_after": source_inventory.quantity,
-            "dest_quantity_before": dest_old_quantity,
-            "dest_quantity_after": dest_inventory.quantity,
+            "source_quantity_before": source["quantity_before"],
+            "source_quantity_after": source["quantity_after"],
+            "dest_quantity_before": dest["quantity_before"],
+            "dest_quantity_after": dest["quantity_after"],
             "quantity_transferred": quantity,
         }
 
@@ -323,44 +807,23 @@ class AdjustmentProcessor(TransactionProcessor):
             errors.append("Quantity is required for adjustment transaction")
         
         return errors
+
+    def stock_movements(self, data: Dict[str, Any]) -> List[StockMovement]:
+        guard = None if data.get('allow_negative', False) else 'non_negative'
+        # Counts and opening balances may find stock where the system holds no row yet
+        must_exist = not data.get('create_missing', False)
+        return [StockMovement(data['location'], data['quantity'], 'ADJUSTMENT', must_exist=must_exist, guard=guard)]
     
     def process(self, transaction_obj: InventoryTransaction, data: Dict[str, Any]) -> Dict[str, Any]:
-        item = transaction_obj.item
-        location = transaction_obj.location
         adjustment_quantity = transaction_obj.quantity
         
-        # Get inventory record
-        try:
-            inventory = Inventory.objects.get(
-                item=item,
-                location=location,
-                batch=data.get('batch'),
-                lot=data.get('lot'),
-                deleted=False
-            )
-        except Inventory.DoesNotExist:
-            raise ValidationError(f"No inventory found for item {item.name} at location {location.code}")
-        
-        # Update inventory
-        old_quantity = inventory.quantity or 0
-        new_quantity = old_quantity + adjustment_quantity
-        
-        # Prevent negative stock unless explicitly allowed
-        if new_quantity < 0 and not data.get('allow_negative', False):
-            raise ValidationError(f"Adjustment would result in negative stock: {new_quantity}")
-        
-        inventory.quantity = new_quantity
-        inventory.updated_by = self.user
-        inventory.last_action = 'ADJUSTMENT'
-        inventory.last_changed_quantity = adjustment_quantity
-        inventory.last_reference_id = transaction_obj.id
-        inventory.last_reference_type = 'InventoryTransaction'
-        inventory.save()
+        # Negative stock is rejected while posting unless explicitly allowed
+        posting, = StockPostingService(self.user).post(transaction_obj, data, self.stock_movements(data))
         
         return {
             "inventory_updated": True,
-            "quantity_before": old_quantity,
-            "quantity_after": new_quantity,
+            "quantity_before": posting["quantity_before"],
+            "quantity_after": posting["quantity_after"],
             "adjustment_amount": adjustment_quantity,
         }
 
@@ -378,39 +841,33 @@ class ReturnProcessor(TransactionProcessor):
             errors.append("Valid quantity is required for return transaction")
         
         return errors
+
+    def stock_movements(self, data: Dict[str, Any]) -> List[StockMovement]:
+        # Defective returns are recorded but never restocked
+        if data.get('is_defective', False):
+            return []
+        return [StockMovement(data['location'], data['quantity'], 'RETURN')]
     
     def process(self, transaction_obj: InventoryTransaction, data: Dict[str, Any]) -> Dict[str, Any]:
-        item = transaction_obj.item
-        location = transaction_obj.location
         return_quantity = transaction_obj.quantity
         is_defective = transaction_obj.is_defective
         
-        # Get inventory record
-        try:
-            inventory = Inventory.objects.get(
-                item=item,
-                location=location,
-                batch=data.get('batch'),
-                lot=data.get('lot'),
-                deleted=False
-            )
-        except Inventory.DoesNotExist:
-            raise ValidationError(f"No inventory found for item {item.name} at location {location.code}")
-        
-        old_quantity = inventory.quantity or 0
-        
         # Only update stock if not defective
         if not is_defective:
-            inventory.quantity = old_quantity + return_quantity
-            inventory.updated_by = self.user
-            inventory.last_action = 'RETURN'
-            inventory.last_changed_quantity = return_quantity
-            inventory.last_reference_id = transaction_obj.id
-            inventory.last_reference_type = 'InventoryTransaction'
-            inventory.save()
-            new_quantity = inventory.quantity
+            posting, = StockPostingService(self.user).post(transaction_obj, data, self.stock_movements(data))
+            old_quantity, new_quantity = posting["quantity_before"], posting["quantity_after"]
         else:
-            new_quantity = old_quantity
+            try:
+                inventory = Inventory.objects.get(
+                    item=transaction_obj.item,
+                    location=transaction_obj.location,
+                    batch=data.get('batch'),
+                    lot=data.get('lot'),
+                    deleted=False
+                )
+            except Inventory.DoesNotExist:
+                raise ValidationError(f"No inventory found for item {transaction_obj.item.name} at location {transaction_obj.location.code}")
+            old_quantity = new_quantity = inventory.quantity or 0
         
         return {
             "inventory_updated": not is_defective,
@@ -421,6 +878,15 @@ class ReturnProcessor(TransactionProcessor):
         }
 
 
+PROCESSOR_CLASSES = {
+    TransactionType.INWARD.value: InwardProcessor,
+    TransactionType.OUTWARD.value: OutwardProcessor,
+    TransactionType.TRANSFER.value: TransferProcessor,
+    TransactionType.ADJUSTMENT.value: AdjustmentProcessor,
+    TransactionType.RETURN.value: ReturnProcessor,
+}
+
+
 class TaskManager:
     """Manages task creation for transactions"""
     
@@ -458,20 +924,56 @@ class TaskManager:
         except Exception as e:
             logger.warning(f"Failed to create related tasks: {e}")
             # Don't fail the transaction if task creation fails
-        
+
+        self._count_tasks(tasks_created)
         return {
             "tasks_created": [task.id for task in tasks_created],
             "task_count": len(tasks_created)
         }
+
+    def create_related_tasks_bulk(self, pairs: List[Tuple[InventoryTransaction, Dict[str, Any]]]) -> Dict[int, List[int]]:
+        """Create related tasks for many saved transactions with a single insert.
+        Returns a mapping of transaction id to created task ids."""
+        builders = {
+            TransactionType.INWARD.value: self._create_putaway_task,
+            TransactionType.OUTWARD.value: self._create_pickup_task,
+            TransactionType.TRANSFER.value: self._create_transfer_task,
+        }
+        tasks = []
+        try:
+            for transaction_obj, data in pairs:
+                builder = builders.get(transaction_obj.process_type.code)
+                task = builder(transaction_obj, data, commit=False) if builder else None
+                if task:
+                    tasks.append(task)
+            InventoryTask.objects.bulk_create(tasks)
+        except Exception as e:
+            logger.warning(f"Failed to create related tasks: {e}")
+            # Don't fail the batch if task creation fails
+            return {}
+
+        self._count_tasks(tasks)
+        tasks_by_transaction = {}
+        for task in tasks:
+            tasks_by_transaction.setdefault(task.transaction_id, []).append(task.id)
+        return tasks_by_transaction
+
+    @staticmethod
+    def _count_tasks(tasks: List[InventoryTask]) -> None:
+        counts = {}
+        for task in tasks:
+            counts[task.task_type.code] = counts.get(task.task_type.code, 0) + 1
+        for code, count in counts.items():
+            inventory_metrics.TASKS_CREATED.inc(count, task_type=code)
     
-    def _create_putaway_task(self, transaction_obj: InventoryTransaction, data: Dict[str, Any]) -> Optional[InventoryTask]:
+    def _create_putaway_task(self, transaction_obj: InventoryTransaction, data: Dict[str, Any], commit: bool = True) -> Optional[InventoryTask]:
         """Create putaway task for inward transaction"""
         task_type = self.task_types.get('PUTAWAY')
         if not task_type:
             logger.warning("PUTAWAY task type not configured")
             return None
         
-        return InventoryTask.objects.create(
+        task = InventoryTask(
             task_type=task_type,
             transaction=transaction_obj,
             item=transaction_obj.item,
@@ -480,15 +982,18 @@ class TaskManager:
             assigned_to=data.get('assigned_to'),
             created_by=self.user,
         )
+        if commit:
+            task.save()
+        return task
     
-    def _create_pickup_task(self, transaction_obj: InventoryTransaction, data: Dict[str, Any]) -> Optional[InventoryTask]:
+    def _create_pickup_task(self, transaction_obj: InventoryTransaction, data: Dict[str, Any], commit: bool = True) -> Optional[InventoryTask]:
         """Create pickup task for outward transaction"""
         task_type = self.task_types.get('PICKUP')
         if not task_type:
             logger.warning("PICKUP task type not configured")
             return None
         
-        return InventoryTask.objects.create(
+        task = InventoryTask(
             task_type=task_type,
             transaction=transaction_obj,
             item=transaction_obj.item,
@@ -497,15 +1002,18 @@ class TaskManager:
             assigned_to=data.get('assigned_to'),
             created_by=self.user,
         )
+        if commit:
+            task.save()
+        return task
     
-    def _create_transfer_task(self, transaction_obj: InventoryTransaction, data: Dict[str, Any]) -> Optional[InventoryTask]:
+    def _create_transfer_task(self, transaction_obj: InventoryTransaction, data: Dict[str, Any], commit: bool = True) -> Optional[InventoryTask]:
         """Create transfer task for transfer transaction"""
         task_type = self.task_types.get('TRANSFER')
         if not task_type:
             logger.warning("TRANSFER task type not configured")
             return None
         
-        return InventoryTask.objects.create(
+        task = InventoryTask(
             task_type=task_type,
             transaction=transaction_obj,
             item=transaction_obj.item,
@@ -515,6 +1023,9 @@ class TaskManager:
             assigned_to=data.get('assigned_to'),
             created_by=self.user,
         )
+        if commit:
+            task.save()
+        return task
 
 
 class InventoryTransactionService:
@@ -524,40 +1035,42 @@ class InventoryTransactionService:
         self.user = user
         self.process_types = self._get_process_types()
         self.task_manager = TaskManager(user)
+        self.stock_posting = StockPostingService(user)
         self.processors = self._get_processors()
     
     def _get_process_types(self) -> Dict[str, InventoryProcessType]:
         """Cache process types for better performance"""
-        cache_key = "inventory_process_types"
-        process_types = cache.get(cache_key)
-        
-        if not process_types:
-            process_types = {
-                pt.code: pt for pt in InventoryProcessType.objects.filter(is_active=True)
-            }
-            cache.set(cache_key, process_types, 3600)  # Cache for 1 hour
-        
-        return process_types
+        return inventory_cache.get_or_set(
+            "process_types",
+            lambda: {pt.code: pt for pt in InventoryProcessType.objects.filter(is_active=True)},
+            scopes=[inventory_cache.PROCESS_TYPES],
+        )
     
     def _get_processors(self) -> Dict[str, TransactionProcessor]:
         """Get processor instances"""
-        return {
-            TransactionType.INWARD.value: InwardProcessor(self.user),
-            TransactionType.OUTWARD.value: OutwardProcessor(self.user),
-            TransactionType.TRANSFER.value: TransferProcessor(self.user),
-            TransactionType.ADJUSTMENT.value: AdjustmentProcessor(self.user),
-            TransactionType.RETURN.value: ReturnProcessor(self.user),
-        }
+        return {code: processor_class(self.user) for code, processor_class in PROCESSOR_CLASSES.items()}
     
     def create_transaction(self, data: Dict[str, Any]) -> TransactionResult:
         """
         Centralized method to create any type of inventory transaction
         Returns: TransactionResult object
         """
+        started = perf_counter()
+        result = self._create_transaction(data)
+        if result.success:
+            inventory_metrics.TRANSACTIONS_POSTED.inc(process_type=result.process_type, path='single')
+            inventory_metrics.POSTING_SECONDS.observe(perf_counter() - started, process_type=result.process_type)
+        return result
+
+    def _failed(self, process_type: str, reason: str, count: int = 1) -> None:
+        inventory_metrics.TRANSACTION_FAILURES.inc(count, process_type=process_type or "", reason=reason)
+
+    def _create_transaction(self, data: Dict[str, Any]) -> TransactionResult:
         try:
             # Validate process type
             process_type_code = data.get('process_type')
             if not process_type_code:
+                self._failed("", 'process_type')
                 return TransactionResult(
                     success=False,
                     transaction_id=0,
@@ -567,6 +1080,7 @@ class InventoryTransactionService:
                 )
             
             if process_type_code not in self.process_types:
+                self._failed(process_type_code, 'process_type')
                 return TransactionResult(
                     success=False,
                     transaction_id=0,
@@ -578,6 +1092,7 @@ class InventoryTransactionService:
             # Get processor and validate
             processor = self.processors.get(process_type_code)
             if not processor:
+                self._failed(process_type_code, 'process_type')
                 return TransactionResult(
                     success=False,
                     transaction_id=0,
@@ -589,6 +1104,7 @@ class InventoryTransactionService:
             # Validate transaction data
             validation_errors = processor.validate(data)
             if validation_errors:
+                self._failed(process_type_code, 'validation')
                 return TransactionResult(
                     success=False,
                     transaction_id=0,
@@ -626,6 +1142,7 @@ class InventoryTransactionService:
                 
         except ValidationError as e:
             logger.error(f"Validation error in transaction creation: {e}")
+            self._failed(data.get('process_type', ''), 'stock')
             return TransactionResult(
                 success=False,
                 transaction_id=0,
@@ -635,6 +1152,7 @@ class InventoryTransactionService:
             )
         except Exception as e:
             logger.error(f"Error creating inventory transaction: {e}")
+            self._failed(data.get('process_type', ''), 'error')
             return TransactionResult(
                 success=False,
                 transaction_id=0,
@@ -645,6 +1163,14 @@ class InventoryTransactionService:
     
     def _create_transaction_record(self, data: Dict[str, Any]) -> InventoryTransaction:
         """Create the base transaction record"""
+        transaction_obj = self._build_transaction_record(data)
+        # The processor posts the stock, so the post_save handler must not post it again
+        StockPostingService.defer(transaction_obj)
+        transaction_obj.save()
+        return transaction_obj
+
+    def _build_transaction_record(self, data: Dict[str, Any]) -> InventoryTransaction:
+        """Build the base transaction record without saving it"""
         process_type_code = data['process_type']
         
         # Set required fields
@@ -652,9 +1178,12 @@ class InventoryTransactionService:
             'process_type': self.process_types[process_type_code],
             'item': data['item'],
             'quantity': data['quantity'],
+            'rate': data.get('rate'),
             'created_by': self.user,
             'remarks': data.get('remarks', ''),
             'reference_number': data.get('reference_number', ''),
+            'batch_number': data['batch'].batch_number if data.get('batch') else None,
+            'lot_number': data['lot'].lot_number if data.get('lot') else None,
         }
         
         # Set location fields based on transaction type
@@ -671,6 +1200,7 @@ class InventoryTransactionService:
             transaction_data.update({
                 'supplier': data.get('supplier'),
                 'purchase_order': data.get('purchase_order'),
+                'purchase_order_item': data.get('purchase_order_item'),
                 'delivery_note': data.get('delivery_note'),
                 'invoice_number': data.get('invoice_number'),
                 'payment_terms': data.get('payment_terms'),
@@ -678,6 +1208,7 @@ class InventoryTransactionService:
             })
         elif process_type_code == TransactionType.OUTWARD.value:
             transaction_data.update({
+                'sales_order': data.get('sales_order'),
                 'is_dispatched': data.get('is_dispatched', False),
                 'dispatched_by': self.user if data.get('is_dispatched') else None,
                 'dispatched_at': timezone.now() if data.get('is_dispatched') else None,
@@ -685,67 +1216,1841 @@ class InventoryTransactionService:
         elif process_type_code == TransactionType.RETURN.value:
             transaction_data['is_defective'] = data.get('is_defective', False)
         
-        return InventoryTransaction.objects.create(**transaction_data)
+        transaction_obj = InventoryTransaction(**transaction_data)
+        if transaction_obj.purchase_order_item and not transaction_obj.purchase_order_id:
+            transaction_obj.purchase_order_id = transaction_obj.purchase_order_item.purchase_order_id
+        return transaction_obj
 
+    # ------------------- BULK POSTING ------------------- #
+    BULK_MAX_LINES = 5000
+    BULK_UPDATE_CHUNK_SIZE = 500
+    BULK_REFERENCE_FIELDS = (
+        'item', 'location', 'from_location', 'to_location', 'batch', 'lot',
+        'quality_status', 'supplier', 'purchase_order', 'purchase_order_item', 'sales_order', 'assigned_to',
+        'reservation',
+    )
 
-class InventoryValidationService:
-    """Service for validating inventory operations with caching"""
-    
-    @staticmethod
-    def validate_stock_availability(item: Item, location: Location, quantity: float, 
-                                 batch=None, lot=None) -> bool:
-        """Validate if sufficient stock is available with caching"""
-        cache_key = f"stock_availability_{item.id}_{location.id}_{batch}_{lot}"
-        result = cache.get(cache_key)
-        
-        if result is None:
-            try:
-                inventory = Inventory.objects.get(
-                    item=item,
-                    location=location,
-                    batch=batch,
-                    lot=lot,
-                    deleted=False
+    def create_transactions_bulk(self, lines: List[Dict[str, Any]], all_or_nothing: bool = False) -> BulkTransactionResult:
+        """
+        Validate and post many inventory transactions in one database transaction.
+        References are resolved with one query per model, affected inventory rows are
+        prefetched in one query, transaction rows are written with bulk_create and the
+        stock deltas are applied with grouped UPDATE statements.
+        Returns: BulkTransactionResult with a per-line outcome
+        """
+        if not isinstance(lines, list) or not lines:
+            return BulkTransactionResult(
+                success=False,
+                message="A non-empty list of transactions is required",
+            )
+
+        if len(lines) > self.BULK_MAX_LINES:
+            return BulkTransactionResult(
+                success=False,
+                message=f"At most {self.BULK_MAX_LINES} transactions can be posted per request",
+                total=len(lines),
+                failed=len(lines),
+            )
+
+        outcomes = [
+            {"line": index, "success": False, "transaction_id": 0, "errors": []}
+            for index in range(len(lines))
+        ]
+
+        started = perf_counter()
+        try:
+            prepared = self._prepare_bulk_lines(lines, outcomes)
+
+            with transaction.atomic():
+                stock = self.stock_posting.load(
+                    self.stock_posting.stock_key(data, movement)
+                    for _, data, movements in prepared for movement in movements
                 )
-                available_quantity = (inventory.quantity or 0) - (inventory.reserved_quantity or 0)
-                result = available_quantity >= quantity
-                cache.set(cache_key, result, 60)  # Cache for 1 minute
-            except Inventory.DoesNotExist:
-                result = False
-                cache.set(cache_key, result, 60)
-        
-        return result
-    
-    @staticmethod
-    def validate_item_exists(item_id: int) -> bool:
-        """Validate if item exists and is active with caching"""
-        cache_key = f"item_exists_{item_id}"
-        result = cache.get(cache_key)
-        
-        if result is None:
-            try:
-                item = Item.objects.get(id=item_id, deleted=False, is_active=True)
-                result = True
-                cache.set(cache_key, result, 300)  # Cache for 5 minutes
-            except Item.DoesNotExist:
-                result = False
-                cache.set(cache_key, result, 300)
-        
-        return result
-    
-    @staticmethod
+                postings = self._check_bulk_stock(prepared, stock, outcomes)
+
+                if all_or_nothing and len(postings) < len(lines):
+                    for index, _, _ in postings:
+                        outcomes[index].pop("quantity_before", None)
+                        outcomes[index].pop("quantity_after", None)
+                        outcomes[index]["errors"].append("Not posted because other lines in the batch failed")
+                        self._failed(outcomes[index]["process_type"], 'batch_rejected')
+                    postings = []
+
+                if postings:
+                    self._post_bulk(postings, stock, outcomes)
+
+        except Exception as e:
+            logger.error(f"Error creating inventory transactions in bulk: {e}")
+            self._failed("", 'error', len(lines))
+            return BulkTransactionResult(
+                success=False,
+                message="Internal server error",
+                total=len(lines),
+                failed=len(lines),
+                lines=[
+                    {"line": index, "success": False, "transaction_id": 0, "errors": [str(e)]}
+                    for index in range(len(lines))
+                ],
+            )
+
+        inventory_metrics.BULK_POSTING_SECONDS.observe(perf_counter() - started)
+        posted_by_type = {}
+        for outcome in outcomes:
+            if outcome["success"]:
+                posted_by_type[outcome["process_type"]] = posted_by_type.get(outcome["process_type"], 0) + 1
+        for process_type_code, count in posted_by_type.items():
+            inventory_metrics.TRANSACTIONS_POSTED.inc(count, process_type=process_type_code, path='bulk')
+
+        posted = sum(1 for outcome in outcomes if outcome["success"])
+        return BulkTransactionResult(
+            success=posted > 0,
+            message=f"{posted} of {len(lines)} transactions posted",
+            total=len(lines),
+            posted=posted,
+            failed=len(lines) - posted,
+            lines=outcomes,
+        )
+
+    def _resolve_bulk_references(self, lines: List[Dict[str, Any]]) -> Dict[str, Dict[Any, Any]]:
+        """Load every referenced object with one in_bulk query per model"""
+        models_by_field = {
+            'item': Item,
+            'location': Location,
+            'from_location': Location,
+            'to_location': Location,
+            'batch': ItemBatch,
+            'lot': ItemLot,
+            'quality_status': QualityStatus,
+            'supplier': Supplier,
+            'purchase_order': PurchaseOrder,
+            'purchase_order_item': PurchaseOrderItem,
+            'sales_order': SalesOrder,
+            'assigned_to': get_user_model(),
+            'reservation': StockReservation,
+        }
+        querysets = {StockReservation: StockReservation.objects.select_related('inventory')}
+
+        ids_by_model = {}
+        for line in lines:
+            if not isinstance(line, dict):
+                continue
+            for field in self.BULK_REFERENCE_FIELDS:
+                value = line.get(field)
+                if value in (None, '') or isinstance(value, models.Model):
+                    continue
+                try:
+                    ids_by_model.setdefault(models_by_field[field], set()).add(int(value))
+                except (TypeError, ValueError):
+                    continue
+
+        loaded = {
+            model: querysets.get(model, model.objects).in_bulk(ids)
+            for model, ids in ids_by_model.items()
+        }
+        return {field: loaded.get(model, {}) for field, model in models_by_field.items()}
+
+    def _prepare_bulk_lines(self, lines: List[Dict[str, Any]], outcomes: List[Dict[str, Any]]) -> List[Tuple[int, Dict[str, Any], List[StockMovement]]]:
+        """Resolve references and validate every line without touching stock"""
+        references = self._resolve_bulk_references(lines)
+        prepared = []
+
+        for index, line in enumerate(lines):
+            errors = outcomes[index]["errors"]
+            if not isinstance(line, dict):
+                errors.append("Each transaction must be an object")
+                self._failed("", 'invalid_data')
+                continue
+
+            data = dict(line)
+            process_type_code = data.get('process_type')
+            outcomes[index]["process_type"] = process_type_code or ""
+            if not process_type_code:
+                errors.append("Process type is required")
+                self._failed("", 'process_type')
+                continue
+
+            processor = self.processors.get(process_type_code)
+            if process_type_code not in self.process_types or not processor:
+                errors.append(f"Invalid process type: {process_type_code}")
+                self._failed(process_type_code, 'process_type')
+                continue
+
+            for field in self.BULK_REFERENCE_FIELDS:
+                value = data.get(field)
+                if value in (None, ''):
+                    data[field] = None
+                    continue
+                if isinstance(value, models.Model):
+                    continue
+                try:
+                    data[field] = references[field].get(int(value))
+                except (TypeError, ValueError):
+                    data[field] = None
+                if data[field] is None:
+                    errors.append(f"Invalid {field}: {value}")
+
+            try:
+                data['quantity'] = float(data['quantity']) if data.get('quantity') not in (None, '') else None
+            except (TypeError, ValueError):
+                errors.append(f"Invalid quantity: {data.get('quantity')}")
+                self._failed(process_type_code, 'invalid_data')
+                continue
+
+            if errors:
+                self._failed(process_type_code, 'invalid_data')
+                continue
+
+            errors.extend(processor.validate_fields(data))
+            if errors:
+                self._failed(process_type_code, 'validation')
+                continue
+
+            prepared.append((index, data, processor.stock_movements(data)))
+
+        return prepared
+
+    def _check_bulk_stock(self, prepared, stock: Dict[Tuple, Dict[str, Any]], outcomes: List[Dict[str, Any]]):
+        """
+        Plan every line in order against running balances, so later lines see the
+        effect of earlier ones exactly as sequential posting would.
+        Returns the lines that can be posted.
+        """
+        postings = []
+        for index, data, movements in prepared:
+            pending, results, error = self.stock_posting.plan(data, movements, stock)
+            if error:
+                outcomes[index]["errors"].append(error)
+                self._failed(data['process_type'], 'stock')
+                continue
+
+            outcomes[index]["quantity_before"] = results[0]["quantity_before"] if results else 0
+            outcomes[index]["quantity_after"] = results[0]["quantity_after"] if results else 0
+            stock.update(pending)
+            postings.append((index, data, movements))
+
+        return postings
+
+    def _post_bulk(self, postings, stock: Dict[Tuple, Dict[str, Any]], outcomes: List[Dict[str, Any]]) -> None:
+        """Write inventory rows, transaction rows, grouped stock updates and tasks"""
+        self.stock_posting.create_missing(stock)
+
+        transactions = [self._build_transaction_record(data) for _, data, _ in postings]
+        InventoryTransaction.objects.bulk_create(transactions, batch_size=self.BULK_UPDATE_CHUNK_SIZE)
+
+        self.stock_posting.apply(
+            [(transaction_obj, data, movements) for (_, data, movements), transaction_obj in zip(postings, transactions)],
+            stock,
+        )
+        # bulk_create skips post_save, so the rating update that single inwards get from
+        # signals.update_supplier_rating_on_inward is applied here
+        SupplierRatingService.record_inwards(transactions)
+
+        consumptions = {}
+        for _, data, movements in postings:
+            if data.get('reservation') and movements[0].release:
+                consumptions[data['reservation'].pk] = consumptions.get(data['reservation'].pk, 0) + movements[0].release
+        if consumptions:
+            StockReservationService(self.user, self.stock_posting.mode).consume(consumptions)
+
+        tasks = self.task_manager.create_related_tasks_bulk(
+            [(transaction_obj, data) for (_, data, _), transaction_obj in zip(postings, transactions)]
+        )
+
+        for (index, _, _), transaction_obj in zip(postings, transactions):
+            outcomes[index].update({
+                "success": True,
+                "transaction_id": transaction_obj.id,
+                "tasks_created": tasks.get(transaction_obj.id, []),
+            })
+
+class SupplierRatingService:
+    """Supplier on-time ratings, nudged up or down by every inward received against a purchase order"""
+
+    @staticmethod
+    def rate(rating: float, delay_days: int) -> float:
+        if delay_days > 2:
+            return round(max(rating - 0.2, 1.0), 2)
+        if delay_days > 0:
+            return round(max(rating - 0.1, 1.0), 2)
+        return round(min(rating + 0.1, 5.0), 2)
+
+    @classmethod
+    def record_inwards(cls, transactions: List[InventoryTransaction]) -> None:
+        """Apply the rating change of each inward in order, with one write per supplier"""
+        inwards = [
+            transaction_obj for transaction_obj in transactions
+            if transaction_obj.purchase_order_id and transaction_obj.process_type.code == TransactionType.INWARD.value
+        ]
+        if not inwards:
+            return
+
+        suppliers = Supplier.objects.in_bulk({transaction_obj.purchase_order.supplier_id for transaction_obj in inwards})
+        # Each step is kept as the column would store it, so a batch ends where the same
+        # inwards posted one at a time would
+        rating_field = Supplier._meta.get_field('supplier_rating')
+        rated = {}
+        for transaction_obj in inwards:
+            po = transaction_obj.purchase_order
+            supplier = suppliers.get(po.supplier_id)
+            if supplier is None:
+                continue
+            expected_date = po.expected_delivery_date
+            actual_date = timezone.localdate(transaction_obj.created_at) if transaction_obj.created_at else None
+            delay_days = (actual_date - expected_date).days if expected_date and actual_date else 0
+            supplier.supplier_rating = rating_field.get_prep_value(cls.rate(supplier.supplier_rating or 5.0, delay_days))
+            rated[supplier.pk] = supplier
+
+        for supplier in rated.values():
+            supplier.save()
+
+
+class StockBalanceService:
+    """Point-in-time stock balances: the latest daily snapshot plus a ledger range scan since it"""
+
+    @staticmethod
+    def opening_balances(**filters) -> Dict[Tuple[int, int], float]:
+        """
+        Stock that predates the ledger per (item, location): the opening balance of each row's
+        first ledger entry, or the quantity of a live row the ledger has never touched. Only
+        needed until the first snapshot exists.
+        """
+        first_entry = InventoryLog.objects.filter(
+            inventory=OuterRef('pk')
+        ).order_by('timestamp', 'id').values('quantity_before')[:1]
+        rows = StockSnapshotService._filter(
+            Inventory.objects.filter(item__isnull=False, location__isnull=False), **filters
+        ).annotate(
+            opening=Coalesce(
+                Subquery(first_entry, output_field=FloatField()),
+                Case(When(deleted=False, then=F('quantity')), default=Value(0.0), output_field=FloatField()),
+                Value(0.0),
+            )
+        ).values_list('item', 'location', 'opening')
+
+        balances = {}
+        for item_id, location_id, opening in rows:
+            balances[item_id, location_id] = balances.get((item_id, location_id), 0) + opening
+        return balances
+
+    @classmethod
+    def balances_as_of(cls, as_of, item=None, location=None, warehouse=None) -> List[Dict[str, Any]]:
+        """
+        Quantity per (item, location) as of `as_of`: the closing quantities of the latest
+        snapshot taken on or before that instant, plus the ledger deltas in
+        (end of the snapshot day, as_of]. Rows deleted since `as_of` still count, as the
+        ledger records what they held at the time.
+        """
+        filters = {"item": item, "location": location, "warehouse": warehouse}
+        day = timezone.localtime(as_of).date()
+        if as_of < StockSnapshotService.end_of_day(day):
+            day -= timedelta(days=1)
+        # Every (item, location) holding stock gets a row in each day's snapshot, so one
+        # snapshot day covers all keys and a missing row means nothing was held
+        snapshot_date = InventorySnapshot.objects.filter(snapshot_date__lte=day).aggregate(
+            latest=Max('snapshot_date')
+        )['latest']
+
+        logs = InventoryLog.objects.filter(timestamp__lte=as_of, item__isnull=False, location__isnull=False)
+        if snapshot_date is None:
+            balances = cls.opening_balances(**filters)
+        else:
+            balances = {
+                (item_id, location_id): quantity
+                for item_id, location_id, quantity in StockSnapshotService._filter(
+                    InventorySnapshot.objects.filter(snapshot_date=snapshot_date), **filters
+                ).values_list('item', 'location', 'quantity')
+            }
+            logs = logs.filter(timestamp__gt=StockSnapshotService.end_of_day(snapshot_date))
+
+        deltas = StockSnapshotService._filter(logs, **filters).values('item', 'location').annotate(
+            delta=Sum('quantity_changed')
+        ).order_by().values_list('item', 'location', 'delta')
+        for item_id, location_id, delta in deltas:
+            balances[item_id, location_id] = balances.get((item_id, location_id), 0) + (delta or 0)
+
+        items = Item.objects.in_bulk({item_id for item_id, _ in balances})
+        locations = Location.objects.in_bulk({location_id for _, location_id in balances})
+        return [
+            {
+                "item": item_id,
+                "item__name": items[item_id].name if item_id in items else None,
+                "location": location_id,
+                "location__code": locations[location_id].code if location_id in locations else None,
+                "quantity_as_of": quantity,
+            }
+            for (item_id, location_id), quantity in sorted(balances.items())
+        ]
+
+
+class StockSnapshotService:
+    """
+    Daily (item, location) closing balances with moving-average valuation. Historical
+    questions are answered from the latest snapshot on or before the day asked for plus a
+    scan of the ledger since that snapshot, never from the full transaction history.
+    """
+
+    @staticmethod
+    def end_of_day(day):
+        return timezone.make_aware(datetime.combine(day, time.max))
+
+    @staticmethod
+    def _filter(queryset, item=None, location=None, warehouse=None):
+        if item:
+            queryset = queryset.filter(item_id=item)
+        if location:
+            queryset = queryset.filter(location_id=location)
+        if warehouse:
+            queryset = queryset.filter(location__warehouse_id=warehouse)
+        return queryset
+
+    @classmethod
+    def ledger_movements(cls, start, end, **filters) -> Dict[Tuple[int, int], Dict[str, float]]:
+        """Net, inward and outward quantities plus purchase value per (item, location) in (start, end]"""
+        logs = InventoryLog.objects.filter(timestamp__lte=end)
+        if start is not None:
+            logs = logs.filter(timestamp__gt=start)
+        logs = cls._filter(logs, **filters)
+
+        purchases = Q(action=TransactionType.INWARD.value, transaction__rate__isnull=False)
+        rows = logs.values('item', 'location').annotate(
+            delta=Sum('quantity_changed'),
+            quantity_in=Sum('quantity_changed', filter=Q(quantity_changed__gt=0)),
+            quantity_out=Sum('quantity_changed', filter=Q(quantity_changed__lt=0)),
+            purchased_quantity=Sum('quantity_changed', filter=purchases),
+            purchased_value=Sum(F('quantity_changed') * F('transaction__rate'), filter=purchases),
+        ).order_by()
+
+        return {
+            (row['item'], row['location']): {
+                "delta": row['delta'] or 0,
+                "quantity_in": row['quantity_in'] or 0,
+                "quantity_out": -(row['quantity_out'] or 0),
+                "purchased_quantity": row['purchased_quantity'] or 0,
+                "purchased_value": row['purchased_value'] or 0,
+            }
+            for row in rows
+        }
+
+    @staticmethod
+    def _roll_forward(opening: Dict[Tuple[int, int], Dict[str, Any]],
+                      movements: Dict[Tuple[int, int], Dict[str, float]]) -> Dict[Tuple[int, int], Dict[str, Any]]:
+        """
+        Apply a period's movements to opening balances. Cost is a moving average per item
+        (not per location), so transfers move stock without changing its value per unit.
+        """
+        items = {}
+        for (item_id, _), balance in opening.items():
+            held = items.setdefault(item_id, {"quantity": 0, "average_rate": None, "purchased_quantity": 0, "purchased_value": 0})
+            held["quantity"] += balance["quantity"]
+            if held["average_rate"] is None:
+                held["average_rate"] = balance["average_rate"]
+        for (item_id, _), movement in movements.items():
+            held = items.setdefault(item_id, {"quantity": 0, "average_rate": None, "purchased_quantity": 0, "purchased_value": 0})
+            held["purchased_quantity"] += movement["purchased_quantity"]
+            held["purchased_value"] += movement["purchased_value"]
+
+        for held in items.values():
+            if held["purchased_quantity"] > 0:
+                quantity = max(held["quantity"], 0)
+                held["average_rate"] = (
+                    (quantity * (held["average_rate"] or 0) + held["purchased_value"])
+                    / (quantity + held["purchased_quantity"])
+                )
+
+        closing = {}
+        for key in set(opening) | set(movements):
+            quantity = opening.get(key, {}).get("quantity", 0) + movements.get(key, {}).get("delta", 0)
+            average_rate = items[key[0]]["average_rate"]
+            closing[key] = {
+                "quantity": quantity,
+                "average_rate": average_rate,
+                "value": quantity * (average_rate or 0),
+            }
+        return closing
+
+    @staticmethod
+    def _location_scope(location=None, warehouse=None) -> Optional[set]:
+        """Location ids a location/warehouse filter keeps, or None for every location"""
+        if not location and not warehouse:
+            return None
+        locations = Location.objects.all()
+        if location:
+            locations = locations.filter(pk=location)
+        if warehouse:
+            locations = locations.filter(warehouse_id=warehouse)
+        return set(locations.values_list('pk', flat=True))
+
+    @staticmethod
+    def _in_scope(rows: Dict[Tuple[int, int], Any], locations: Optional[set]) -> Dict[Tuple[int, int], Any]:
+        if locations is None:
+            return rows
+        return {key: row for key, row in rows.items() if key[1] in locations}
+
+    @classmethod
+    def balances_on(cls, day, item=None, location=None, warehouse=None) -> Dict[Tuple[int, int], Dict[str, Any]]:
+        """
+        Closing quantity and value per (item, location) at the end of `day`. The moving
+        average is per item, so balances are worked out across every location of the items
+        asked for and only then narrowed to the location or warehouse.
+        """
+        balances = cls._item_balances_on(day, item=item)
+        return cls._in_scope(balances, cls._location_scope(location, warehouse))
+
+    @classmethod
+    def _item_balances_on(cls, day, **filters) -> Dict[Tuple[int, int], Dict[str, Any]]:
+        snapshot_date = cls._filter(
+            InventorySnapshot.objects.filter(snapshot_date__lte=day), **filters
+        ).aggregate(latest=Max('snapshot_date'))['latest']
+
+        if snapshot_date is None:
+            # Nothing snapshotted yet: open with whatever stock predates the ledger, then
+            # replay the whole ledger once so purchases are averaged in order
+            movements = cls.ledger_movements(None, cls.end_of_day(day), **filters)
+            balances = {
+                key: {"quantity": quantity, "average_rate": None, "value": 0}
+                for key, quantity in StockBalanceService.opening_balances(**filters).items()
+            }
+        else:
+            balances = {
+                (snapshot.item_id, snapshot.location_id): {
+                    "quantity": snapshot.quantity,
+                    "average_rate": snapshot.average_rate,
+                    "value": snapshot.value,
+                }
+                for snapshot in cls._filter(InventorySnapshot.objects.filter(snapshot_date=snapshot_date), **filters)
+            }
+            if snapshot_date == day:
+                return balances
+            movements = cls.ledger_movements(cls.end_of_day(snapshot_date), cls.end_of_day(day), **filters)
+
+        return cls._roll_forward(balances, movements)
+
+    @classmethod
+    def take_snapshot(cls, day) -> int:
+        """Materialize closing balances for `day`; re-running replaces that day's rows"""
+        balances = cls.balances_on(day - timedelta(days=1))
+        movements = cls.ledger_movements(cls.end_of_day(day - timedelta(days=1)), cls.end_of_day(day))
+
+        balances = cls._roll_forward(balances, movements)
+
+        snapshots = [
+            InventorySnapshot(
+                snapshot_date=day,
+                item_id=item_id,
+                location_id=location_id,
+                quantity=balance["quantity"],
+                average_rate=balance["average_rate"],
+                value=balance["value"],
+            )
+            for (item_id, location_id), balance in balances.items()
+            if balance["quantity"] or (item_id, location_id) in movements
+        ]
+
+        with transaction.atomic():
+            InventorySnapshot.objects.filter(snapshot_date=day).delete()
+            InventorySnapshot.objects.bulk_create(snapshots, batch_size=1000)
+        return len(snapshots)
+
+    @classmethod
+    def run_scheduled(cls, until=None) -> List[Tuple[Any, int]]:
+        """
+        Scheduler hook: snapshot every completed day since the last snapshot, up to and
+        including `until` (default: yesterday). Safe to call from cron as often as wanted.
+        """
+        until = until or timezone.localdate() - timedelta(days=1)
+        latest = InventorySnapshot.objects.aggregate(latest=Max('snapshot_date'))['latest']
+        if latest is None:
+            first_log = InventoryLog.objects.order_by('timestamp').values_list('timestamp', flat=True).first()
+            latest = (timezone.localtime(first_log).date() if first_log else until) - timedelta(days=1)
+
+        taken = []
+        day = latest + timedelta(days=1)
+        while day <= until:
+            taken.append((day, cls.take_snapshot(day)))
+            day += timedelta(days=1)
+        return taken
+
+    @classmethod
+    def period_report(cls, date_from, date_to, item=None, location=None, warehouse=None) -> List[Dict[str, Any]]:
+        """Opening balance, inward, outward and closing balance per (item, location) for a period"""
+        opening = cls._item_balances_on(date_from - timedelta(days=1), item=item)
+        movements = cls.ledger_movements(cls.end_of_day(date_from - timedelta(days=1)), cls.end_of_day(date_to), item=item)
+        closing = cls._in_scope(cls._roll_forward(opening, movements), cls._location_scope(location, warehouse))
+        empty = {"quantity": 0, "value": 0}
+
+        report = []
+        for key in sorted(closing):
+            movement = movements.get(key, {})
+            report.append({
+                "item": key[0],
+                "location": key[1],
+                "opening_quantity": opening.get(key, empty)["quantity"],
+                "opening_value": opening.get(key, empty)["value"],
+                "quantity_in": movement.get("quantity_in", 0),
+                "quantity_out": movement.get("quantity_out", 0),
+                "closing_quantity": closing[key]["quantity"],
+                "closing_value": closing[key]["value"],
+            })
+        return report
+
+
+class InventorySummaryService:
+    """Keeps InventorySummary in step with Inventory without re-aggregating the whole table"""
+
+    UPDATE_CHUNK_SIZE = 500
+
+    @classmethod
+    def apply_deltas(cls, deltas: Dict[Tuple[int, int], Tuple[float, float]]) -> None:
+        """
+        Add (quantity, reserved) deltas to the summary rows of the given (item, location) keys.
+        Increments are applied as `F() + delta` so concurrent postings commute.
+        """
+        deltas = {key: delta for key, delta in deltas.items() if key[0] and key[1] and any(delta)}
+        if not deltas:
+            return
+
+        InventorySummary.objects.bulk_create(
+            [InventorySummary(item_id=item_id, location_id=location_id) for item_id, location_id in deltas],
+            ignore_conflicts=True,
+            batch_size=cls.UPDATE_CHUNK_SIZE,
+        )
+
+        pending = list(deltas.items())
+        for start in range(0, len(pending), cls.UPDATE_CHUNK_SIZE):
+            chunk = pending[start:start + cls.UPDATE_CHUNK_SIZE]
+            condition = Q()
+            for (item_id, location_id), _ in chunk:
+                condition |= Q(item_id=item_id, location_id=location_id)
+
+            InventorySummary.objects.filter(condition).update(
+                total_quantity=F('total_quantity') + ValuesByKey(
+                    ['item_id', 'location_id'],
+                    {key: float(quantity) for key, (quantity, _) in chunk},
+                    default=0.0,
+                    output_field=FloatField(),
+                ),
+                reserved_quantity=F('reserved_quantity') + ValuesByKey(
+                    ['item_id', 'location_id'],
+                    {key: float(reserved) for key, (_, reserved) in chunk},
+                    default=0.0,
+                    output_field=FloatField(),
+                ),
+                updated_at=timezone.now(),
+            )
+
+    @staticmethod
+    def _totals(rows):
+        return rows.filter(
+            deleted=False, item__isnull=False, location__isnull=False
+        ).values('item', 'location').annotate(
+            total=Sum('quantity'), reserved=Sum('reserved_quantity')
+        ).order_by()
+
+    @classmethod
+    def refresh(cls, keys) -> None:
+        """Recompute the summary rows of specific (item, location) keys from Inventory"""
+        keys = {key for key in keys if key[0] and key[1]}
+        if not keys:
+            return
+
+        rows = Inventory.objects.filter(
+            item_id__in={item_id for item_id, _ in keys},
+            location_id__in={location_id for _, location_id in keys},
+        )
+        totals = {(row['item'], row['location']): row for row in cls._totals(rows)}
+
+        now = timezone.now()
+        InventorySummary.objects.bulk_create(
+            [
+                InventorySummary(
+                    item_id=item_id,
+                    location_id=location_id,
+                    total_quantity=totals.get((item_id, location_id), {}).get('total') or 0,
+                    reserved_quantity=totals.get((item_id, location_id), {}).get('reserved') or 0,
+                    updated_at=now,
+                )
+                for item_id, location_id in keys
+            ],
+            update_conflicts=True,
+            unique_fields=['item', 'location'],
+            update_fields=['total_quantity', 'reserved_quantity', 'updated_at'],
+            batch_size=cls.UPDATE_CHUNK_SIZE,
+        )
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls) -> int:
+        """Recompute the whole summary table, e.g. after stock was edited with raw SQL"""
+        InventorySummary.objects.all().delete()
+        summaries = InventorySummary.objects.bulk_create(
+            [
+                InventorySummary(
+                    item_id=row['item'],
+                    location_id=row['location'],
+                    total_quantity=row['total'] or 0,
+                    reserved_quantity=row['reserved'] or 0,
+                )
+                for row in cls._totals(Inventory.objects.all()).iterator()
+            ],
+            batch_size=cls.UPDATE_CHUNK_SIZE,
+        )
+        return len(summaries)
+
+
+class StockReservationService:
+    """
+    Places, consumes and releases StockReservation rows while keeping Inventory.reserved_quantity
+    (and the InventorySummary reserved totals) in step. Reserving is a conditional UPDATE that
+    only succeeds while quantity - reserved_quantity still covers the request, so concurrent
+    order entry cannot reserve the same stock twice.
+    """
+
+    UPDATE_CHUNK_SIZE = 500
+    DEFAULT_TTL = timedelta(minutes=getattr(settings, 'INVENTORY_RESERVATION_TTL_MINUTES', 24 * 60))
+    TOLERANCE = 1e-9
+
+    def __init__(self, user, mode: Optional[str] = None):
+        self.user = user
+        self.stock_posting = StockPostingService(user, mode)
+
+    def default_expiry(self):
+        return timezone.now() + self.DEFAULT_TTL
+
+    @staticmethod
+    def available(item, location=None, warehouse=None) -> float:
+        """Unreserved quantity of an item from the summary table: one indexed read"""
+        summaries = InventorySummary.objects.filter(item=item)
+        if location:
+            summaries = summaries.filter(location=location)
+        if warehouse:
+            summaries = summaries.filter(location__warehouse=warehouse)
+        return summaries.aggregate(
+            available=Sum(F('total_quantity') - F('reserved_quantity'))
+        )['available'] or 0
+
+    @staticmethod
+    def allocation_order() -> List[Any]:
+        """Order in which candidate stock rows are drawn down"""
+        return StockAllocationService.ordering(StockAllocationService.FIFO)
+
+    def candidate_rows(self, item_ids, location=None, warehouse=None):
+        """Stock rows with unreserved quantity for the given items, locked in locking mode"""
+        rows = Inventory.objects.filter(
+            item_id__in=item_ids,
+            deleted=False,
+            quantity__gt=Coalesce(F('reserved_quantity'), Value(0.0)),
+        )
+        if location:
+            rows = rows.filter(location=location)
+        if warehouse:
+            rows = rows.filter(location__warehouse=warehouse)
+        if self.stock_posting.mode == StockPostingService.MODE_LOCKING:
+            rows = rows.select_for_update()
+        return rows.order_by(*self.allocation_order())
+
+    def _adjust_reserved(self, changes: Dict[int, Dict[str, Any]]) -> None:
+        """
+        Apply reserved-quantity deltas ({inventory_pk: {"row", "delta"}}) with grouped UPDATEs.
+        Increases are conditional on the row still having that much unreserved stock.
+        """
+        pending = [(pk, change) for pk, change in changes.items() if change["delta"]]
+        for start in range(0, len(pending), self.UPDATE_CHUNK_SIZE):
+            chunk = pending[start:start + self.UPDATE_CHUNK_SIZE]
+
+            condition = Q(pk__in=[pk for pk, change in chunk if change["delta"] < 0])
+            for pk, change in chunk:
+                if change["delta"] > 0:
+                    condition |= Q(
+                        pk=pk, deleted=False,
+                        quantity__gte=Coalesce(F('reserved_quantity'), Value(0.0)) + Value(change["delta"]),
+                    )
+
+            updated = Inventory.objects.filter(condition).update(
+                reserved_quantity=Coalesce(F('reserved_quantity'), Value(0.0)) + StockPostingService._per_row(
+                    chunk, "delta", FloatField()
+                ),
+                updated_by=self.user,
+                updated_at=timezone.now(),
+            )
+            if updated != len(chunk):
+                raise ValidationError("Insufficient available stock: quantities changed while reserving, please retry")
+
+        summary_deltas = {}
+        for _, change in pending:
+            key = (change["row"].item_id, change["row"].location_id)
+            summary_deltas[key] = (0, summary_deltas.get(key, (0, 0))[1] + change["delta"])
+        InventorySummaryService.apply_deltas(summary_deltas)
+        inventory_cache.bump_on_commit(
+            items={item_id for item_id, _ in summary_deltas},
+            locations={location_id for _, location_id in summary_deltas},
+        )
+
+    @transaction.atomic
+    def reserve(self, inventory: Inventory, quantity: float, sales_order_item: Optional[SalesOrderItem] = None,
+                task=None, expires_at=None) -> StockReservation:
+        """Reserve `quantity` of one stock row"""
+        if not quantity or quantity <= 0:
+            raise ValidationError("Valid quantity is required for a reservation")
+
+        current = Inventory.objects.filter(pk=inventory.pk).values('quantity', 'reserved_quantity').first()
+        available = (current['quantity'] or 0) - (current['reserved_quantity'] or 0) if current else 0
+        if available < quantity:
+            raise ValidationError(f"Insufficient stock. Available: {available}, Requested: {quantity}")
+
+        self._adjust_reserved({inventory.pk: {"row": inventory, "delta": quantity}})
+        return StockReservation.objects.create(
+            inventory=inventory,
+            item_id=inventory.item_id,
+            location_id=inventory.location_id,
+            sales_order_id=sales_order_item.sales_order_id if sales_order_item else None,
+            sales_order_item=sales_order_item,
+            task=task,
+            quantity=quantity,
+            expires_at=expires_at or self.default_expiry(),
+            created_by=self.user,
+        )
+
+    @transaction.atomic
+    def reserve_sales_order(self, sales_order: SalesOrder, location=None, warehouse=None,
+                            expires_at=None) -> List[StockReservation]:
+        """
+        Reserve every open line of a sales order in one transaction: candidate rows for all
+        items are read in one query, allocated in memory, and written with one grouped UPDATE
+        and one INSERT. Raises ValidationError, reserving nothing, if any line is short.
+        """
+        lines = list(sales_order.items.all())
+        already = dict(
+            StockReservation.objects.filter(
+                sales_order_item__in=lines, status=StockReservation.ACTIVE
+            ).values('sales_order_item').annotate(
+                held=Sum(F('quantity') - F('consumed_quantity'))
+            ).values_list('sales_order_item', 'held')
+        )
+
+        rows_by_item = {}
+        for row in self.candidate_rows({line.item_id for line in lines}, location, warehouse):
+            rows_by_item.setdefault(row.item_id, []).append(row)
+
+        free = {}
+        changes, reservations, shortfalls = {}, [], []
+        expires_at = expires_at or self.default_expiry()
+        for line in lines:
+            needed = line.quantity - (already.get(line.id) or 0)
+            for row in rows_by_item.get(line.item_id, []):
+                if needed <= self.TOLERANCE:
+                    break
+                available = free.setdefault(row.pk, (row.quantity or 0) - (row.reserved_quantity or 0))
+                take = min(available, needed)
+                if take <= 0:
+                    continue
+                free[row.pk] -= take
+                needed -= take
+                changes.setdefault(row.pk, {"row": row, "delta": 0})["delta"] += take
+                reservations.append(StockReservation(
+                    inventory=row,
+                    item_id=row.item_id,
+                    location_id=row.location_id,
+                    sales_order=sales_order,
+                    sales_order_item=line,
+                    quantity=take,
+                    expires_at=expires_at,
+                    created_by=self.user,
+                ))
+            if needed > self.TOLERANCE:
+                shortfalls.append(f"Insufficient stock for {line.item.name}: short by {needed}")
+
+        if shortfalls:
+            raise ValidationError(shortfalls)
+
+        self._adjust_reserved(changes)
+        return StockReservation.objects.bulk_create(reservations, batch_size=self.UPDATE_CHUNK_SIZE)
+
+    @transaction.atomic
+    def release(self, reservations, status: str = StockReservation.RELEASED) -> int:
+        """Give back the unconsumed quantity of active reservations"""
+        reservations = list(
+            StockReservation.objects.select_related('inventory').filter(
+                pk__in=[reservation.pk for reservation in reservations], status=StockReservation.ACTIVE
+            )
+        )
+        if not reservations:
+            return 0
+
+        changes = {}
+        for reservation in reservations:
+            change = changes.setdefault(reservation.inventory_id, {"row": reservation.inventory, "delta": 0})
+            change["delta"] -= reservation.remaining_quantity
+
+        updated = StockReservation.objects.filter(
+            pk__in=[reservation.pk for reservation in reservations], status=StockReservation.ACTIVE
+        ).update(status=status, updated_at=timezone.now())
+        if updated != len(reservations):
+            raise ValidationError("Reservations changed while releasing, please retry")
+
+        self._adjust_reserved(changes)
+        return updated
+
+    def release_sales_order(self, sales_order: SalesOrder) -> int:
+        return self.release(StockReservation.objects.filter(sales_order=sales_order, status=StockReservation.ACTIVE))
+
+    def release_task(self, task) -> int:
+        return self.release(StockReservation.objects.filter(task=task, status=StockReservation.ACTIVE))
+
+    def expire(self, now=None) -> int:
+        """Release every active reservation past its expiry; run periodically"""
+        now = now or timezone.now()
+        expired = 0
+        while True:
+            batch = list(StockReservation.objects.filter(
+                status=StockReservation.ACTIVE, expires_at__lte=now
+            ).order_by('pk')[:self.UPDATE_CHUNK_SIZE])
+            if not batch:
+                return expired
+            expired += self.release(batch, status=StockReservation.EXPIRED)
+
+    def consume(self, consumptions: Dict[int, float]) -> None:
+        """
+        Record quantities of reservations used up by outward postings. The reserved stock itself
+        is freed by the posting (StockMovement.release), in the same UPDATE that deducts it.
+        """
+        pending = [(pk, {"quantity": quantity}) for pk, quantity in consumptions.items() if quantity]
+        for start in range(0, len(pending), self.UPDATE_CHUNK_SIZE):
+            chunk = pending[start:start + self.UPDATE_CHUNK_SIZE]
+
+            condition = Q()
+            for pk, consumption in chunk:
+                condition |= Q(
+                    pk=pk, status=StockReservation.ACTIVE,
+                    quantity__gte=F('consumed_quantity') + Value(consumption["quantity"] - self.TOLERANCE),
+                )
+
+            consumed = F('consumed_quantity') + StockPostingService._per_row(chunk, "quantity", FloatField())
+            updated = StockReservation.objects.filter(condition).update(
+                consumed_quantity=consumed,
+                status=Case(
+                    When(quantity__lte=consumed + Value(self.TOLERANCE), then=Value(StockReservation.CONSUMED)),
+                    default=Value(StockReservation.ACTIVE),
+                    output_field=CharField(),
+                ),
+                updated_at=timezone.now(),
+            )
+            if updated != len(chunk):
+                raise ValidationError("Reservation already consumed or released")
+
+
+class StockAllocationService:
+    """
+    Splits outward quantities of an item across stock rows (batches, lots and locations) in
+    FIFO order by row creation, or FEFO by batch expiry where batches carry one. Each group
+    of requests is allocated with one windowed query that returns only the rows needed, and
+    the resulting legs are posted as one all-or-nothing bulk outward.
+    """
+
+    FIFO = 'fifo'
+    FEFO = 'fefo'
+
+    def __init__(self, user, mode: Optional[str] = None):
+        self.user = user
+        self.mode = mode
+
+    @classmethod
+    def ordering(cls, strategy: str) -> List[Any]:
+        if strategy == cls.FEFO:
+            # Unbatched stock and batches without an expiry go after every dated batch
+            return [F('batch__expiry_date').asc(nulls_last=True), 'created_at', 'pk']
+        if strategy != cls.FIFO:
+            raise ValidationError(f"Unknown allocation strategy: {strategy}")
+        return ['created_at', 'pk']
+
+    def _allocate_scope(self, quantities: Dict[int, float], location=None, warehouse=None,
+                        strategy: str = FIFO) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Rows covering the requested quantity of each item within one location/warehouse scope.
+        A running total of available stock per item (a window over the allocation order) lets
+        the database stop at the row that completes each item's quantity.
+        """
+        available = F('quantity') - Coalesce(F('reserved_quantity'), Value(0.0))
+        rows = Inventory.objects.filter(
+            item_id__in=list(quantities),
+            deleted=False,
+            quantity__gt=Coalesce(F('reserved_quantity'), Value(0.0)),
+        )
+        if location:
+            rows = rows.filter(location_id=location)
+        if warehouse:
+            rows = rows.filter(location__warehouse_id=warehouse)
+
+        rows = rows.annotate(
+            available=ExpressionWrapper(available, output_field=FloatField()),
+            running_before=Window(
+                Sum(available),
+                partition_by=[F('item_id')],
+                order_by=self.ordering(strategy),
+                frame=RowRange(start=None, end=0),
+            ) - available,
+            requested=Case(
+                *[When(item_id=item_id, then=Value(float(quantity))) for item_id, quantity in quantities.items()],
+                output_field=FloatField(),
+            ),
+        ).filter(running_before__lt=F('requested')).values(
+            'pk', 'item_id', 'location_id', 'batch_id', 'lot_id', 'available',
+        )
+
+        by_item = {}
+        for row in rows:
+            by_item.setdefault(row['item_id'], []).append(row)
+        return by_item
+
+    def allocate(self, requests: List[Dict[str, Any]], strategy: str = FIFO) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Plan outward legs for requests of {item, quantity[, location, warehouse, reservation]}.
+        Requests naming a reservation are taken from it as-is. Returns (legs, shortfall errors);
+        each leg carries the request index it belongs to.
+        """
+        legs, errors = [], []
+        scopes = {}
+        for index, request in enumerate(requests):
+            if request.get('reservation'):
+                reservation = request['reservation']
+                legs.append({
+                    "request": index,
+                    "inventory": reservation.inventory_id,
+                    "item": reservation.item_id,
+                    "location": reservation.location_id,
+                    "batch": reservation.inventory.batch_id,
+                    "lot": reservation.inventory.lot_id,
+                    "quantity": request['quantity'],
+                    "reservation": reservation.pk,
+                })
+                continue
+            scope = scopes.setdefault((request.get('location'), request.get('warehouse')), {})
+            scope.setdefault(request['item'], []).append(index)
+
+        for (location, warehouse), requests_by_item in scopes.items():
+            quantities = {
+                item_id: sum(requests[index]['quantity'] for index in indexes)
+                for item_id, indexes in requests_by_item.items()
+            }
+            rows_by_item = self._allocate_scope(quantities, location, warehouse, strategy)
+
+            for item_id, indexes in requests_by_item.items():
+                rows = iter(rows_by_item.get(item_id, []))
+                row, left_in_row = None, 0
+                for index in indexes:
+                    needed = requests[index]['quantity']
+                    while needed > StockReservationService.TOLERANCE:
+                        if left_in_row <= StockReservationService.TOLERANCE:
+                            row = next(rows, None)
+                            if row is None:
+                                break
+                            left_in_row = row['available']
+                        take = min(needed, left_in_row)
+                        legs.append({
+                            "request": index,
+                            "inventory": row['pk'],
+                            "item": item_id,
+                            "location": row['location_id'],
+                            "batch": row['batch_id'],
+                            "lot": row['lot_id'],
+                            "quantity": take,
+                        })
+                        needed -= take
+                        left_in_row -= take
+                    if needed > StockReservationService.TOLERANCE:
+                        errors.append((item_id, needed))
+
+        if errors:
+            names = Item.objects.in_bulk([item_id for item_id, _ in errors])
+            errors = [
+                f"Insufficient stock for {names[item_id].name if item_id in names else item_id}: short by {needed}"
+                for item_id, needed in errors
+            ]
+
+        legs.sort(key=lambda leg: leg["request"])
+        return legs, errors
+
+    def sales_order_requests(self, sales_order: SalesOrder) -> List[Dict[str, Any]]:
+        """Open quantity of each sales order line, drawn from the order's active reservations first"""
+        shipped = dict(
+            InventoryTransaction.objects.filter(
+                sales_order=sales_order, process_type__code=TransactionType.OUTWARD.value, deleted=False,
+            ).values('item').annotate(total=Sum('quantity')).values_list('item', 'total')
+        )
+        reservations = {}
+        for reservation in StockReservation.objects.select_related('inventory').filter(
+            sales_order=sales_order, status=StockReservation.ACTIVE,
+        ).order_by('pk'):
+            reservations.setdefault(reservation.item_id, []).append(reservation)
+
+        requests = []
+        for line in sales_order.items.all():
+            needed = line.quantity - shipped.get(line.item_id, 0)
+            shipped[line.item_id] = max(shipped.get(line.item_id, 0) - line.quantity, 0)
+            for reservation in reservations.get(line.item_id, []):
+                take = min(needed, reservation.remaining_quantity)
+                if take > StockReservationService.TOLERANCE:
+                    requests.append({'item': line.item_id, 'quantity': take, 'reservation': reservation})
+                    reservation.consumed_quantity += take
+                    needed -= take
+            if needed > StockReservationService.TOLERANCE:
+                requests.append({'item': line.item_id, 'quantity': needed})
+        return requests
+
+    def post(self, requests: List[Dict[str, Any]], strategy: str = FIFO, sales_order: Optional[SalesOrder] = None,
+             extra: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], BulkTransactionResult]:
+        """
+        Allocate and post every leg as one outward batch. Raises ValidationError if any request
+        is short; legs that fail while posting (stock taken concurrently) fail the whole batch.
+        """
+        legs, errors = self.allocate(requests, strategy)
+        if errors:
+            raise ValidationError(errors)
+
+        lines = [
+            {
+                **(extra or {}),
+                'process_type': TransactionType.OUTWARD.value,
+                'item': leg["item"],
+                'location': leg["location"],
+                'batch': leg["batch"],
+                'lot': leg["lot"],
+                'quantity': leg["quantity"],
+                'reservation': leg.get("reservation"),
+                'sales_order': sales_order.pk if sales_order else None,
+            }
+            for leg in legs
+        ]
+        service = InventoryTransactionService(self.user)
+        if self.mode:
+            service.stock_posting = StockPostingService(self.user, self.mode)
+        return legs, service.create_transactions_bulk(lines, all_or_nothing=True)
+
+
+class RecordImport:
+    """Reads CSV or NDJSON import files as (line number, record) pairs"""
+
+    CSV = 'csv'
+    NDJSON = 'ndjson'
+    FORMATS = {'.csv': CSV, '.ndjson': NDJSON, '.jsonl': NDJSON}
+
+    @classmethod
+    def detect_format(cls, filename: str, default: str = CSV) -> str:
+        for extension, file_format in cls.FORMATS.items():
+            if filename.lower().endswith(extension):
+                return file_format
+        return default
+
+    @staticmethod
+    def read_csv(stream):
+        for line, record in enumerate(csv.DictReader(stream), start=2):
+            yield line, record
+
+    @staticmethod
+    def read_ndjson(stream):
+        for line, text in enumerate(stream, start=1):
+            if not text.strip():
+                continue
+            try:
+                record = json.loads(text)
+            except ValueError as e:
+                yield line, ValidationError(f"Invalid JSON: {e}")
+                continue
+            yield line, record if isinstance(record, dict) else ValidationError("Expected a JSON object")
+
+    @classmethod
+    def read_records(cls, stream, file_format: str = CSV):
+        return cls.read_ndjson(stream) if file_format == cls.NDJSON else cls.read_csv(stream)
+
+
+class ItemImportService(RecordImport):
+    """
+    Bulk catalogue import from CSV or NDJSON. Rows are read as a stream and upserted on sku
+    in chunks through bulk_create(update_conflicts=True). Category names resolve through an
+    in-memory map, and duplicate sku/barcode/name values, whether within the file or against
+    other items, are rejected row by row instead of failing the chunk.
+
+    Only the columns a record carries are written, so an import can update a subset of
+    fields. Importing a soft-deleted sku restores it.
+    """
+
+    COLUMNS = [
+        'sku', 'name', 'barcode', 'description', 'unit', 'category', 'brand', 'model', 'supplier',
+        'minimum_stock_level', 'reorder_point', 'is_active',
+    ]
+    INTEGER_COLUMNS = ('minimum_stock_level', 'reorder_point')
+    UNIQUE_COLUMNS = ('barcode', 'name')
+    CHUNK_SIZE = 2000
+
+    def __init__(self, chunk_size: Optional[int] = None, create_categories: bool = True):
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.create_categories = create_categories
+        self.categories = {name: pk for pk, name in ItemCategory.objects.values_list('pk', 'name')}
+        self.max_lengths = {
+            column: Item._meta.get_field(column).max_length
+            for column in self.COLUMNS if column != 'category' and Item._meta.get_field(column).max_length
+        }
+
+    def import_stream(self, stream, file_format: str = RecordImport.CSV) -> ItemImportResult:
+        """Import every record of a text stream; returns counts and the row-level errors"""
+        records = self.read_records(stream, file_format)
+        result = ItemImportResult()
+        seen = {column: {} for column in ('sku',) + self.UNIQUE_COLUMNS}
+        chunk = []
+
+        for line, record in records:
+            result.total += 1
+            if isinstance(record, ValidationError):
+                self._reject(result, line, None, record.messages)
+                continue
+            if file_format == self.CSV and result.total == 1 and 'sku' not in record:
+                raise ValidationError("The import needs a 'sku' column")
+
+            try:
+                row = self._clean(record, [column for column in self.COLUMNS if column in record])
+                self._check_duplicates(row, line, seen)
+            except ValidationError as e:
+                self._reject(result, line, record.get('sku'), e.messages)
+                continue
+
+            chunk.append((line, row))
+            if len(chunk) >= self.chunk_size:
+                self._write_chunk(chunk, result)
+                chunk = []
+
+        if chunk:
+            self._write_chunk(chunk, result)
+        return result
+
+    def _reject(self, result: ItemImportResult, line: int, sku, messages: List[str]):
+        result.failed += 1
+        result.errors.append({'line': line, 'sku': sku, 'errors': messages})
+
+    def _clean(self, record: Dict[str, Any], columns: List[str]) -> Dict[str, Any]:
+        row, errors = {}, []
+        for column in columns:
+            value = record.get(column)
+            if isinstance(value, str):
+                value = value.strip()
+            if value in ('', None):
+                value = None
+            elif column in self.INTEGER_COLUMNS:
+                try:
+                    value = int(value)
+                    if value < 0:
+                        raise ValueError
+                except (TypeError, ValueError):
+                    errors.append(f"{column} must be a whole number of 0 or more")
+            elif column == 'is_active':
+                if isinstance(value, str):
+                    value = value.lower()
+                    if value not in ('true', 'false', '1', '0', 'yes', 'no'):
+                        errors.append("is_active must be true or false")
+                    value = value in ('true', '1', 'yes')
+                else:
+                    value = bool(value)
+            else:
+                value = str(value)
+                if column in self.max_lengths and len(value) > self.max_lengths[column]:
+                    errors.append(f"{column} is longer than {self.max_lengths[column]} characters")
+            row[column] = value
+
+        if not row.get('sku'):
+            errors.append("sku is required")
+        if 'is_active' in row and row['is_active'] is None:
+            row['is_active'] = True
+        for column in self.INTEGER_COLUMNS:
+            if column in row and row[column] is None:
+                row[column] = 0
+        if errors:
+            raise ValidationError(errors)
+        return row
+
+    def _check_duplicates(self, row: Dict[str, Any], line: int, seen: Dict[str, Dict[str, Any]]):
+        """Reject a sku seen earlier in the file, or a barcode/name already given to another sku"""
+        first_line = seen['sku'].get(row['sku'])
+        if first_line is not None:
+            raise ValidationError(f"Duplicate sku {row['sku']}, first seen on line {first_line}")
+        errors = []
+        for column in self.UNIQUE_COLUMNS:
+            value = row.get(column)
+            if value is not None and value in seen[column]:
+                errors.append(f"{column} {value} is also used by sku {seen[column][value]} in this file")
+        if errors:
+            raise ValidationError(errors)
+
+        seen['sku'][row['sku']] = line
+        for column in self.UNIQUE_COLUMNS:
+            if row.get(column) is not None:
+                seen[column][row[column]] = row['sku']
+
+    def _resolve_categories(self, chunk: List[Tuple[int, Dict[str, Any]]], result: ItemImportResult):
+        missing = {row['category'] for _, row in chunk if row.get('category') and row['category'] not in self.categories}
+        if missing and self.create_categories:
+            ItemCategory.objects.bulk_create([ItemCategory(name=name) for name in missing], ignore_conflicts=True)
+            self.categories.update(ItemCategory.objects.filter(name__in=missing).values_list('name', 'pk'))
+
+        resolved = []
+        for line, row in chunk:
+            if row.get('category') and row['category'] not in self.categories:
+                self._reject(result, line, row['sku'], [f"Unknown category: {row['category']}"])
+                continue
+            resolved.append((line, row))
+        return resolved
+
+    def _write_chunk(self, chunk: List[Tuple[int, Dict[str, Any]]], result: ItemImportResult):
+        chunk = self._resolve_categories(chunk, result)
+        if not chunk:
+            return
+
+        # Items already holding the chunk's skus, barcodes or names, to reject values owned by
+        # another sku before the insert rather than failing the whole statement
+        lookups = {
+            column: [row[column] for _, row in chunk if row.get(column) is not None]
+            for column in ('sku',) + self.UNIQUE_COLUMNS
+        }
+        owners = {column: {} for column in lookups}
+        condition = Q()
+        for column, values in lookups.items():
+            if values:
+                condition |= Q(**{f'{column}__in': values})
+        for existing in Item.objects.filter(condition).values(*lookups):
+            for column in lookups:
+                if existing[column] is not None:
+                    owners[column][existing[column]] = existing['sku']
+        # Alternate barcodes and pack GTINs share the scan namespace with item barcodes
+        if lookups['barcode']:
+            alternates = ItemCode.objects.filter(
+                code__in=lookups['barcode'], code_type__in=ItemCode.SCAN_TYPES, primary=False,
+            ).values_list('code', 'item__sku')
+            for code, sku in alternates:
+                owners['barcode'][code] = f"{sku} as an alternate code"
+
+        groups, existing_skus = {}, set()
+        for line, row in chunk:
+            errors = [
+                f"{column} {row[column]} already belongs to sku {owners[column][row[column]]}"
+                for column in self.UNIQUE_COLUMNS
+                if row.get(column) is not None and owners[column].get(row[column], row['sku']) != row['sku']
+            ]
+            if errors:
+                self._reject(result, line, row['sku'], errors)
+                continue
+            # One statement per column set; every CSV row shares one, NDJSON records may not
+            groups.setdefault(tuple(row), []).append((line, row))
+            if row['sku'] in owners['sku']:
+                existing_skus.add(row['sku'])
+
+        accepted = [entry for group in groups.values() for entry in group]
+        if not accepted:
+            return
+        try:
+            with transaction.atomic():
+                for columns, group in groups.items():
+                    self._upsert([row for _, row in group], columns)
+                item_ids = list(Item.objects.filter(sku__in=[row['sku'] for _, row in accepted]).values_list('pk', flat=True))
+                ItemCodeService.sync_primary(item_ids)
+        except IntegrityError as e:
+            # Another writer took one of the values after the ownership check
+            for line, row in accepted:
+                self._reject(result, line, row['sku'], [f"Could not save chunk: {e}"])
+            return
+
+        result.updated += len(existing_skus)
+        result.created += len(accepted) - len(existing_skus)
+        inventory_cache.bump_on_commit(items=item_ids)
+
+    def _upsert(self, rows: List[Dict[str, Any]], columns: Tuple[str, ...]):
+        """
+        Insert rows sharing `columns`, updating those columns (and restoring soft-deleted
+        items) where the sku already exists. Columns a record leaves out keep their stored
+        value on update and take the model default on insert.
+        """
+        items = []
+        for row in rows:
+            item = Item(deleted=False)
+            for column in columns:
+                if column == 'category':
+                    item.category_id = self.categories.get(row[column])
+                else:
+                    setattr(item, column, row[column])
+            items.append(item)
+        update_fields = [column for column in columns if column != 'sku'] + ['deleted', 'updated_at']
+        Item.objects.bulk_create(
+            items, update_conflicts=True, unique_fields=['sku'], update_fields=update_fields,
+        )
+
+
+class CycleCountService(RecordImport):
+    """
+    Bulk physical counts and go-live opening balances. Each chunk of (sku, location, batch,
+    lot, counted quantity) rows resolves its keys with one query per model and is stored as
+    CycleCount rows; the system quantity and discrepancy are then filled in by two UPDATE
+    statements against Inventory, and every non-zero discrepancy is posted as an ADJUSTMENT
+    through the bulk posting path. A count therefore corrects stock by the difference it
+    found, and movements posted after the count still apply.
+
+    Every row is checked before anything is stored: a file with a malformed, unknown or
+    repeated row is rejected whole.
+    """
+
+    COLUMNS = ('sku', 'location', 'batch', 'lot', 'counted_quantity', 'notes')
+    CHUNK_SIZE = 2000
+
+    def __init__(self, user, reference: Optional[str] = None, warehouse=None,
+                 chunk_size: Optional[int] = None, mode: Optional[str] = None):
+        self.user = user
+        self.reference = reference or f"COUNT-{timezone.now():%Y%m%d%H%M%S}"
+        self.warehouse = warehouse
+        # Every chunk's adjustments are posted as one bulk request
+        self.chunk_size = min(chunk_size or self.CHUNK_SIZE, InventoryTransactionService.BULK_MAX_LINES)
+        self.mode = mode
+
+    def import_stream(self, stream, file_format: str = RecordImport.CSV, dry_run: bool = False) -> CycleCountResult:
+        return self.import_records(self.read_records(stream, file_format), dry_run=dry_run)
+
+    def import_records(self, records, dry_run: bool = False) -> CycleCountResult:
+        """
+        Count (line number, record) pairs. With dry_run the discrepancies are computed and
+        reported but nothing is kept.
+        """
+        result = CycleCountResult(reference=self.reference)
+        seen, chunk, prepared = {}, [], []
+
+        for line, record in records:
+            result.total += 1
+            if isinstance(record, ValidationError):
+                self._reject(result, line, record.messages)
+                continue
+            try:
+                chunk.append((line, self._clean(record)))
+            except ValidationError as e:
+                self._reject(result, line, e.messages)
+                continue
+            if len(chunk) >= self.chunk_size:
+                prepared.append(self._prepare_chunk(chunk, seen, result))
+                chunk = []
+        if chunk:
+            prepared.append(self._prepare_chunk(chunk, seen, result))
+        if result.failed:
+            return result
+
+        # A dry run keeps everything in one transaction so it can be rolled back; a real count
+        # commits chunk by chunk, so stock rows are never locked for the whole import
+        with transaction.atomic() if dry_run else nullcontext():
+            for counts, lines in prepared:
+                if counts:
+                    with transaction.atomic():
+                        self._post_counts(counts, lines, result, dry_run)
+
+            result.summary = self.variance_summary(self.reference)
+            if dry_run:
+                result.variance = list(self.variance_report(self.reference))
+                transaction.set_rollback(True)
+        return result
+
+    def _reject(self, result: CycleCountResult, line: int, messages: List[str]):
+        result.failed += 1
+        result.errors.append({'line': line, 'errors': messages})
+
+    def _clean(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        row = {}
+        for column in self.COLUMNS:
+            value = record.get(column)
+            if isinstance(value, str):
+                value = value.strip()
+            row[column] = None if value in ('', None) else value
+
+        errors = [f"{column} is required" for column in ('sku', 'location') if row[column] is None]
+        try:
+            row['counted_quantity'] = float(row['counted_quantity'])
+            if row['counted_quantity'] < 0:
+                errors.append("counted_quantity cannot be negative")
+        except (TypeError, ValueError):
+            errors.append(f"Invalid counted_quantity: {record.get('counted_quantity')}")
+        if errors:
+            raise ValidationError(errors)
+        return row
+
+    def _resolve(self, chunk: List[Tuple[int, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        """Items by sku, locations by code, batches and lots by number: one query each"""
+        def values_of(column):
+            return {str(row[column]) for _, row in chunk if row[column] is not None}
+
+        locations = Location.objects.filter(code__in=values_of('location'), deleted=False)
+        if self.warehouse:
+            locations = locations.filter(warehouse_id=getattr(self.warehouse, 'pk', self.warehouse))
+        by_code = {}
+        for location in locations:
+            by_code.setdefault(location.code, []).append(location)
+
+        return {
+            'sku': Item.objects.filter(deleted=False).in_bulk(values_of('sku'), field_name='sku'),
+            'location': by_code,
+            'batch': ItemBatch.objects.in_bulk(values_of('batch'), field_name='batch_number'),
+            'lot': ItemLot.objects.in_bulk(values_of('lot'), field_name='lot_number'),
+        }
+
+    def _prepare_chunk(self, chunk, seen: Dict[Tuple, int], result: CycleCountResult) -> Tuple[List[CycleCount], List[int]]:
+        """Unsaved CycleCount rows for the chunk's valid lines, rejecting the others"""
+        references = self._resolve(chunk)
+        counts, lines = [], []
+        for line, row in chunk:
+            errors = []
+            item = references['sku'].get(str(row['sku']))
+            if item is None:
+                errors.append(f"Unknown sku: {row['sku']}")
+            locations = references['location'].get(str(row['location']), [])
+            if len(locations) != 1:
+                errors.append(
+                    f"Unknown location: {row['location']}" if not locations
+                    else f"Location code {row['location']} exists in several warehouses; import per warehouse"
+                )
+            for column in ('batch', 'lot'):
+                if row[column] is not None and references[column].get(str(row[column])) is None:
+                    errors.append(f"Unknown {column}: {row[column]}")
+            if errors:
+                self._reject(result, line, errors)
+                continue
+
+            batch = references['batch'].get(str(row['batch'])) if row['batch'] is not None else None
+            lot = references['lot'].get(str(row['lot'])) if row['lot'] is not None else None
+            key = (item.pk, locations[0].pk, batch.pk if batch else None, lot.pk if lot else None)
+            if key in seen:
+                self._reject(result, line, [f"Counted twice, first on line {seen[key]}"])
+                continue
+            seen[key] = line
+
+            counts.append(CycleCount(
+                item_id=key[0], location_id=key[1], batch_id=key[2], lot_id=key[3], reference=self.reference,
+                counted_quantity=row['counted_quantity'], notes=row['notes'], created_by=self.user,
+            ))
+            lines.append(line)
+        return counts, lines
+
+    def _post_counts(self, counts: List[CycleCount], lines: List[int], result: CycleCountResult, dry_run: bool):
+        CycleCount.objects.bulk_create(counts)
+        result.counted += len(counts)
+        ids = [count.pk for count in counts]
+
+        # System quantity of each counted stock row, matched null-safely on batch and lot
+        on_hand = Inventory.objects.filter(
+            item=OuterRef('item'), location=OuterRef('location'), deleted=False,
+        ).annotate(
+            batch_key=Coalesce('batch', Value(0)), lot_key=Coalesce('lot', Value(0)),
+        ).filter(
+            batch_key=Coalesce(OuterRef('batch'), Value(0)), lot_key=Coalesce(OuterRef('lot'), Value(0)),
+        ).values('quantity')[:1]
+        CycleCount.objects.filter(pk__in=ids).update(
+            system_quantity=Coalesce(Subquery(on_hand, output_field=FloatField()), Value(0.0)),
+        )
+        CycleCount.objects.filter(pk__in=ids).update(discrepancy=F('counted_quantity') - F('system_quantity'))
+
+        differences = list(
+            CycleCount.objects.filter(pk__in=ids).exclude(discrepancy=0)
+            .select_related('item', 'location', 'batch', 'lot').order_by('pk')
+        )
+        result.unchanged += len(counts) - len(differences)
+        if dry_run or not differences:
+            # A dry run reports the lines it would adjust
+            result.adjusted += len(differences)
+            return
+
+        line_of = dict(zip(ids, lines))
+        service = InventoryTransactionService(self.user)
+        if self.mode:
+            service.stock_posting = StockPostingService(self.user, self.mode)
+        posted = service.create_transactions_bulk([
+            {
+                'process_type': TransactionType.ADJUSTMENT.value,
+                'item': count.item,
+                'location': count.location,
+                'batch': count.batch,
+                'lot': count.lot,
+                'quantity': count.discrepancy,
+                'create_missing': True,
+                'reference_number': self.reference,
+                'remarks': f"Cycle count {self.reference}: counted {count.counted_quantity}, system {count.system_quantity}",
+            }
+            for count in differences
+        ])
+        linked = []
+        for count, outcome in zip(differences, posted.lines):
+            if outcome["success"]:
+                count.adjustment_id = outcome["transaction_id"]
+                linked.append(count)
+            else:
+                self._reject(result, line_of[count.pk], outcome["errors"])
+        CycleCount.objects.bulk_update(linked, ['adjustment'], batch_size=500)
+        result.adjusted += len(linked)
+
+    @staticmethod
+    def variance_report(reference: str):
+        """Counted lines of one count with the system quantity they were compared against"""
+        return CycleCount.objects.filter(reference=reference).values(
+            'id', 'item', 'item__sku', 'item__name', 'location', 'location__code',
+            'batch__batch_number', 'lot__lot_number',
+            'system_quantity', 'counted_quantity', 'discrepancy', 'adjustment', 'count_date',
+        ).order_by('location__code', 'item__sku', 'id')
+
+    @staticmethod
+    def variance_summary(reference: str) -> Dict[str, Any]:
+        summary = CycleCount.objects.filter(reference=reference).aggregate(
+            lines=Count('id'),
+            lines_with_variance=Count('id', filter=~Q(discrepancy=0)),
+            adjusted=Count('adjustment'),
+            system_quantity=Sum('system_quantity'),
+            counted_quantity=Sum('counted_quantity'),
+            gain=Sum('discrepancy', filter=Q(discrepancy__gt=0)),
+            loss=Sum('discrepancy', filter=Q(discrepancy__lt=0)),
+        )
+        for total in ('system_quantity', 'counted_quantity', 'gain', 'loss'):
+            summary[total] = summary[total] or 0
+        summary['reference'] = reference
+        summary['net'] = summary['gain'] + summary['loss']
+        return summary
+
+
+class InventoryValidationService:
+    """Service for validating inventory operations with caching"""
+
+    @staticmethod
+    def _cached(check: str, builder, *parts, **kwargs):
+        """inventory_cache.get_or_set, counting hits and misses per check"""
+        missed = []
+
+        def load():
+            missed.append(True)
+            return builder()
+
+        value = inventory_cache.get_or_set(check, load, *parts, **kwargs)
+        inventory_metrics.VALIDATION_CACHE.inc(check=check, result='miss' if missed else 'hit')
+        return value
+
+    @staticmethod
+    def available_quantity(item: Item, location: Location, batch=None, lot=None) -> Optional[float]:
+        """Available (on hand minus reserved) quantity of a stock row, or None if it does not exist"""
+        batch_id = getattr(batch, 'pk', batch)
+        lot_id = getattr(lot, 'pk', lot)
+
+        def load():
+            inventory = Inventory.objects.filter(
+                item=item, location=location, batch_id=batch_id, lot_id=lot_id, deleted=False
+            ).values('quantity', 'reserved_quantity').first()
+            # Cache a missing row as a sentinel so it is not looked up again until the next posting
+            if inventory is None:
+                return False
+            return (inventory['quantity'] or 0) - (inventory['reserved_quantity'] or 0)
+
+        available = InventoryValidationService._cached(
+            "stock_availability", load, batch_id, lot_id,
+            items=[item.id], locations=[location.id], timeout=STOCK_CACHE_TIMEOUT,
+        )
+        return None if available is False else available
+
+    @staticmethod
+    def validate_stock_availability(item: Item, location: Location, quantity: float,
+                                 batch=None, lot=None) -> bool:
+        """Validate if sufficient stock is available with caching"""
+        available = InventoryValidationService.available_quantity(item, location, batch, lot)
+        return available is not None and available >= quantity
+
+    @staticmethod
+    def validate_item_exists(item_id: int) -> bool:
+        """Validate if item exists and is active with caching"""
+        return InventoryValidationService._cached(
+            "item_exists",
+            lambda: Item.objects.filter(id=item_id, deleted=False, is_active=True).exists(),
+            items=[item_id],
+        )
+
+    @staticmethod
     def validate_location_exists(location_id: int) -> bool:
         """Validate if location exists and is active with caching"""
-        cache_key = f"location_exists_{location_id}"
-        result = cache.get(cache_key)
-        
-        if result is None:
-            try:
-                location = Location.objects.get(id=location_id, deleted=False, is_active=True)
-                result = True
-                cache.set(cache_key, result, 300)  # Cache for 5 minutes
-            except Location.DoesNotExist:
-                result = False
-                cache.set(cache_key, result, 300)
-        
-        return result 
\ No newline at end of file
+        return InventoryValidationService._cached(
+            "location_exists",
+            lambda: Location.objects.filter(id=location_id, deleted=False, is_active=True).exists(),
+            locations=[location_id],
+        )
+
+
+class ItemCodeService:
+    """Resolution and prefix search over the ItemCode index (barcodes, SKUs, pack GTINs, supplier part numbers)"""
+    SEARCH_LIMIT = 20
+    MAX_SEARCH_LIMIT = 100
+    # When one code matches several rows, scanned codes win over SKUs, and SKUs over part numbers
+    PRECEDENCE = {ItemCode.BARCODE: 0, ItemCode.GTIN: 0, ItemCode.SKU: 1, ItemCode.SUPPLIER_PART: 2}
+    ITEM_FIELDS = ('item_id', 'item__sku', 'item__barcode', 'item__name', 'item__unit')
+
+    @staticmethod
+    def sync_primary(item_ids) -> None:
+        """Mirror Item.barcode and Item.sku of these items into the index"""
+        item_ids = list(item_ids)
+        if not item_ids:
+            return
+        wanted = {}
+        for item_id, barcode, sku in Item.objects.filter(pk__in=item_ids).values_list('id', 'barcode', 'sku'):
+            if barcode:
+                wanted[item_id, ItemCode.BARCODE] = barcode
+            if sku:
+                wanted[item_id, ItemCode.SKU] = sku
+
+        # Only rows whose code changed are rewritten, so re-importing unchanged items touches nothing
+        with transaction.atomic():
+            stale = []
+            for pk, item_id, code_type, code in ItemCode.objects.filter(
+                item_id__in=item_ids, primary=True,
+            ).values_list('pk', 'item_id', 'code_type', 'code'):
+                if wanted.get((item_id, code_type)) == code:
+                    del wanted[item_id, code_type]
+                else:
+                    stale.append(pk)
+            if stale:
+                ItemCode.objects.filter(pk__in=stale).delete()
+            ItemCode.objects.bulk_create([
+                ItemCode(item_id=item_id, code=code, code_type=code_type, primary=True)
+                for (item_id, code_type), code in wanted.items()
+            ], batch_size=1000)
+
+    @classmethod
+    def resolve(cls, codes: List[str], supplier=None) -> Dict[str, Dict[str, Any]]:
+        """
+        The live item each code identifies, with how it matched, in one query on the code index.
+        Supplier part numbers only match for `supplier` when one is given, and otherwise only
+        when a single supplier uses the number.
+        """
+        matches = ItemCode.objects.filter(code__in=codes, item__deleted=False, item__is_active=True)
+        if supplier:
+            matches = matches.filter(~Q(code_type=ItemCode.SUPPLIER_PART) | Q(supplier_id=supplier))
+
+        candidates = {}
+        for row in matches.values('code', 'code_type', 'pack_quantity', 'supplier_id', *cls.ITEM_FIELDS):
+            candidates.setdefault(row['code'], []).append(row)
+
+        resolved = {}
+        for code, rows in candidates.items():
+            best = min(cls.PRECEDENCE[row['code_type']] for row in rows)
+            rows = [row for row in rows if cls.PRECEDENCE[row['code_type']] == best]
+            if len({row['item_id'] for row in rows}) == 1:
+                resolved[code] = rows[0]
+        return resolved
+
+    @classmethod
+    def search(cls, prefix: str, code_types=None, limit: int = SEARCH_LIMIT) -> List[Dict[str, Any]]:
+        """
+        Codes starting with `prefix`, in code order, for typeahead. Matching is a range scan on
+        the code index (code >= prefix and code < the next prefix), which stays an index seek
+        on every backend, unlike LIKE 'prefix%' (case-insensitive on SQLite, and needing a
+        pattern-ops index on PostgreSQL). Matching is therefore case-sensitive.
+        """
+        prefix = prefix.strip()
+        if not prefix:
+            return []
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        matches = ItemCode.objects.filter(
+            code__gte=prefix, code__lt=upper, item__deleted=False, item__is_active=True,
+        )
+        if code_types:
+            matches = matches.filter(code_type__in=code_types)
+        rows = matches.values(
+            'code', 'code_type', 'pack_quantity', 'supplier_id', *cls.ITEM_FIELDS,
+        ).order_by('code', 'id')[:min(limit, cls.MAX_SEARCH_LIMIT)]
+        return [
+            {
+                'code': row['code'],
+                'code_type': row['code_type'],
+                'pack_quantity': row['pack_quantity'],
+                'supplier': row['supplier_id'],
+                'item': {
+                    'id': row['item_id'], 'sku': row['item__sku'], 'barcode': row['item__barcode'],
+                    'name': row['item__name'], 'unit': row['item__unit'],
+                },
+            }
+            for row in rows
+        ]
+
+
+class ScanLookupService:
+    """
+    Scanner lookups by any code in the ItemCode index: the item and its stock by location, in a
+    compact shape, plus how the code matched and how many units one scan of it stands for
+    (pack GTINs). Answers are kept in a process-local LRU keyed by the scanned code and stamped
+    with the item's cache generation, which item and item code saves and stock postings bump
+    (see cache.py), so a repeat scan costs one generation read and no queries. Unknown codes
+    are not cached.
+    """
+    MAX_CODES = 200
+
+    @staticmethod
+    def normalize(codes) -> List[str]:
+        """Stripped, de-duplicated codes in the order scanned"""
+        return list(dict.fromkeys(str(code).strip() for code in codes if code is not None and str(code).strip()))
+
+    @classmethod
+    def lookup(cls, codes, supplier=None) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """Returns ({code: result}, [codes not found]); see ItemCodeService.resolve for matching"""
+        codes = cls.normalize(codes)
+        keys = {code: (supplier, code) for code in codes}
+        cached = SCAN_LOOKUP_CACHE.get_many(keys.values())
+        current = inventory_cache.generations(inventory_cache.ITEM, {item_id for item_id, _, _ in cached.values()})
+
+        results = {
+            code: cached[key][2] for code, key in keys.items()
+            if key in cached and current[cached[key][0]] == cached[key][1]
+        }
+        if results:
+            inventory_metrics.SCAN_LOOKUPS.inc(len(results), result='hit')
+
+        missing = [code for code in codes if code not in results]
+        if missing:
+            loaded = cls._load(missing, supplier)
+            inventory_metrics.SCAN_LOOKUPS.inc(len(loaded), result='miss')
+            if len(loaded) < len(missing):
+                inventory_metrics.SCAN_LOOKUPS.inc(len(missing) - len(loaded), result='not_found')
+            SCAN_LOOKUP_CACHE.set_many({keys[code]: entry for code, entry in loaded.items()})
+            results.update({code: result for code, (_, _, result) in loaded.items()})
+
+        return (
+            {code: results[code] for code in codes if code in results},
+            [code for code in codes if code not in results],
+        )
+
+    @staticmethod
+    def _load(codes: List[str], supplier=None) -> Dict[str, Tuple[int, int, Dict[str, Any]]]:
+        """(item id, item generation, result) per code found, with one query for codes and one for stock"""
+        matches = ItemCodeService.resolve(codes, supplier)
+        if not matches:
+            return {}
+
+        items = {}
+        for match in matches.values():
+            items.setdefault(match['item_id'], {
+                'id': match['item_id'], 'sku': match['item__sku'], 'barcode': match['item__barcode'],
+                'name': match['item__name'], 'unit': match['item__unit'],
+                'quantity': 0.0, 'reserved': 0.0, 'locations': [],
+            })
+
+        # Read generations before stock, so a posting that lands in between leaves a stale stamp
+        # (and a reload on the next scan) rather than stale stock under a current stamp
+        generations = inventory_cache.generations(inventory_cache.ITEM, list(items))
+
+        stock = InventorySummary.objects.filter(
+            item_id__in=items,
+        ).exclude(total_quantity=0, reserved_quantity=0).values_list(
+            'item_id', 'location_id', 'location__code', 'total_quantity', 'reserved_quantity',
+        ).order_by('item_id', 'location__code')
+        for item_id, location_id, code, quantity, reserved in stock:
+            item = items[item_id]
+            item['quantity'] += quantity
+            item['reserved'] += reserved
+            item['locations'].append({'location': location_id, 'code': code, 'quantity': quantity, 'available': quantity - reserved})
+        for item in items.values():
+            item['available'] = item['quantity'] - item['reserved']
+
+        return {
+            code: (match['item_id'], generations[match['item_id']], {
+                **items[match['item_id']],
+                'matched': match['code_type'],
+                'pack_quantity': match['pack_quantity'],
+            })
+            for code, match in matches.items()
+        }
@@ -141,101 +141,78 @@
 #     supplier.save()
 
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from inventory.models import InventoryTransaction, InventoryProcessType, Inventory
+from inventory.models import InventoryTransaction, InventoryProcessType, Inventory, Item, ItemCode
+from inventory.services import InventorySummaryService, ItemCodeService, StockPostingService, SupplierRatingService
+from inventory import cache as inventory_cache
+from warehouse.models import Location
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 
 
 @receiver(post_save, sender=InventoryTransaction)
 def handle_inventory_transaction(sender, instance, created, **kwargs):
-    if not created:
+    # Transactions created through InventoryTransactionService are posted by their processor;
+    # anything else (admin, fixtures, shell) is posted here through the same engine.
+    if not created or not instance.process_type_id or StockPostingService.is_deferred(instance):
         return
 
-    item = instance.item
-    qty = instance.quantity or 0
-    user = instance.created_by
-    process_code = instance.process_type.code
-    ref_id = instance.id
-
-    if process_code == 'INWARD':
-        inv, _ = Inventory.objects.get_or_create(item=item, location=instance.location, defaults={'quantity': 0})
-        quantity_before = inv.quantity or 0
-        inv.quantity += qty
-        inv.quantity_before = quantity_before
-        inv.quantity_after = inv.quantity
-        inv.updated_by = user
-        inv.save()
-
-    elif process_code == 'OUTWARD':
-        inv, _ = Inventory.objects.get_or_create(item=item, location=instance.location, defaults={'quantity': 0})
-        quantity_before = inv.quantity or 0
-        inv.quantity -= qty
-        inv.quantity_before = quantity_before
-        inv.quantity_after = inv.quantity
-        inv.updated_by = user
-        inv.save()
-
-    elif process_code == 'TRANSFER':
-        # FROM location
-        from_inv, _ = Inventory.objects.get_or_create(item=item, location=instance.from_location, defaults={"quantity": 0})
-        quantity_before_from = from_inv.quantity or 0
-        from_inv.quantity -= qty
-        from_inv.quantity_before = quantity_before_from
-        from_inv.quantity_after = from_inv.quantity
-        from_inv.updated_by = user
-        from_inv.save()
-
-        # TO location
-        to_inv, _ = Inventory.objects.get_or_create(item=item, location=instance.to_location, defaults={"quantity": 0})
-        quantity_before_to = to_inv.quantity or 0
-        to_inv.quantity += qty
-        to_inv.quantity_before = quantity_before_to
-        to_inv.quantity_after = to_inv.quantity
-        to_inv.updated_by = user
-        to_inv.save()
-
-    elif process_code == 'RETURN':
-        inv, _ = Inventory.objects.get_or_create(item=item, location=instance.location, defaults={"quantity": 0})
-        quantity_before = inv.quantity or 0
-        inv.quantity += qty
-        inv.quantity_before = quantity_before
-        inv.quantity_after = inv.quantity
-        inv.updated_by = user
-        inv.save()
-
-    elif process_code == 'ADJUSTMENT':
-        inv, _ = Inventory.objects.get_or_create(item=item, location=instance.location, defaults={"quantity": 0})
-        quantity_before = inv.quantity or 0
-        inv.quantity = qty
-        inv.quantity_before = quantity_before
-        inv.quantity_after = inv.quantity
-        inv.updated_by = user
-        inv.save()
+    StockPostingService(instance.created_by).post_transaction(instance)
 
 
-@receiver(post_save, sender=InventoryTransaction)
-def update_supplier_rating_on_inward(sender, instance, created, **kwargs):
-    if not created:
-        return
+@receiver(post_save, sender=Inventory)
+@receiver(post_delete, sender=Inventory)
+def refresh_inventory_summary(sender, instance, **kwargs):
+    # The posting engine writes with queryset updates and maintains the summary itself;
+    # these only fire for rows edited directly (inventory views, admin, shell).
+    key = (instance.item_id, instance.location_id)
+    # Inventory.from_db remembers the key a loaded row had; new rows have only their own
+    keys = {getattr(instance, '_summary_key', key), key}
+    InventorySummaryService.refresh(keys)
+    inventory_cache.bump_on_commit(
+        items={item_id for item_id, _ in keys},
+        locations={location_id for _, location_id in keys},
+    )
+    instance._summary_key = key
 
-    if instance.process_type.code != 'INWARD' or not instance.purchase_order:
-        return
 
-    po = instance.purchase_order
-    supplier = po.supplier
-    expected_date = po.expected_delivery_date
-    actual_date = instance.date
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def invalidate_item_cache(sender, instance, **kwargs):
+    inventory_cache.bump_on_commit(items=[instance.pk])
+
+
+@receiver(post_save, sender=Item)
+def sync_primary_item_codes(sender, instance, created, **kwargs):
+    # bulk_create and the item import bypass this; ItemCodeService.sync_primary covers them
+    codes = (instance.barcode, instance.sku)
+    # Item.from_db remembers the loaded codes; an instance built by hand always resyncs
+    if created or getattr(instance, '_primary_codes', None) != codes:
+        ItemCodeService.sync_primary([instance.pk])
+        instance._primary_codes = codes
+
 
-    delay_days = (actual_date - expected_date).days if expected_date and actual_date else 0
-    previous_rating = supplier.supplier_rating or 5.0
+@receiver(post_save, sender=ItemCode)
+@receiver(post_delete, sender=ItemCode)
+def invalidate_item_code_cache(sender, instance, **kwargs):
+    inventory_cache.bump_on_commit(items=[instance.item_id])
 
-    if delay_days > 2:
-        new_rating = max(previous_rating - 0.2, 1.0)
-    elif delay_days > 0:
-        new_rating = max(previous_rating - 0.1, 1.0)
-    else:
-        new_rating = min(previous_rating + 0.1, 5.0)
 
-    supplier.supplier_rating = round(new_rating, 2)
-    supplier.save()
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_location_cache(sender, instance, **kwargs):
+    inventory_cache.bump_on_commit(locations=[instance.pk])
+
+
+@receiver(post_save, sender=InventoryProcessType)
+@receiver(post_delete, sender=InventoryProcessType)
+def invalidate_process_type_cache(sender, instance, **kwargs):
+    transaction.on_commit(lambda: inventory_cache.bump(inventory_cache.PROCESS_TYPES))
+
+
+@receiver(post_save, sender=InventoryTransaction)
+def update_supplier_rating_on_inward(sender, instance, created, **kwargs):
+    if created:
+        SupplierRatingService.record_inwards([instance])
@@ -1,3 +1,1208 @@
-from django.test import TestCase
+import base64
+import csv
+import io
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from monitoring.testing import QueryBudgetMixin
+from tasks.models import InventoryTask, TaskType
+from warehouse.models import Location, Warehouse
+
+from . import cache as inventory_cache
+from . import exports
+from .benchmarks import BENCHMARKS
+from .models import *
+from .serializers import ItemSerializer
+from .services import (
+    SCAN_LOOKUP_CACHE, STOCK_KEY_INDEX, CycleCountService, InventorySummaryService, InventoryTransactionService,
+    InventoryValidationService, ItemImportService, ScanLookupService, StockBalanceService, StockPostingService,
+    StockReservationService, StockSnapshotService,
+)
+from .views import PurchaseOrdersBySupplierView
+
+
+class InventoryFixtures:
+    """A user, one warehouse with two locations, one item and the process and task types"""
+
+    @classmethod
+    def create_fixtures(cls):
+        cls.user = User.objects.create_user(username='storekeeper', is_superuser=True)
+        for code in ('INWARD', 'OUTWARD', 'TRANSFER', 'ADJUSTMENT', 'RETURN'):
+            InventoryProcessType.objects.create(code=code, name=code.title())
+        for code in ('PUTAWAY', 'PICKUP', 'TRANSFER'):
+            TaskType.objects.create(code=code, name=code.title())
+        cls.warehouse = Warehouse.objects.create(name='Main', address='Dock road', owner=cls.user)
+        cls.location = Location.objects.create(warehouse=cls.warehouse, code='A1')
+        cls.other_location = Location.objects.create(warehouse=cls.warehouse, code='A2')
+        cls.item = Item.objects.create(name='Widget', sku='W1', barcode='1001')
+
+    def setUp(self):
+        # Cache generations are bumped on commit, which never happens inside a TestCase
+        cache.clear()
+        STOCK_KEY_INDEX.clear()
+        SCAN_LOOKUP_CACHE.clear()
+        super().setUp()
+
+    def post(self, process_type, **data):
+        result = InventoryTransactionService(self.user).create_transaction({'process_type': process_type, **data})
+        self.assertTrue(result.success, result.errors or result.message)
+        return result
+
+    def save_directly(self, code, **fields):
+        """Save a transaction without the service, leaving it to the post_save handler"""
+        return InventoryTransaction.objects.create(
+            process_type=InventoryProcessType.objects.get(code=code), item=self.item, created_by=self.user, **fields
+        )
+
+    def stock(self, location=None):
+        row = Inventory.objects.get(item=self.item, location=location or self.location)
+        return row.quantity
+
+
+class HotQueryIndexTests(TestCase):
+    """EXPLAIN every hot query and fail if any of them reads its table without an index"""
+
+    def hot_queries(self):
+        now = timezone.now()
+        return {
+            "stock row by key": Inventory.objects.filter(
+                item_id=1, location_id=1, batch_id=None, lot_id=None, deleted=False
+            ),
+            "posting engine load": Inventory.objects.filter(StockPostingService._key_condition(
+                [(1, 1, None, None), (2, 1, 3, None)]
+            )),
+            "fifo allocation": Inventory.objects.filter(item_id=1, deleted=False).order_by('created_at', 'id'),
+            "stock at a location": Inventory.objects.filter(location_id=1, deleted=False),
+            "inward list": InventoryTransaction.objects.filter(
+                process_type__code='INWARD', deleted=False
+            ).order_by('-created_at'),
+            "inward list, keyset page": InventoryTransaction.objects.filter(
+                Q(created_at__lt=now) | Q(created_at=now, id__lt=1000), process_type_id=1, deleted=False,
+            ).order_by('-created_at', '-id'),
+            "item list, keyset page": Item.objects.filter(
+                Q(created_at__lt=now) | Q(created_at=now, id__lt=1000), deleted=False,
+            ).order_by('-created_at', '-id'),
+            "item transaction history": InventoryTransaction.objects.filter(
+                item_id=1, deleted=False
+            ).order_by('-created_at'),
+            "open tasks of a type": InventoryTask.objects.filter(
+                task_type_id=1, assigned_to_id=1, is_completed=False, deleted=False
+            ),
+            "task dashboard": InventoryTask.objects.filter(assigned_to_id=1, deleted=False),
+            "ledger of a row": InventoryLog.objects.filter(inventory_id=1).order_by('-timestamp', '-id'),
+            "ledger since a snapshot": InventoryLog.objects.filter(timestamp__gt=now - timedelta(days=1), timestamp__lte=now),
+            "expired reservations": StockReservation.objects.filter(
+                status=StockReservation.ACTIVE, expires_at__lte=now
+            ).order_by('pk'),
+            "scan code": ItemCode.objects.filter(code__in=['1001', '1002']),
+            "code prefix search": ItemCode.objects.filter(code__gte='100', code__lt='101').order_by('code', 'id'),
+        }
+
+    def table_scans(self, queryset, plan):
+        """Plan lines that read the queryset's own table without an index"""
+        table = queryset.model._meta.db_table
+        if connection.vendor == 'postgresql':
+            return [line for line in plan.splitlines() if f"Seq Scan on {table}" in line]
+        return [line for line in plan.splitlines() if f"SCAN {table}" in line and "INDEX" not in line]
+
+    def test_hot_queries_use_an_index(self):
+        if connection.vendor == 'postgresql':
+            # Test tables are tiny and cheaper to scan; ask whether an index *can* serve the query
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+        for label, queryset in self.hot_queries().items():
+            with self.subTest(label):
+                plan = queryset.explain()
+                self.assertEqual(self.table_scans(queryset, plan), [], plan)
+
+
+class SupplierRatingTests(InventoryFixtures, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+        cls.supplier = Supplier.objects.create(name='Acme', supplier_rating=3)
+
+    def purchase_order(self, days_late):
+        return PurchaseOrder.objects.create(
+            supplier=self.supplier, expected_delivery_date=timezone.localdate() - timedelta(days=days_late),
+        )
+
+    def test_bulk_inwards_rate_the_supplier_like_single_inwards(self):
+        on_time, late = self.purchase_order(0), self.purchase_order(5)
+        sequence = (late, on_time, late)
+
+        for po in sequence:
+            self.post('INWARD', item=self.item, location=self.location, quantity=1, purchase_order=po)
+        self.supplier.refresh_from_db()
+        one_by_one = self.supplier.supplier_rating
+
+        Supplier.objects.filter(pk=self.supplier.pk).update(supplier_rating=3)
+        result = InventoryTransactionService(self.user).create_transactions_bulk([
+            {'process_type': 'INWARD', 'item': self.item.pk, 'location': self.location.pk, 'quantity': 1,
+             'purchase_order': po.pk}
+            for po in sequence
+        ])
+        self.assertEqual(result.posted, 3)
+        self.supplier.refresh_from_db()
+        self.assertEqual(self.supplier.supplier_rating, one_by_one)
+        self.assertLess(one_by_one, 3)
+
+
+class StockPostingTests(InventoryFixtures, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+
+    def test_stock_rows_are_loaded_by_exact_key(self):
+        batch = ItemBatch.objects.create(batch_number='B1')
+        self.post('INWARD', item=self.item, location=self.location, quantity=5)
+        self.post('INWARD', item=self.item, location=self.location, batch=batch, quantity=5)
+
+        service = StockPostingService(self.user, use_index=False)
+        with self.assertNumQueries(1) as queries:
+            stock = service.load([(self.item.pk, self.location.pk, None, None)])
+        self.assertEqual(len(stock), 1)
+        self.assertIn('"batch_id" IS NULL', queries.captured_queries[0]['sql'])
+
+        # Keys beyond one OR'd lookup are resolved to primary keys first
+        service.KEY_LOOKUP_CHUNK_SIZE = 1
+        stock = service.load([(self.item.pk, self.location.pk, None, None), (self.item.pk, self.location.pk, batch.pk, None)])
+        self.assertEqual({key[2] for key in stock}, {None, batch.pk})
+
+    def test_directly_saved_transactions_post_their_batch_and_lot(self):
+        batch = ItemBatch.objects.create(batch_number='B1')
+        lot = ItemLot.objects.create(lot_number='L1')
+        self.post('INWARD', item=self.item, location=self.location, batch=batch, lot=lot, quantity=5)
+        self.assertEqual(InventoryTransaction.objects.get().lot_number, 'L1')
+
+        self.save_directly('OUTWARD', location=self.location, batch_number='B1', lot_number='L1', quantity=2)
+        row = Inventory.objects.get(item=self.item, location=self.location)
+        self.assertEqual((row.batch_id, row.lot_id, row.quantity), (batch.pk, lot.pk, 3))
+
+
+class DirectPostingTests(InventoryFixtures, TransactionTestCase):
+    """Transactions saved outside the service, in autocommit mode as the admin and shell do"""
+
+    def setUp(self):
+        self.create_fixtures()
+        super().setUp()
+
+    def test_a_transaction_that_cannot_post_is_not_kept(self):
+        for fields in (
+            {'location': self.location, 'quantity': 5},
+            {'location': self.location, 'quantity': 1, 'lot_number': 'missing'},
+        ):
+            with self.subTest(**fields), self.assertRaises(ValidationError):
+                self.save_directly('OUTWARD', **fields)
+        self.assertFalse(InventoryTransaction.objects.exists())
+        self.assertFalse(Inventory.objects.exists())
+
+
+class PostingQueryCountTests(InventoryFixtures, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+
+    def setUp(self):
+        super().setUp()
+        self.service = InventoryTransactionService(self.user)
+        self.post('INWARD', item=self.item, location=self.location, quantity=10)
+
+    def test_inward_onto_an_existing_row(self):
+        # Savepoint, transaction insert, row select, row update, summary insert-or-ignore,
+        # summary update, ledger insert, putaway task insert, release
+        with self.assertNumQueries(9):
+            self.service.create_transaction({
+                'process_type': 'INWARD', 'item': self.item, 'location': self.location, 'quantity': 5,
+            })
+        self.assertEqual(self.stock(), 15)
+
+    def test_inward_onto_a_new_row(self):
+        # As above, plus the row insert in its own savepoint
+        with self.assertNumQueries(12):
+            self.service.create_transaction({
+                'process_type': 'INWARD', 'item': self.item, 'location': self.other_location, 'quantity': 5,
+            })
+        self.assertEqual(self.stock(self.other_location), 5)
+
+    def test_outward(self):
+        # As an inward, plus the availability check made while validating
+        with self.assertNumQueries(10):
+            self.service.create_transaction({
+                'process_type': 'OUTWARD', 'item': self.item, 'location': self.location, 'quantity': 4,
+            })
+        self.assertEqual(self.stock(), 6)
+
+    def test_transfer_between_existing_rows(self):
+        self.post('INWARD', item=self.item, location=self.other_location, quantity=1)
+        # As an outward; both rows are read, updated and logged by the same statements
+        with self.assertNumQueries(10):
+            self.service.create_transaction({
+                'process_type': 'TRANSFER', 'item': self.item, 'from_location': self.location,
+                'to_location': self.other_location, 'quantity': 4,
+            })
+        self.assertEqual((self.stock(), self.stock(self.other_location)), (6, 5))
+
+    def test_bulk_posting_does_not_grow_per_line(self):
+        def lines(count):
+            return [
+                {'process_type': 'INWARD', 'item': self.item.pk, 'location': self.location.pk, 'quantity': 1}
+            ] * count
+
+        # Two reference lookups, savepoint, row select, transaction insert, row update, summary
+        # insert-or-ignore and update, ledger insert, task insert, release
+        for count in (1, 10, 20):
+            with self.subTest(lines=count), self.assertNumQueries(11):
+                result = self.service.create_transactions_bulk(lines(count))
+            self.assertEqual(result.posted, count)
+        self.assertEqual(self.stock(), 41)
+
+
+class OrderListQueryTests(InventoryFixtures, QueryBudgetMixin, TestCase):
+    """Order lists run the same number of queries whether a page holds one order or several"""
+
+    PATHS = (
+        '/inventory/purchase-orders/',
+        '/inventory/purchase-orders/filter/?date_from=2000-01-01',
+        '/inventory/purchase-orders/fulfilment/?status=all',
+        '/inventory/list-sales-orders/?is_fulfilled=false',
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+        cls.supplier = Supplier.objects.create(name='Acme')
+        cls.customer = Customer.objects.create(name='Retail')
+        cls.items = [cls.item] + [
+            Item.objects.create(name=f'Part {number}', sku=f'P{number}') for number in range(2)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_orders(self, count):
+        for _ in range(count):
+            purchase_order = PurchaseOrder.objects.create(supplier=self.supplier, created_by=self.user)
+            sales_order = SalesOrder.objects.create(customer=self.customer, created_by=self.user)
+            for item in self.items:
+                PurchaseOrderItem.objects.create(purchase_order=purchase_order, item=item, quantity=5, rate=1)
+                SalesOrderItem.objects.create(sales_order=sales_order, item=item, quantity=2, rate=1)
+
+    def query_counts(self):
+        counts = {}
+        for path in self.PATHS:
+            with CaptureQueriesContext(connection) as captured:
+                response = self.assertQueryBudget('get', path)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.data['results'])
+            counts[path] = len(captured)
+
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, self.user)
+        with CaptureQueriesContext(connection) as captured:
+            response = PurchaseOrdersBySupplierView.as_view()(request, supplier_id=self.supplier.pk)
+        self.assertLessEqual(len(captured), PurchaseOrdersBySupplierView.query_budget)
+        counts['orders by supplier'] = len(captured)
+        return counts
+
+    def test_query_count_does_not_grow_with_orders(self):
+        self.create_orders(1)
+        one_order = self.query_counts()
+        self.create_orders(4)
+        five_orders = self.query_counts()
+        self.assertEqual(five_orders, one_order)
+
+
+class OrderCreateQueryTests(InventoryFixtures, TestCase):
+    """Creating an order costs the same queries for one line or fifty, and a bad line stores nothing"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+        cls.supplier = Supplier.objects.create(name='Acme')
+        cls.customer = Customer.objects.create(name='Retail')
+        cls.items = [Item.objects.create(name=f'Part {number}', sku=f'P{number}') for number in range(50)]
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def lines(self, count):
+        return [{'item': item.pk, 'quantity': 5, 'rate': 2} for item in self.items[:count]]
+
+    def create(self, path, lines, **header):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(path, {**header, 'items': lines}, format='json')
+        return response, len(captured)
+
+    def test_query_count_does_not_grow_with_lines(self):
+        for path, header, model in (
+            ('/inventory/purchase-orders/create/', {'supplier': self.supplier.pk}, PurchaseOrder),
+            ('/inventory/post-sales-orders/', {'customer': self.customer.pk}, SalesOrder),
+        ):
+            with self.subTest(path=path):
+                response, one_line = self.create(path, self.lines(1), **header)
+                self.assertEqual(response.status_code, 201, response.data)
+                response, fifty_lines = self.create(path, self.lines(50), **header)
+                self.assertEqual(response.status_code, 201, response.data)
+                self.assertEqual(len(response.data['data']['items']), 50)
+                self.assertEqual(fifty_lines, one_line)
+                self.assertEqual(model.objects.get(pk=response.data['data']['id']).items.count(), 50)
+
+    def test_invalid_line_stores_no_order(self):
+        lines = self.lines(3)
+        lines[1]['item'] = max(item.pk for item in self.items) + 1
+        response, _ = self.create('/inventory/purchase-orders/create/', lines, supplier=self.supplier.pk)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('item', response.data['items'][1])
+        self.assertFalse(PurchaseOrder.objects.exists())
+        self.assertFalse(PurchaseOrderItem.objects.exists())
+
+        lines = self.lines(3)
+        lines[2]['quantity'] = 'many'
+        response, _ = self.create('/inventory/post-sales-orders/', lines, customer=self.customer.pk)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(SalesOrder.objects.exists())
+        self.assertFalse(SalesOrderItem.objects.exists())
+
+
+class KeysetPaginationTests(InventoryFixtures, TestCase):
+    """Cursor pages over rows that share a created_at, or have none"""
+    ROWS = 23
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+        items = Item.objects.bulk_create([Item(name=f'Part {number}', sku=f'P{number}') for number in range(cls.ROWS)])
+        Inventory.objects.bulk_create([Inventory(item=item, location=cls.location, quantity=1) for item in items])
+        inward = InventoryProcessType.objects.get(code='INWARD')
+        InventoryTransaction.objects.bulk_create([
+            InventoryTransaction(process_type=inward, item=item, location=cls.location, quantity=1) for item in items
+        ])
+
+        # Runs of four rows share a timestamp, and every fifth row has none
+        start = timezone.now()
+        for model in (Inventory, InventoryTransaction):
+            for position, pk in enumerate(model.objects.order_by('pk').values_list('pk', flat=True)):
+                created_at = None if position % 5 == 4 else start - timedelta(seconds=position // 4)
+                model.objects.filter(pk=pk).update(created_at=created_at)
+        Inventory.objects.filter(pk=Inventory.objects.order_by('pk').values('pk')[:1]).update(deleted=True)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 4)
+            seen += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        return seen
+
+    def expected(self, queryset):
+        dated = queryset.filter(created_at__isnull=False).order_by('-created_at', '-id')
+        undated = queryset.filter(created_at__isnull=True).order_by('-id')
+        return list(dated.values_list('pk', flat=True)) + list(undated.values_list('pk', flat=True))
+
+    def test_every_row_is_served_once_in_order(self):
+        listings = {
+            '/inventory/inventory-list/': Inventory.objects.filter(deleted=False),
+            '/inventory/list-inward/': InventoryTransaction.objects.filter(process_type__code='INWARD', deleted=False),
+        }
+        for path, queryset in listings.items():
+            with self.subTest(path=path):
+                self.assertEqual(self.walk(f'{path}?pagination=cursor&page_size=4'), self.expected(queryset))
+
+    def test_a_bad_cursor_is_rejected(self):
+        for cursor in ('not-base64!', 'eHx5', base64.urlsafe_b64encode(b'2024-01-01|x').decode()):
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/inventory/list-inward/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('cursor', response.data)
+
+
+class TransactionExportTests(InventoryFixtures, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+
+    def setUp(self):
+        super().setUp()
+        self.post('INWARD', item=self.item, location=self.location, quantity=10, reference_number='PO,1')
+        self.post('OUTWARD', item=self.item, location=self.location, quantity=4)
+        self.post('TRANSFER', item=self.item, from_location=self.location, to_location=self.other_location, quantity=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/inventory/transactions/export/', params)
+            self.assertEqual(response.status_code, 200)
+            content = b''.join(response.streaming_content).decode()
+        return response, content, len(queries)
+
+    def test_ndjson_and_csv(self):
+        response, content, _ = self.export()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['process_type'] for row in rows], ['INWARD', 'OUTWARD', 'TRANSFER'])
+        self.assertEqual(list(rows[0]), [name for name, _ in exports.JOURNAL_COLUMNS])
+
+        response, content, _ = self.export(output='csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['reference_number'], 'PO,1')
+        self.assertEqual(rows[2]['to_location'], 'A2')
+
+        self.assertEqual(self.client.get('/inventory/transactions/export/', {'output': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get('/inventory/transactions/export/', {'from': 'May'}).status_code, 400)
+
+    def test_filters(self):
+        tomorrow = (timezone.localdate() + timedelta(days=1)).isoformat()
+        cases = {
+            'process_type': ({'process_type': 'OUTWARD'}, 1),
+            'location': ({'location': self.other_location.pk}, 1),
+            'item': ({'item': Item.objects.create(name='Gadget', sku='G1').pk}, 0),
+            'from': ({'from': tomorrow}, 0),
+            'to': ({'to': tomorrow, 'output': 'csv'}, 4),
+        }
+        for name, (params, lines) in cases.items():
+            with self.subTest(name):
+                _, content, _ = self.export(**params)
+                self.assertEqual(len(content.splitlines()), lines)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        _, content, few = self.export()
+        inward = InventoryProcessType.objects.get(code='INWARD')
+        InventoryTransaction.objects.bulk_create([
+            InventoryTransaction(process_type=inward, item=self.item, location=self.location, quantity=1)
+            for _ in range(50)
+        ])
+        _, content, many = self.export()
+        self.assertEqual(len(content.splitlines()), 53)
+        self.assertEqual(many, few)
+
+
+class InventorySummaryTests(InventoryFixtures, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+
+    def summary(self):
+        return {
+            (row.item_id, row.location_id): (row.total_quantity, row.reserved_quantity)
+            for row in InventorySummary.objects.all()
+        }
+
+    def assert_summary_matches_rebuild(self):
+        incremental = self.summary()
+        InventorySummaryService.rebuild()
+        self.assertEqual(incremental, self.summary())
+
+    def test_stock_posted_onto_a_deleted_row_starts_it_afresh(self):
+        self.post('INWARD', item=self.item, location=self.location, quantity=10)
+        row = Inventory.objects.get(item=self.item, location=self.location)
+        Inventory.objects.filter(pk=row.pk).update(deleted=True)
+        InventorySummaryService.refresh([(self.item.pk, self.location.pk)])
+
+        self.post('INWARD', item=self.item, location=self.location, quantity=5)
+        self.post('TRANSFER', item=self.item, from_location=self.location, to_location=self.other_location, quantity=2)
+        Inventory.objects.filter(item=self.item, location=self.other_location).update(deleted=True)
+        InventorySummaryService.refresh([(self.item.pk, self.other_location.pk)])
+        self.post('TRANSFER', item=self.item, from_location=self.location, to_location=self.other_location, quantity=1)
+
+        row.refresh_from_db()
+        self.assertEqual((row.deleted, row.quantity), (False, 2))
+        self.assertEqual(self.stock(self.other_location), 1)
+        self.assertEqual(InventoryLog.objects.filter(inventory=row).order_by('pk').last().quantity_after, 2)
+        self.assert_summary_matches_rebuild()
+
+    def test_bulk_postings_onto_a_deleted_row(self):
+        self.post('INWARD', item=self.item, location=self.location, quantity=10)
+        Inventory.objects.filter(item=self.item).update(deleted=True)
+        InventorySummaryService.refresh([(self.item.pk, self.location.pk)])
+
+        line = {'item': self.item.pk, 'location': self.location.pk}
+        result = InventoryTransactionService(self.user).create_transactions_bulk([
+            {'process_type': 'INWARD', 'quantity': 4, **line},
+            {'process_type': 'OUTWARD', 'quantity': 3, **line},
+        ])
+        self.assertEqual(result.posted, 2)
+        self.assertEqual(self.stock(), 1)
+        self.assert_summary_matches_rebuild()
+
+    def test_moving_a_row_directly_refreshes_both_summaries(self):
+        self.post('INWARD', item=self.item, location=self.location, quantity=10)
+        row = Inventory.objects.get(item=self.item, location=self.location)
+        row.location = self.other_location
+        row.save()
+
+        self.assertEqual(self.summary(), {
+            (self.item.pk, self.location.pk): (0, 0),
+            (self.item.pk, self.other_location.pk): (10, 0),
+        })
+
+    def test_stock_summary_response(self):
+        self.post('INWARD', item=self.item, location=self.location, quantity=10)
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.get('/inventory/stock-summary/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_items'], 1)
+        self.assertEqual(response.data['summary'][0]['item__name'], 'Widget')
+        self.assertEqual(response.data['summary'][0]['total_quantity'], 10)
+
+
+class StockBalanceTests(InventoryFixtures, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        # 10 in three days ago, 4 out yesterday
+        for process_type, quantity, days_ago in (('INWARD', 10, 3), ('OUTWARD', 4, 1)):
+            result = self.post(process_type, item=self.item, location=self.location, quantity=quantity)
+            InventoryLog.objects.filter(transaction_id=result.transaction_id).update(
+                timestamp=timezone.now() - timedelta(days=days_ago),
+            )
+
+    def balance(self, as_of):
+        return {
+            (row['item'], row['location']): row['quantity_as_of']
+            for row in StockBalanceService.balances_as_of(as_of, item=self.item.pk)
+        }
+
+    def end_of(self, days_ago):
+        return StockSnapshotService.end_of_day(self.today - timedelta(days=days_ago))
+
+    def test_balances_replay_the_ledger_before_any_snapshot(self):
+        key = (self.item.pk, self.location.pk)
+        self.assertEqual(self.balance(self.end_of(4)), {key: 0})
+        self.assertEqual(self.balance(self.end_of(2)), {key: 10})
+        self.assertEqual(self.balance(timezone.now()), {key: 6})
+
+    def test_balances_start_from_the_latest_snapshot(self):
+        StockSnapshotService.take_snapshot(self.today - timedelta(days=2))
+        # Entries covered by the snapshot are no longer read
+        InventoryLog.objects.filter(timestamp__lte=self.end_of(2)).delete()
+
+        key = (self.item.pk, self.location.pk)
+        self.assertEqual(self.balance(self.end_of(2)), {key: 10})
+        with self.assertNumQueries(5):  # snapshot day, snapshot rows, ledger deltas, item and location names
+            self.assertEqual(self.balance(timezone.now()), {key: 6})
+
+    def test_rows_deleted_later_keep_their_history(self):
+        Inventory.objects.filter(item=self.item).update(deleted=True)
+        self.assertEqual(self.balance(self.end_of(2)), {(self.item.pk, self.location.pk): 10})
+
+
+class StockSnapshotTests(InventoryFixtures, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+
+    def setUp(self):
+        super().setUp()
+        self.post('INWARD', item=self.item, location=self.location, quantity=10, rate=2)
+        self.post('INWARD', item=self.item, location=self.other_location, quantity=10, rate=4)
+        self.today = timezone.localdate()
+
+    def test_filtered_valuation_uses_the_item_wide_average(self):
+        scopes = ({'location': self.location.pk}, {'warehouse': self.warehouse.pk}, {'item': self.item.pk})
+        key = (self.item.pk, self.location.pk)
+
+        for snapshotted in (False, True):
+            if snapshotted:
+                StockSnapshotService.take_snapshot(self.today)
+            everything = StockSnapshotService.balances_on(self.today)
+            self.assertEqual(everything[key], {"quantity": 10, "average_rate": 3, "value": 30})
+            for scope in scopes:
+                with self.subTest(snapshotted=snapshotted, **scope):
+                    balances = StockSnapshotService.balances_on(self.today, **scope)
+                    self.assertEqual(balances[key], everything[key])
+                    report = StockSnapshotService.period_report(self.today, self.today, **scope)
+                    self.assertEqual(report[0]["closing_value"], 30)
+
+        balances = StockSnapshotService.balances_on(self.today, location=self.location.pk)
+        self.assertEqual(list(balances), [key])
+
+    def test_snapshots_are_taken_once_per_day(self):
+        self.assertEqual(StockSnapshotService.run_scheduled(until=self.today), [(self.today, 2)])
+        self.assertEqual(StockSnapshotService.run_scheduled(until=self.today), [])
+        self.post('OUTWARD', item=self.item, location=self.location, quantity=4)
+        self.assertEqual(StockSnapshotService.take_snapshot(self.today), 2)
+        self.assertEqual(
+            set(InventorySnapshot.objects.values_list('snapshot_date', 'location', 'quantity', 'value')),
+            {(self.today, self.location.pk, 6, 18), (self.today, self.other_location.pk, 10, 30)},
+        )
+
+    def test_month_end_view(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        month = self.today.strftime('%Y-%m')
+
+        response = client.get('/inventory/stock-month-end/', {'month': month, 'location': self.location.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results']['total_value'], 30)
+        self.assertEqual(response.data['results']['month_end'].strftime('%Y-%m'), month)
+
+        for month in ('2024-13', '2024-00', '2024', '2024-1-1', 'May', ''):
+            with self.subTest(month=month):
+                self.assertEqual(client.get('/inventory/stock-month-end/', {'month': month}).status_code, 400)
+
+
+class StockReservationTests(InventoryFixtures, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+        cls.customer = Customer.objects.create(name='Retail')
+
+    def setUp(self):
+        super().setUp()
+        self.post('INWARD', item=self.item, location=self.location, quantity=10)
+        self.row = Inventory.objects.get(item=self.item, location=self.location)
+        self.service = StockReservationService(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sales_order(self, quantity):
+        order = SalesOrder.objects.create(customer=self.customer, created_by=self.user)
+        SalesOrderItem.objects.create(sales_order=order, item=self.item, quantity=quantity, rate=1)
+        return order
+
+    def assert_reserved(self, quantity):
+        self.row.refresh_from_db()
+        summary = InventorySummary.objects.get(item=self.item, location=self.location)
+        self.assertEqual((self.row.reserved_quantity, summary.reserved_quantity), (quantity, quantity))
+        self.assertEqual(StockReservationService.available(self.item), self.row.quantity - quantity)
+
+    def test_reserve_release_and_expiry_keep_the_summary_in_step(self):
+        order = self.sales_order(4)
+        response = self.client.post(f'/inventory/sales-orders/{order.pk}/reserve/')
+        self.assertEqual(response.status_code, 201)
+        self.assert_reserved(4)
+
+        response = self.client.post(f'/inventory/sales-orders/{self.sales_order(7).pk}/reserve/')
+        self.assertEqual(response.status_code, 400)
+        self.assert_reserved(4)
+
+        self.assertEqual(self.client.post(f'/inventory/sales-orders/{order.pk}/release/').status_code, 200)
+        self.assert_reserved(0)
+
+        held = self.service.reserve(self.row, 3, expires_at=timezone.now() - timedelta(minutes=1))
+        self.service.reserve(self.row, 2)
+        self.assert_reserved(5)
+        self.assertEqual(self.service.expire(), 1)
+        held.refresh_from_db()
+        self.assertEqual(held.status, StockReservation.EXPIRED)
+        self.assert_reserved(2)
+
+    def test_outward_cannot_take_another_orders_reservation(self):
+        reservation = self.service.reserve(self.row, 8, sales_order_item=self.sales_order(8).items.get())
+
+        result = InventoryTransactionService(self.user).create_transaction({
+            'process_type': 'OUTWARD', 'item': self.item, 'location': self.location, 'quantity': 3,
+        })
+        self.assertFalse(result.success)
+        self.post('OUTWARD', item=self.item, location=self.location, quantity=2)
+        self.assert_reserved(8)
+
+        self.post('OUTWARD', item=self.item, location=self.location, quantity=8, reservation=reservation.pk)
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, StockReservation.CONSUMED)
+        self.assertEqual(self.stock(), 0)
+        self.assert_reserved(0)
+
+
+class StockAllocationTests(InventoryFixtures, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+        today = timezone.localdate()
+        cls.late = ItemBatch.objects.create(batch_number='LATE', expiry_date=today + timedelta(days=30))
+        cls.early = ItemBatch.objects.create(batch_number='EARLY', expiry_date=today + timedelta(days=5))
+
+    def setUp(self):
+        super().setUp()
+        self.post('INWARD', item=self.item, location=self.location, batch=self.late, quantity=5)
+        self.post('INWARD', item=self.item, location=self.other_location, batch=self.early, quantity=5)
+        self.post('INWARD', item=self.item, location=self.location, quantity=5)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def allocate(self, **data):
+        return self.client.post('/inventory/allocate-outward/', data, format='json')
+
+    def legs(self, response):
+        return [(leg['batch'], leg['quantity']) for leg in response.data['legs']]
+
+    def outwards(self):
+        return InventoryTransaction.objects.filter(process_type__code='OUTWARD').count()
+
+    def test_fifo_and_fefo_leg_selection(self):
+        lines = [{'item': self.item.pk, 'quantity': 7}]
+        response = self.allocate(lines=lines, dry_run=True)
+        self.assertEqual(self.legs(response), [(self.late.pk, 5), (self.early.pk, 2)])
+
+        response = self.allocate(lines=lines, strategy='fefo', dry_run=True)
+        self.assertEqual(self.legs(response), [(self.early.pk, 5), (self.late.pk, 2)])
+        self.assertEqual(self.outwards(), 0)
+
+        response = self.allocate(lines=[{'item': self.item.pk, 'quantity': 12}], strategy='fefo')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.legs(response), [(self.early.pk, 5), (self.late.pk, 5), (None, 2)])
+        self.assertEqual(InventorySummary.objects.aggregate(total=Sum('total_quantity'))['total'], 3)
+
+    def test_a_shortfall_posts_nothing(self):
+        other = Item.objects.create(name='Gadget', sku='G1')
+        response = self.allocate(lines=[{'item': self.item.pk, 'quantity': 5}, {'item': other.pk, 'quantity': 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], ['Insufficient stock for Gadget: short by 1.0'])
+        self.assertEqual(self.outwards(), 0)
+        self.assertEqual(Inventory.objects.aggregate(total=Sum('quantity'))['total'], 15)
+
+    def test_sales_order_allocation_consumes_its_reservation_first(self):
+        order = SalesOrder.objects.create(customer=Customer.objects.create(name='Retail'), created_by=self.user)
+        SalesOrderItem.objects.create(sales_order=order, item=self.item, quantity=6, rate=1)
+        unbatched = Inventory.objects.get(item=self.item, batch=None)
+        reservation = StockReservationService(self.user).reserve(unbatched, 2, sales_order_item=order.items.get())
+
+        response = self.allocate(sales_order=order.pk)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.legs(response), [(None, 2), (self.late.pk, 4)])
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, StockReservation.CONSUMED)
+        self.assertEqual(InventoryTransaction.objects.filter(sales_order=order).aggregate(total=Sum('quantity'))['total'], 6)
+
+        response = self.allocate(sales_order=order.pk)
+        self.assertEqual(response.status_code, 400)
+
+    def test_malformed_lines_are_rejected(self):
+        for lines in ([5], 'abc', [{'item': 'x', 'quantity': 1}], [{'item': self.item.pk}], []):
+            with self.subTest(lines=lines):
+                self.assertEqual(self.allocate(lines=lines).status_code, 400)
+
+
+class ItemImportTests(InventoryFixtures, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+
+    def run_import(self, text):
+        return ItemImportService().import_stream(io.StringIO(text))
+
+    def test_import_creates_then_updates_items(self):
+        self.item.deleted = True
+        self.item.save()
+
+        result = self.run_import("sku,name,barcode,category\nW1,Widget,1001,Parts\nW2,Gadget,2002,Parts\n")
+        self.assertEqual((result.created, result.updated, result.failed), (1, 1, 0))
+        self.item.refresh_from_db()
+        self.assertFalse(self.item.deleted)
+        self.assertEqual(self.item.category.name, 'Parts')
+        gadget = Item.objects.get(sku='W2')
+        self.assertEqual((gadget.is_active, gadget.reorder_point), (True, 0))
+
+        result = self.run_import("sku,barcode,reorder_point\nW2,2003,5\n")
+        self.assertEqual((result.created, result.updated, result.failed), (0, 1, 0))
+        gadget.refresh_from_db()
+        self.assertEqual((gadget.name, gadget.barcode, gadget.reorder_point), ('Gadget', '2003', 5))
+        self.assertEqual(
+            set(ItemCode.objects.filter(item=gadget, primary=True).values_list('code_type', 'code')),
+            {(ItemCode.BARCODE, '2003'), (ItemCode.SKU, 'W2')},
+        )
+
+    def test_values_owned_by_another_sku_are_rejected_by_row(self):
+        result = self.run_import("sku,name,barcode\nW2,Gadget,1001\nW3,Gizmo,3003\n")
+        self.assertEqual((result.created, result.failed), (1, 1))
+        self.assertEqual(result.errors[0]['line'], 2)
+        self.assertFalse(Item.objects.filter(sku='W2').exists())
+
+
+class CycleCountTests(InventoryFixtures, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+        cls.gadget = Item.objects.create(name='Gadget', sku='W2')
+
+    def run_import(self, text, reference='GO-LIVE'):
+        return CycleCountService(self.user, reference=reference).import_stream(io.StringIO(text))
+
+    def adjustments(self):
+        return InventoryTransaction.objects.filter(process_type__code='ADJUSTMENT')
+
+    def test_opening_balances_create_stock_and_ledger(self):
+        result = self.run_import("sku,location,counted_quantity\nW1,A1,10\nW2,A2,4\n")
+        self.assertEqual((result.counted, result.adjusted, result.failed), (2, 2, 0))
+        self.assertEqual(self.stock(), 10)
+        self.assertEqual(Inventory.objects.get(item=self.gadget, location=self.other_location).quantity, 4)
+        self.assertEqual(
+            set(self.adjustments().values_list('item__sku', 'quantity', 'reference_number')),
+            {('W1', 10, 'GO-LIVE'), ('W2', 4, 'GO-LIVE')},
+        )
+        self.assertEqual(InventoryLog.objects.filter(transaction__in=self.adjustments()).count(), 2)
+        self.assertEqual(
+            set(CycleCount.objects.values_list('system_quantity', 'counted_quantity', 'discrepancy')),
+            {(0, 10, 10), (0, 4, 4)},
+        )
+
+    def test_count_posts_its_variance(self):
+        self.post('INWARD', item=self.item, location=self.location, quantity=10)
+
+        result = self.run_import("sku,location,counted_quantity\nW1,A1,7\n", reference='COUNT-1')
+        self.assertEqual((result.counted, result.adjusted, result.summary['loss']), (1, 1, -3))
+        self.assertEqual(self.stock(), 7)
+        count = CycleCount.objects.get(reference='COUNT-1')
+        self.assertEqual((count.system_quantity, count.discrepancy), (10, -3))
+        self.assertEqual((count.adjustment.quantity, count.adjustment.process_type.code), (-3, 'ADJUSTMENT'))
+
+    def test_reimport_changes_nothing(self):
+        text = "sku,location,counted_quantity\nW1,A1,10\nW2,A2,4\n"
+        self.run_import(text)
+        ledger = self.adjustments().count()
+
+        result = self.run_import(text, reference='GO-LIVE-2')
+        self.assertEqual((result.counted, result.adjusted, result.unchanged), (2, 0, 2))
+        self.assertEqual(self.adjustments().count(), ledger)
+        self.assertEqual(self.stock(), 10)
+        self.assertEqual(result.summary['net'], 0)
+
+    def test_malformed_row_rejects_the_file(self):
+        self.post('INWARD', item=self.item, location=self.location, quantity=10)
+        text = "sku,location,counted_quantity\nW1,A1,7\nW2,A2,lots\nW9,A2,1\n"
+
+        result = self.run_import(text)
+        self.assertEqual((result.counted, result.adjusted, result.failed), (0, 0, 2))
+        self.assertEqual([error['line'] for error in result.errors], [3, 4])
+        self.assertEqual(self.stock(), 10)
+        self.assertFalse(CycleCount.objects.exists())
+        self.assertFalse(self.adjustments().exists())
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/inventory/cycle-counts/import/', {'counts': [
+            {'sku': 'W1', 'location': 'A1', 'counted_quantity': 7},
+            {'sku': 'W1', 'location': 'A1', 'counted_quantity': 8},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['failed'], 1)
+        self.assertEqual(self.stock(), 10)
+        self.assertFalse(CycleCount.objects.exists())
+
+    def test_dry_run_reports_without_posting(self):
+        self.post('INWARD', item=self.item, location=self.location, quantity=10)
+
+        result = CycleCountService(self.user, reference='COUNT-1').import_stream(
+            io.StringIO("sku,location,counted_quantity\nW1,A1,12\n"), dry_run=True,
+        )
+        self.assertEqual((result.adjusted, result.summary['gain']), (1, 2))
+        self.assertEqual([line['discrepancy'] for line in result.variance], [2])
+        self.assertEqual(self.stock(), 10)
+        self.assertFalse(CycleCount.objects.exists())
+
+
+class BenchmarkHarnessTests(TestCase):
+    """
+    run_benchmarks is a management command, not a test-runner plugin; this only checks that
+    every registered benchmark runs against a small dataset and that nothing is kept
+    """
+
+    def test_every_benchmark_runs_and_rolls_back(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            call_command(
+                'run_benchmarks', items=20, locations=5, stock_rows=50, rounds=2, warmup=0,
+                output=output, stdout=io.StringIO(),
+            )
+            with open(output, encoding='utf-8') as stream:
+                report = json.load(stream)
+
+        self.assertEqual(
+            {(entry['group'], entry['name']) for entry in report['benchmarks']},
+            {(group, name) for group, name, _ in BENCHMARKS},
+        )
+        for entry in report['benchmarks']:
+            self.assertEqual(entry['stats']['rounds'], 2)
+        self.assertFalse(Item.objects.exists())
+
+
+class DataGeneratorTests(TestCase):
+    """generate_inventory_data at a tiny scale: the counts it reports and a consistent stock picture"""
+
+    def test_small_dataset_is_consistent(self):
+        output = io.StringIO()
+        call_command(
+            'generate_inventory_data', transactions=300, items=20, categories=3, warehouses=1, zones=1, aisles=2,
+            racks=2, bins=2, suppliers=3, customers=5, purchase_orders=10, sales_orders=10, days=30,
+            end_date='2026-01-31', chunk_size=100, stdout=output,
+        )
+        self.assertIn('Generated in', output.getvalue())
+
+        self.assertEqual(Warehouse.objects.count(), 1)
+        self.assertEqual(Location.objects.count(), 8)
+        self.assertEqual(Item.objects.count(), 20)
+        self.assertEqual(Supplier.objects.count(), 3)
+        self.assertEqual(PurchaseOrder.objects.count(), 10)
+        self.assertEqual(SalesOrder.objects.count(), 10)
+        self.assertEqual(InventoryTransaction.objects.count(), 300)
+        self.assertEqual(
+            set(InventoryTransaction.objects.values_list('process_type__code', flat=True)),
+            {'INWARD', 'OUTWARD', 'TRANSFER', 'ADJUSTMENT', 'RETURN'},
+        )
+        self.assertFalse(Inventory.objects.filter(quantity__lt=0).exists())
+
+        # Every stock row is the sum of its ledger entries, and each entry continues the last
+        ledger = dict(InventoryLog.objects.values('inventory').annotate(total=Sum('quantity_changed'))
+                      .values_list('inventory', 'total'))
+        self.assertEqual(set(ledger), set(Inventory.objects.values_list('pk', flat=True)))
+        for pk, quantity in Inventory.objects.values_list('pk', 'quantity'):
+            self.assertAlmostEqual(ledger[pk], quantity)
+        for entry in InventoryLog.objects.all()[:100]:
+            self.assertAlmostEqual(entry.quantity_before + entry.quantity_changed, entry.quantity_after)
+
+        totals = {
+            (row['item'], row['location']): row['total']
+            for row in Inventory.objects.values('item', 'location').annotate(total=Sum('quantity'))
+        }
+        summary = {
+            (item, location): quantity
+            for item, location, quantity in InventorySummary.objects.values_list('item', 'location', 'total_quantity')
+        }
+        self.assertEqual(summary, totals)
+
+
+class ItemCodeSyncTests(InventoryFixtures, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+
+    def primary_codes(self):
+        return set(ItemCode.objects.filter(item=self.item, primary=True).values_list('code_type', 'code'))
+
+    def test_saving_an_item_resyncs_only_changed_codes(self):
+        item = Item.objects.get(pk=self.item.pk)
+        with self.assertNumQueries(1):
+            item.name = 'Large widget'
+            item.save()
+
+        item.barcode = '1002'
+        item.save()
+        self.assertEqual(self.primary_codes(), {(ItemCode.BARCODE, '1002'), (ItemCode.SKU, 'W1')})
+
+    def test_codes_held_by_item_codes_are_rejected(self):
+        ItemCode.objects.create(item=self.item, code='5005', code_type=ItemCode.GTIN, pack_quantity=6)
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.post('/inventory/post-item/', {'name': 'Gadget', 'sku': 'W2', 'barcode': '5005'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('barcode', response.data)
+
+        serializer = ItemSerializer(self.item, data={'barcode': '5005'}, partial=True)
+        self.assertFalse(serializer.is_valid())
+        serializer = ItemSerializer(self.item, data={'barcode': '1001', 'sku': 'W1'}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        result = ItemImportService().import_stream(io.StringIO("sku,name,barcode\nW2,Gadget,5005\nW3,Gizmo,3003\n"))
+        self.assertEqual((result.created, result.failed), (1, 1))
+        self.assertIn('alternate code', result.errors[0]['errors'][0])
+
+
+class InventoryCacheTests(InventoryFixtures, TransactionTestCase):
+    """Generation bumps run on commit, so these need real commits"""
+
+    def setUp(self):
+        self.create_fixtures()
+        super().setUp()
+        self.post('INWARD', item=self.item, location=self.location, quantity=10)
+
+    def available(self):
+        return InventoryValidationService.available_quantity(self.item, self.location)
+
+    def generation(self):
+        return inventory_cache.generations(inventory_cache.ITEM, [self.item.pk])[self.item.pk]
+
+    def test_reads_after_a_committed_posting_see_the_new_quantity(self):
+        self.assertEqual(self.available(), 10)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.available(), 10)
+
+        self.post('OUTWARD', item=self.item, location=self.location, quantity=4)
+        self.assertEqual(self.available(), 6)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.available(), 6)
+
+    def test_a_rolled_back_posting_does_not_bump_the_generation(self):
+        self.assertEqual(self.available(), 10)
+        generation = self.generation()
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.post('OUTWARD', item=self.item, location=self.location, quantity=4)
+            raise RuntimeError
+        self.assertEqual(self.generation(), generation)
+        self.assertEqual(self.stock(), 10)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.available(), 10)
+
+
+class ScanLookupCacheTests(InventoryFixtures, TransactionTestCase):
+    """Code changes bump the item generation on commit, so the next scan never sees a stale answer"""
+
+    def setUp(self):
+        self.create_fixtures()
+        super().setUp()
+        self.post('INWARD', item=self.item, location=self.location, quantity=10)
+
+    def test_changed_barcode_is_not_served_from_the_cache(self):
+        found, _ = ScanLookupService.lookup(['1001'])
+        self.assertEqual(found['1001']['quantity'], 10)
+        with self.assertNumQueries(0):
+            ScanLookupService.lookup(['1001'])
+
+        self.item.barcode = '1002'
+        self.item.save()
+
+        found, missing = ScanLookupService.lookup(['1001', '1002'])
+        self.assertEqual(missing, ['1001'])
+        self.assertEqual((found['1002']['id'], found['1002']['barcode']), (self.item.pk, '1002'))
+
+    def test_changed_or_deleted_code_is_not_served_from_the_cache(self):
+        code = ItemCode.objects.create(item=self.item, code='5000', code_type=ItemCode.GTIN, pack_quantity=6)
+        found, _ = ScanLookupService.lookup(['5000'])
+        self.assertEqual((found['5000']['matched'], found['5000']['pack_quantity']), (ItemCode.GTIN, 6))
+
+        code.pack_quantity = 12
+        code.save()
+        found, _ = ScanLookupService.lookup(['5000'])
+        self.assertEqual(found['5000']['pack_quantity'], 12)
+
+        code.delete()
+        found, missing = ScanLookupService.lookup(['5000'])
+        self.assertEqual((found, missing), ({}, ['5000']))
+
+    def test_posting_refreshes_the_cached_stock(self):
+        ScanLookupService.lookup(['1001'])
+        self.post('OUTWARD', item=self.item, location=self.location, quantity=4)
+        found, _ = ScanLookupService.lookup(['1001'])
+        self.assertEqual(found['1001']['quantity'], 6)
+
+
+class ConcurrentReservationTests(InventoryFixtures, TransactionTestCase):
+    """Parallel order entry reserving one stock row, each order through its own connection"""
+    STOCK = 50
+    ORDERS = 200
+    WORKERS = 8
+
+    def setUp(self):
+        super().setUp()
+        self.create_fixtures()
+        self.post('INWARD', item=self.item, location=self.location, quantity=self.STOCK)
+        customer = Customer.objects.create(name='Retail')
+        self.orders = []
+        for _ in range(self.ORDERS):
+            order = SalesOrder.objects.create(customer=customer, created_by=self.user)
+            SalesOrderItem.objects.create(sales_order=order, item=self.item, quantity=1, rate=1)
+            self.orders.append(order)
+
+    def reserve(self, order):
+        try:
+            return bool(StockReservationService(self.user).reserve_sales_order(order))
+        except ValidationError:
+            return False
+        finally:
+            connection.close()
+
+    def assert_no_overbooking(self):
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            reserved = sum(pool.map(self.reserve, self.orders))
+
+        row = Inventory.objects.get(item=self.item, location=self.location)
+        self.assertEqual(reserved, self.STOCK)
+        self.assertEqual((row.quantity, row.reserved_quantity), (self.STOCK, self.STOCK))
+        self.assertEqual(InventorySummary.objects.get(item=self.item, location=self.location).reserved_quantity, self.STOCK)
+        self.assertEqual(StockReservation.objects.filter(status=StockReservation.ACTIVE).count(), self.STOCK)
+
+    @override_settings(INVENTORY_POSTING_MODE=StockPostingService.MODE_LOCKING)
+    def test_locking_mode(self):
+        self.assert_no_overbooking()
+
+    @override_settings(INVENTORY_POSTING_MODE=StockPostingService.MODE_CONDITIONAL)
+    def test_conditional_mode(self):
+        self.assert_no_overbooking()
+
+
+class ConcurrentPostingTests(InventoryFixtures, TransactionTestCase):
+    """Parallel pickers against one stock row, each posting through its own connection"""
+    STOCK = 100
+    POSTINGS = 300
+    WORKERS = 8
+
+    def setUp(self):
+        super().setUp()
+        self.create_fixtures()
+        self.post('INWARD', item=self.item, location=self.location, quantity=self.STOCK)
+
+    def pick(self, _):
+        try:
+            return InventoryTransactionService(self.user).create_transaction({
+                'process_type': 'OUTWARD', 'item': self.item, 'location': self.location, 'quantity': 1,
+            })
+        finally:
+            connection.close()
+
+    def assert_no_oversell(self):
+        with self.assertLogs('inventory.services', 'ERROR'), ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            results = list(pool.map(self.pick, range(self.POSTINGS)))
+        posted = [result for result in results if result.success]
+
+        self.assertEqual(len(posted), self.STOCK)
+        self.assertEqual(self.stock(), 0)
+        self.assertEqual(InventorySummary.objects.get(item=self.item, location=self.location).total_quantity, 0)
+
+        # The ledger holds one entry per posting, and its running balances chain without gaps
+        entries = list(InventoryLog.objects.filter(item=self.item).order_by('pk'))
+        self.assertEqual(len(entries), self.STOCK + 1)
+        balance = 0
+        for entry in entries:
+            self.assertEqual(entry.quantity_before, balance)
+            self.assertEqual(entry.quantity_after, entry.quantity_before + entry.quantity_changed)
+            balance = entry.quantity_after
+        self.assertEqual(balance, 0)
+        self.assertEqual(
+            InventoryTransaction.objects.filter(process_type__code='OUTWARD').aggregate(total=Sum('quantity'))['total'],
+            self.STOCK,
+        )
+
+    @override_settings(INVENTORY_POSTING_MODE=StockPostingService.MODE_LOCKING)
+    def test_locking_mode(self):
+        self.assert_no_oversell()
+
+    @override_settings(INVENTORY_POSTING_MODE=StockPostingService.MODE_CONDITIONAL)
+    def test_conditional_mode(self):
+        self.assert_no_oversell()
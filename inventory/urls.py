@@ -4,6 +4,7 @@ from .views import *
 urlpatterns = [
     path('items/', ItemListView.as_view()),
     path('post-item/', ItemCreateView.as_view()),
+    path('items/import/', ItemImportView.as_view(), name='item-import'),
 
     path('item-categories/', ItemCategoryListView.as_view()),
     path('item-categories/create/', ItemCategoryCreateView.as_view()),
@@ -23,6 +24,7 @@ urlpatterns = [
     path('list-inward/', InwardListView.as_view()),
     # path('create-inward/', InwardCreateView.as_view()),
     path('list-outward/', OutwardListView.as_view()),
+    path('transactions/export/', TransactionExportView.as_view(), name='transaction-export'),
     # path('create-outward/', OutwardCreateView.as_view()),
 
     path('inventory-create/', InventoryCreateView.as_view(), name='inventory-create'),
@@ -30,12 +32,16 @@ urlpatterns = [
     path('inventory-delete/<int:pk>/', InventorySoftDeleteView.as_view(), name='inventory-soft-delete'),
     path('inventory-list/', InventoryListView.as_view(), name='inventory-list'),
 
-    # path('logs/', InventoryLogListView.as_view()),
+    path('logs/', InventoryLogListView.as_view(), name='inventory-log-list'),
+    path('stock-as-of/', StockAsOfView.as_view(), name='stock-as-of'),
+    path('stock-month-end/', StockMonthEndView.as_view(), name='stock-month-end'),
+    path('stock-movement/', StockMovementView.as_view(), name='stock-movement'),
 
     # path('inventory-transfer/', InventoryTransferCreateView.as_view(), name='inventory-transfer'),
     # path('inventory-adjustment/', InventoryAdjustmentCreateView.as_view(), name='inventory-adjustment'),
     # path('inventory-return/', InventoryReturnCreateView.as_view(), name='inventory-return'),
-    # path('inventory-cycle-count/', CycleCountCreateView.as_view(), name='inventory-cycle-count'),
+    path('cycle-counts/import/', CycleCountImportView.as_view(), name='cycle-count-import'),
+    path('cycle-counts/variance/', CycleCountVarianceView.as_view(), name='cycle-count-variance'),
 
     path('get-suppliers/', SupplierListView.as_view(), name='supplier-list'),
     path('create-suppliers/', SupplierCreateView.as_view(), name='supplier-create'),
@@ -43,6 +49,7 @@ urlpatterns = [
     path('purchase-orders/', PurchaseOrderListView.as_view(), name='purchaseorder-list'),
     path('purchase-orders/create/', PurchaseOrderCreateView.as_view(), name='purchaseorder-create'),
     path('purchase-orders/filter/', FilteredPurchaseOrderListView.as_view(), name='purchaseorder-filter'),
+    path('purchase-orders/fulfilment/', PurchaseOrderFulfilmentView.as_view(), name='purchaseorder-fulfilment'),
 
     # Notification URLs
     # path('notifications/', NotificationListView.as_view(), name='notification-list'),
@@ -51,14 +58,24 @@ urlpatterns = [
 
     # Barcode search
     path('barcode-search/', BarcodeSearchView.as_view(), name='barcode-search'),
+    path('scan/', ScanLookupView.as_view(), name='scan-lookup'),
+    path('item-codes/', ItemCodeListCreateView.as_view(), name='item-code-list'),
+    path('item-codes/search/', ItemCodeSearchView.as_view(), name='item-code-search'),
+    path('item-codes/<int:pk>/', ItemCodeDeleteView.as_view(), name='item-code-delete'),
 
     #! customer URLs
     path('list-customers/', CustomerListCreateView.as_view(), name='customer-list'),
     path('post-customers/', CustomerCreateView.as_view(), name='customer-create'),
 
     #! sales order URLs
-    # path('list-sales-orders/', SalesOrderListView.as_view(), name='salesorder-list'),
+    path('list-sales-orders/', SalesOrderListView.as_view(), name='salesorder-list'),
     path('post-sales-orders/', SalesOrderCreateView.as_view(), name='salesorder-create'),
+    path('sales-orders/<int:pk>/reserve/', SalesOrderReserveView.as_view(), name='salesorder-reserve'),
+    path('sales-orders/<int:pk>/release/', SalesOrderReleaseView.as_view(), name='salesorder-release'),
+
+    #! stock reservations
+    path('reservations/', StockReservationListCreateView.as_view(), name='reservation-list'),
+    path('reservations/<int:pk>/release/', StockReservationReleaseView.as_view(), name='reservation-release'),
 
     #! invoice
     # path('list-invoices/', InvoiceListView.as_view(), name='invoice-list'),
@@ -67,5 +84,7 @@ urlpatterns = [
     #! inventory transaction
     # path('list-transactions/', InventoryTransactionListView.as_view(), name='inventory-transaction-list'),
     path('create-transaction/', InventoryTransactionCreateView.as_view(), name='inventory-transaction-create'),
+    path('create-transactions/bulk/', InventoryTransactionBulkCreateView.as_view(), name='inventory-transaction-bulk-create'),
+    path('allocate-outward/', AllocateOutwardView.as_view(), name='allocate-outward'),
 
 ]
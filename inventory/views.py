@@ -4,26 +4,36 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
 from api.permission import *
-from django.utils.dateparse import parse_date
+from django.utils.dateparse import parse_date, parse_datetime
 from django.utils import timezone
-from django.db.models import Sum
+from datetime import date, datetime, time, timedelta
+import calendar
+import io
+from django.db.models import F, Sum
+from django.db import IntegrityError, transaction
+from django.core.exceptions import ValidationError
 from django.core.cache import cache
+from django.http import StreamingHttpResponse
 
 from .models import *
 from .serializers import *
-from .services import InventoryTransactionService, InventoryValidationService, TransactionResult
+from . import exports
+from .pagination import paginator_for
+from .eager_loading import eager_load
+from .services import InventoryTransactionService, InventoryValidationService, TransactionResult, BulkTransactionResult, StockBalanceService, StockSnapshotService, StockReservationService, StockAllocationService, ItemImportService, CycleCountService, ScanLookupService, ItemCodeService
 from tasks.models import *
 
 # ------------------- ITEM ------------------- #
 class ItemListView(APIView):
     permission_classes = [IsAuthenticated]
     pagination_class = PageNumberPagination
+    query_budget = 3
 
     def get(self, request):
         items = Item.objects.filter(deleted=False)
         
         # Apply pagination
-        paginator = self.pagination_class()
+        paginator = paginator_for(request, self.pagination_class)
         paginated_items = paginator.paginate_queryset(items, request)
         
         serializer = ItemSerializer(paginated_items, many=True)
@@ -43,6 +53,39 @@ class ItemCreateView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+class ItemImportView(APIView):
+    """
+    Bulk catalogue import: upload a CSV or NDJSON `file` (format from the file name, or
+    `file_format`). Items are upserted on sku; rejected rows are listed in `errors`.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({"error": "A 'file' upload is required"}, status=400)
+
+        file_format = request.data.get('file_format') or ItemImportService.detect_format(upload.name)
+        if file_format not in (ItemImportService.CSV, ItemImportService.NDJSON):
+            return Response({"error": "'file_format' must be 'csv' or 'ndjson'"}, status=400)
+
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            result = ItemImportService().import_stream(stream, file_format)
+        except ValidationError as e:
+            return Response({"error": "; ".join(e.messages)}, status=400)
+        except UnicodeDecodeError:
+            return Response({"error": "The file must be UTF-8 encoded"}, status=400)
+
+        return Response({
+            "success": result.failed == 0,
+            "total": result.total,
+            "created": result.created,
+            "updated": result.updated,
+            "failed": result.failed,
+            "errors": result.errors,
+        }, status=status.HTTP_200_OK)
+
 # ------------------- ITEM CATEGORY ------------------- #
 class ItemCategoryCreateView(APIView):
     permission_classes = [IsAuthenticated]
@@ -126,22 +169,31 @@ class QualityStatusListView(APIView):
 # ------------------- INVENTORY SUMMARY ------------------- #
 class InventorySummaryView(APIView):
     permission_classes = [IsAuthenticated]
+    query_budget = 1
 
     def get(self, request):
-        # Use caching for inventory summary
-        cache_key = "inventory_summary"
-        summary_data = cache.get(cache_key)
-        
-        if not summary_data:
-            inventory_summary = Inventory.objects.filter(deleted=False).select_related(
-                'item', 'location'
-            ).values('item__name', 'location__code').annotate(
-                total_quantity=Sum('quantity')
-            )
-            
-            summary_data = list(inventory_summary)
-            cache.set(cache_key, summary_data, 300)  # Cache for 5 minutes
-        
+        # Served from the InventorySummary table, which stock postings keep current
+        summaries = InventorySummary.objects.all()
+
+        item_id = request.query_params.get('item')
+        location_id = request.query_params.get('location')
+        warehouse_id = request.query_params.get('warehouse')
+        if item_id:
+            summaries = summaries.filter(item_id=item_id)
+        if location_id:
+            summaries = summaries.filter(location_id=location_id)
+        if warehouse_id:
+            summaries = summaries.filter(location__warehouse_id=warehouse_id)
+        if request.query_params.get('in_stock') == 'true':
+            summaries = summaries.filter(total_quantity__gt=0)
+
+        summaries = summaries.values(
+            'item', 'item__name', 'location', 'location__code', 'total_quantity', 'reserved_quantity'
+        ).annotate(
+            available_quantity=F('total_quantity') - F('reserved_quantity')
+        ).order_by('item', 'location')
+
+        summary_data = list(summaries)
         return Response({
             "summary": summary_data,
             "total_items": len(summary_data)
@@ -151,6 +203,7 @@ class InventorySummaryView(APIView):
 class InventoryListView(APIView):
     permission_classes = [IsAuthenticated]
     pagination_class = PageNumberPagination
+    query_budget = 3
 
     def get(self, request):
         inventory_list = Inventory.objects.filter(deleted=False).select_related(
@@ -158,7 +211,7 @@ class InventoryListView(APIView):
         )
         
         # Apply pagination
-        paginator = self.pagination_class()
+        paginator = paginator_for(request, self.pagination_class)
         paginated_inventory = paginator.paginate_queryset(inventory_list, request)
         
         serializer = InventorySerializer(paginated_inventory, many=True)
@@ -212,6 +265,205 @@ class InventorySoftDeleteView(APIView):
         
         return Response({"message": "Inventory deleted successfully"}, status=status.HTTP_200_OK)
 
+# ------------------- STOCK LEDGER ------------------- #
+def parse_as_of(value):
+    """Parse a datetime, or a date meaning the end of that day, into an aware datetime"""
+    as_of = parse_datetime(value)
+    if as_of is None:
+        day = parse_date(value)
+        if day is None:
+            return None
+        as_of = datetime.combine(day, time.max)
+    if timezone.is_naive(as_of):
+        as_of = timezone.make_aware(as_of)
+    return as_of
+
+
+class InventoryLogListView(APIView):
+    permission_classes = [IsAuthenticated]
+    pagination_class = PageNumberPagination
+    query_budget = 3
+
+    def get(self, request):
+        logs = InventoryLog.objects.select_related('item', 'location')
+
+        item_id = request.query_params.get('item')
+        if item_id:
+            logs = logs.filter(item_id=item_id)
+
+        location_id = request.query_params.get('location')
+        if location_id:
+            logs = logs.filter(location_id=location_id)
+
+        date_from = request.query_params.get('date_from')
+        if date_from:
+            logs = logs.filter(timestamp__gte=date_from)
+
+        date_to = request.query_params.get('date_to')
+        if date_to:
+            logs = logs.filter(timestamp__lte=date_to)
+
+        paginator = self.pagination_class()
+        paginated_logs = paginator.paginate_queryset(logs, request)
+
+        serializer = InventoryLogSerializer(paginated_logs, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class StockAsOfView(APIView):
+    """Stock per item and location as of a point in time (?at=YYYY-MM-DD or ISO datetime)"""
+    permission_classes = [IsAuthenticated]
+    pagination_class = PageNumberPagination
+
+    def get(self, request):
+        at = request.query_params.get('at')
+        as_of = parse_as_of(at) if at else None
+        if as_of is None:
+            return Response({"error": "A valid 'at' date or datetime is required"}, status=400)
+
+        balances = StockBalanceService.balances_as_of(
+            as_of,
+            item=request.query_params.get('item'),
+            location=request.query_params.get('location'),
+            warehouse=request.query_params.get('warehouse'),
+        )
+
+        paginator = self.pagination_class()
+        paginated_balances = paginator.paginate_queryset(balances, request)
+        return paginator.get_paginated_response({
+            "as_of": as_of,
+            "balances": paginated_balances,
+        })
+
+
+def snapshot_filters(request):
+    return {
+        "item": request.query_params.get('item'),
+        "location": request.query_params.get('location'),
+        "warehouse": request.query_params.get('warehouse'),
+    }
+
+
+class StockMonthEndView(APIView):
+    """Closing quantity and value per item and location at a month end (?month=YYYY-MM)"""
+    permission_classes = [IsAuthenticated]
+    pagination_class = PageNumberPagination
+
+    def get(self, request):
+        try:
+            year, month = (int(part) for part in request.query_params.get('month', '').split('-'))
+            # monthrange rejects months outside 1-12 rather than rolling them into another year
+            month_end = date(year, month, calendar.monthrange(year, month)[1])
+        except ValueError:
+            return Response({"error": "A valid 'month' (YYYY-MM) is required"}, status=400)
+
+        balances = StockSnapshotService.balances_on(month_end, **snapshot_filters(request))
+        rows = [
+            {"item": item_id, "location": location_id, **balance}
+            for (item_id, location_id), balance in sorted(balances.items())
+        ]
+
+        paginator = self.pagination_class()
+        paginated_rows = paginator.paginate_queryset(rows, request)
+        return paginator.get_paginated_response({
+            "month_end": month_end,
+            "total_value": sum(row["value"] for row in rows),
+            "balances": paginated_rows,
+        })
+
+
+class StockMovementView(APIView):
+    """Opening, inward, outward and closing stock per item and location (?from=&to= dates)"""
+    permission_classes = [IsAuthenticated]
+    pagination_class = PageNumberPagination
+
+    def get(self, request):
+        date_from = parse_date(request.query_params.get('from', ''))
+        date_to = parse_date(request.query_params.get('to', ''))
+        if not date_from or not date_to or date_from > date_to:
+            return Response({"error": "Valid 'from' and 'to' dates are required"}, status=400)
+
+        report = StockSnapshotService.period_report(date_from, date_to, **snapshot_filters(request))
+
+        paginator = self.pagination_class()
+        paginated_report = paginator.paginate_queryset(report, request)
+        return paginator.get_paginated_response({
+            "from": date_from,
+            "to": date_to,
+            "movements": paginated_report,
+        })
+
+# ------------------- CYCLE COUNT ------------------- #
+class CycleCountImportView(APIView):
+    """
+    Bulk physical count or opening-balance load. Send `counts` as a JSON list of
+    {sku, location, batch, lot, counted_quantity, notes}, or upload them as a CSV/NDJSON
+    `file`. Optional: `reference`, `warehouse` (to resolve location codes) and `dry_run`,
+    which reports the variance without posting anything. A file with any invalid row is
+    rejected with a 400 and nothing posted.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        service = CycleCountService(
+            request.user, reference=request.data.get('reference') or None,
+            warehouse=request.data.get('warehouse') or None,
+        )
+
+        upload = request.FILES.get('file')
+        try:
+            if upload:
+                file_format = request.data.get('file_format') or CycleCountService.detect_format(upload.name)
+                stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+                result = service.import_stream(stream, file_format, dry_run=dry_run)
+            else:
+                counts = request.data.get('counts')
+                if not isinstance(counts, list) or not counts:
+                    return Response({"error": "A non-empty 'counts' list or a 'file' upload is required"}, status=400)
+                result = service.import_records(enumerate(counts, start=1), dry_run=dry_run)
+        except UnicodeDecodeError:
+            return Response({"error": "The file must be UTF-8 encoded"}, status=400)
+
+        response = {
+            "success": result.failed == 0,
+            "reference": result.reference,
+            "dry_run": dry_run,
+            "total": result.total,
+            "counted": result.counted,
+            "adjusted": result.adjusted,
+            "unchanged": result.unchanged,
+            "failed": result.failed,
+            "summary": result.summary,
+            "errors": result.errors,
+        }
+        if dry_run:
+            response["variance"] = result.variance
+        rejected = result.failed and not result.counted
+        return Response(response, status=status.HTTP_400_BAD_REQUEST if rejected else status.HTTP_200_OK)
+
+
+class CycleCountVarianceView(APIView):
+    """Variance report of one count (?reference=): totals plus every counted line"""
+    permission_classes = [IsAuthenticated]
+    pagination_class = PageNumberPagination
+
+    def get(self, request):
+        reference = request.query_params.get('reference')
+        if not reference:
+            return Response({"error": "'reference' is required"}, status=400)
+
+        lines = CycleCountService.variance_report(reference)
+        if request.query_params.get('variance_only', '').lower() in ('1', 'true', 'yes'):
+            lines = lines.exclude(discrepancy=0)
+
+        paginator = self.pagination_class()
+        paginated_lines = paginator.paginate_queryset(lines, request)
+        return paginator.get_paginated_response({
+            "summary": CycleCountService.variance_summary(reference),
+            "lines": paginated_lines,
+        })
+
 # ------------------- CENTRALIZED INVENTORY TRANSACTION ------------------- #
 class InventoryTransactionCreateView(APIView):
     permission_classes = [IsAuthenticated]
@@ -272,6 +524,37 @@ class InventoryTransactionCreateView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class InventoryTransactionBulkCreateView(APIView):
+    """Post many inventory transactions at once (e.g. every inward line of a truck)"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if isinstance(request.data, list):
+            lines, all_or_nothing = request.data, False
+        else:
+            lines = request.data.get("transactions")
+            all_or_nothing = bool(request.data.get("all_or_nothing", False))
+
+        service = InventoryTransactionService(request.user)
+        result = service.create_transactions_bulk(lines, all_or_nothing=all_or_nothing)
+
+        if result.failed == 0:
+            response_status = status.HTTP_201_CREATED
+        elif result.posted:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+
+        return Response({
+            "success": result.success,
+            "message": result.message,
+            "total": result.total,
+            "posted": result.posted,
+            "failed": result.failed,
+            "lines": result.lines,
+        }, status=response_status)
+
+
 class InventoryTransactionDetailView(APIView):
     """Get detailed information about a specific transaction"""
     permission_classes = [IsAuthenticated]
@@ -305,14 +588,15 @@ class InventoryTransactionDetailView(APIView):
 class InwardListView(APIView):
     permission_classes = [IsAuthenticated]
     pagination_class = PageNumberPagination
+    query_budget = 3
 
     def get(self, request):
         inward_transactions = InventoryTransaction.objects.filter(
             process_type__code='INWARD',
             deleted=False
-        ).select_related('item', 'location', 'supplier').order_by('-created_at')
+        ).select_related('process_type', 'item', 'location', 'supplier').order_by('-created_at')
         
-        paginator = self.pagination_class()
+        paginator = paginator_for(request, self.pagination_class)
         paginated_transactions = paginator.paginate_queryset(inward_transactions, request)
         
         serializer = InventoryTransactionSerializer(paginated_transactions, many=True)
@@ -322,20 +606,54 @@ class InwardListView(APIView):
 class OutwardListView(APIView):
     permission_classes = [IsAuthenticated]
     pagination_class = PageNumberPagination
+    query_budget = 3
 
     def get(self, request):
         outward_transactions = InventoryTransaction.objects.filter(
             process_type__code='OUTWARD',
             deleted=False
-        ).select_related('item', 'location').order_by('-created_at')
+        ).select_related('process_type', 'item', 'location').order_by('-created_at')
         
-        paginator = self.pagination_class()
+        paginator = paginator_for(request, self.pagination_class)
         paginated_transactions = paginator.paginate_queryset(outward_transactions, request)
         
         serializer = InventoryTransactionSerializer(paginated_transactions, many=True)
         return paginator.get_paginated_response(serializer.data)
 
 
+class TransactionExportView(APIView):
+    """
+    Stream the transaction journal as NDJSON or CSV (?output=ndjson|csv, &from=&to= dates,
+    &process_type=CODE, &item=, &location=). Rows are written as they are read, so memory
+    use does not grow with the size of the export.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        output = request.query_params.get('output', exports.NDJSON).lower()
+        if output not in exports.CONTENT_TYPES:
+            return Response({"error": "'output' must be 'ndjson' or 'csv'"}, status=400)
+
+        dates = {}
+        for param in ('from', 'to'):
+            value = request.query_params.get(param)
+            if value:
+                dates[param] = parse_date(value)
+                if dates[param] is None:
+                    return Response({"error": f"'{param}' must be a date (YYYY-MM-DD)"}, status=400)
+
+        rows = exports.journal_rows(
+            date_from=dates.get('from'),
+            date_to=dates.get('to'),
+            process_type=request.query_params.get('process_type'),
+            item=request.query_params.get('item'),
+            location=request.query_params.get('location'),
+        )
+        response = StreamingHttpResponse(exports.render(rows, output), content_type=exports.CONTENT_TYPES[output])
+        response['Content-Disposition'] = f'attachment; filename="transactions.{output}"'
+        return response
+
+
 # ------------------- SUPPLIER ------------------- #
 class SupplierListView(APIView):
     permission_classes = [IsAuthenticated]
@@ -344,7 +662,7 @@ class SupplierListView(APIView):
     def get(self, request):
         suppliers = Supplier.objects.all()
         
-        paginator = self.pagination_class()
+        paginator = paginator_for(request, self.pagination_class)
         paginated_suppliers = paginator.paginate_queryset(suppliers, request)
         
         serializer = SupplierSerializer(paginated_suppliers, many=True)
@@ -365,9 +683,10 @@ class SupplierCreateView(APIView):
 class PurchaseOrderListView(APIView):
     permission_classes = [IsAuthenticated]
     pagination_class = PageNumberPagination
+    query_budget = 4
 
     def get(self, request):
-        purchase_orders = PurchaseOrder.objects.all().select_related('supplier', 'created_by')
+        purchase_orders = eager_load(PurchaseOrderSerializer, PurchaseOrder.objects.all())
         
         paginator = self.pagination_class()
         paginated_orders = paginator.paginate_queryset(purchase_orders, request)
@@ -380,9 +699,7 @@ class PurchaseOrderCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        data = request.data.copy()
-        data['created_by'] = request.user.id
-        serializer = PurchaseOrderSerializer(data=data)
+        serializer = PurchaseOrderSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             serializer.save()
             return Response({"data": serializer.data, "message": "Purchase order created"}, status=201)
@@ -391,11 +708,12 @@ class PurchaseOrderCreateView(APIView):
 
 class PurchaseOrdersBySupplierView(APIView):
     permission_classes = [IsAuthenticated]
+    query_budget = 3
 
     def get(self, request, supplier_id):
-        purchase_orders = PurchaseOrder.objects.filter(
+        purchase_orders = eager_load(PurchaseOrderSerializer, PurchaseOrder.objects.filter(
             supplier_id=supplier_id
-        ).select_related('supplier', 'created_by')
+        ))
         
         serializer = PurchaseOrderSerializer(purchase_orders, many=True)
         return Response(serializer.data)
@@ -404,9 +722,10 @@ class PurchaseOrdersBySupplierView(APIView):
 class FilteredPurchaseOrderListView(APIView):
     permission_classes = [IsAuthenticated]
     pagination_class = PageNumberPagination
+    query_budget = 4
 
     def get(self, request):
-        queryset = PurchaseOrder.objects.all().select_related('supplier', 'created_by')
+        queryset = eager_load(PurchaseOrderSerializer, PurchaseOrder.objects.all())
         
         # Apply filters
         supplier_id = request.query_params.get('supplier')
@@ -428,6 +747,42 @@ class FilteredPurchaseOrderListView(APIView):
         serializer = PurchaseOrderSerializer(paginated_queryset, many=True)
         return paginator.get_paginated_response(serializer.data)
 
+class PurchaseOrderFulfilmentView(APIView):
+    """
+    PO lines with received and outstanding quantities, across all suppliers. Open lines only
+    unless ?status=all; filter with &supplier=, &purchase_order=, &item=.
+    """
+    permission_classes = [IsAuthenticated]
+    pagination_class = PageNumberPagination
+    query_budget = 3
+
+    def get(self, request):
+        lines = eager_load(PurchaseOrderFulfilmentSerializer, PurchaseOrderItem.objects.all())
+        if request.query_params.get('status', 'open') == 'all':
+            lines = lines.with_fulfilment()
+        else:
+            lines = lines.open()
+
+        filters = {
+            'supplier': 'purchase_order__supplier_id',
+            'purchase_order': 'purchase_order_id',
+            'item': 'item_id',
+        }
+        for param, lookup in filters.items():
+            value = request.query_params.get(param)
+            if value:
+                if not value.isdigit():
+                    return Response({"error": f"'{param}' must be an id"}, status=400)
+                lines = lines.filter(**{lookup: value})
+
+        lines = lines.order_by('purchase_order__expected_delivery_date', 'purchase_order_id', 'id')
+
+        paginator = self.pagination_class()
+        paginated_lines = paginator.paginate_queryset(lines, request)
+
+        serializer = PurchaseOrderFulfilmentSerializer(paginated_lines, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
 # ------------------- BARCODE SEARCH ------------------- #
 class BarcodeSearchView(APIView):
     permission_classes = [IsAuthenticated]
@@ -439,7 +794,9 @@ class BarcodeSearchView(APIView):
         
         try:
             # Search by barcode
-            item = Item.objects.get(barcode=barcode, deleted=False, is_active=True)
+            item = Item.objects.get(
+                codes__code=barcode, codes__code_type__in=ItemCode.SCAN_TYPES, deleted=False, is_active=True,
+            )
             
             # Get inventory for this item
             inventory = Inventory.objects.filter(
@@ -459,6 +816,111 @@ class BarcodeSearchView(APIView):
         except Item.DoesNotExist:
             return Response({"error": "Item not found"}, status=404)
 
+class ScanLookupView(APIView):
+    """
+    Scanner lookups by barcode or SKU, several codes per request: GET ?code=A&code=B (or
+    ?codes=A,B) or POST {"codes": [...]}. Returns each found item with its stock by location
+    and lists the codes not found.
+    """
+    permission_classes = [IsAuthenticated]
+    query_budget = 3
+
+    def get(self, request):
+        codes = request.query_params.getlist('code')
+        if request.query_params.get('codes'):
+            codes += request.query_params['codes'].split(',')
+        return self._lookup(codes, request.query_params.get('supplier'))
+
+    def post(self, request):
+        codes = request.data.get('codes') if isinstance(request.data, dict) else request.data
+        if not isinstance(codes, list):
+            return Response({"error": "'codes' must be a list"}, status=400)
+        supplier = request.data.get('supplier') if isinstance(request.data, dict) else None
+        return self._lookup(codes, supplier)
+
+    def _lookup(self, codes, supplier=None):
+        codes = ScanLookupService.normalize(codes)
+        if not codes:
+            return Response({"error": "At least one code is required"}, status=400)
+        if len(codes) > ScanLookupService.MAX_CODES:
+            return Response({"error": f"At most {ScanLookupService.MAX_CODES} codes can be looked up per request"}, status=400)
+        if supplier not in (None, ''):
+            if not str(supplier).isdigit():
+                return Response({"error": "'supplier' must be an id"}, status=400)
+            supplier = int(supplier)
+        else:
+            supplier = None
+
+        results, not_found = ScanLookupService.lookup(codes, supplier)
+        return Response({"results": results, "not_found": not_found})
+
+
+class ItemCodeListCreateView(APIView):
+    """Codes of an item (?item=, &code_type=), and POST to add an alternate barcode, pack GTIN or supplier part number"""
+    permission_classes = [IsAuthenticated]
+    pagination_class = PageNumberPagination
+    query_budget = 3
+
+    def get(self, request):
+        codes = eager_load(ItemCodeSerializer, ItemCode.objects.all())
+        for param, field in (('item', 'item_id'), ('code_type', 'code_type'), ('supplier', 'supplier_id')):
+            value = request.query_params.get(param)
+            if value:
+                codes = codes.filter(**{field: value})
+
+        paginator = self.pagination_class()
+        paginated_codes = paginator.paginate_queryset(codes.order_by('item_id', 'code_type', 'code'), request)
+        serializer = ItemCodeSerializer(paginated_codes, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    def post(self, request):
+        serializer = ItemCodeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            return Response({"code": ["This code is already in use."]}, status=400)
+        return Response({"data": serializer.data, "message": "Item code created"}, status=201)
+
+
+class ItemCodeDeleteView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def delete(self, request, pk):
+        code = ItemCode.objects.filter(pk=pk).first()
+        if not code:
+            return Response({"error": "Item code not found"}, status=404)
+        if code.primary:
+            return Response({"error": "Primary codes follow the item's barcode and sku; change the item instead"}, status=400)
+        code.delete()
+        return Response(status=204)
+
+
+class ItemCodeSearchView(APIView):
+    """
+    Typeahead over every item code: ?q=PREFIX (case-sensitive), optional &type= (repeatable)
+    and &limit= (at most 100). An index range scan, not a LIKE over item names.
+    """
+    permission_classes = [IsAuthenticated]
+    query_budget = 2
+
+    def get(self, request):
+        prefix = request.query_params.get('q', '')
+        if not prefix.strip():
+            return Response({"error": "'q' is required"}, status=400)
+        code_types = request.query_params.getlist('type')
+        unknown = set(code_types) - {choice for choice, _ in ItemCode.CODE_TYPE_CHOICES}
+        if unknown:
+            return Response({"error": f"Unknown type: {', '.join(sorted(unknown))}"}, status=400)
+        try:
+            limit = int(request.query_params.get('limit', ItemCodeService.SEARCH_LIMIT))
+        except ValueError:
+            return Response({"error": "'limit' must be a number"}, status=400)
+
+        return Response({"results": ItemCodeService.search(prefix, code_types, max(limit, 1))})
+
 # ------------------- CUSTOMER ------------------- #
 class CustomerListCreateView(APIView):
     permission_classes = [IsAuthenticated]
@@ -467,7 +929,7 @@ class CustomerListCreateView(APIView):
     def get(self, request):
         customers = Customer.objects.filter(deleted=False)
         
-        paginator = self.pagination_class()
+        paginator = paginator_for(request, self.pagination_class)
         paginated_customers = paginator.paginate_queryset(customers, request)
         
         serializer = CustomerSerializer(paginated_customers, many=True)
@@ -492,18 +954,215 @@ class CustomerCreateView(APIView):
         return Response(serializer.errors, status=400)
 
 # ------------------- SALES ORDER ------------------- #
+class SalesOrderListView(APIView):
+    permission_classes = [IsAuthenticated]
+    pagination_class = PageNumberPagination
+    query_budget = 4
+
+    def get(self, request):
+        sales_orders = eager_load(SalesOrderSerializer, SalesOrder.objects.all())
+
+        customer_id = request.query_params.get('customer')
+        if customer_id:
+            sales_orders = sales_orders.filter(customer_id=customer_id)
+
+        fulfilled = request.query_params.get('is_fulfilled')
+        if fulfilled:
+            sales_orders = sales_orders.filter(is_fulfilled=fulfilled.lower() in ('1', 'true', 'yes'))
+
+        paginator = self.pagination_class()
+        paginated_orders = paginator.paginate_queryset(sales_orders.order_by('-id'), request)
+
+        serializer = SalesOrderSerializer(paginated_orders, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
 class SalesOrderCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        data = request.data.copy()
-        data['created_by'] = request.user.id
-        serializer = SalesOrderSerializer(data=data)
+        serializer = SalesOrderSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             serializer.save()
             return Response({"data": serializer.data, "message": "Sales order created"}, status=201)
         return Response(serializer.errors, status=400)
 
+# ------------------- STOCK RESERVATIONS ------------------- #
+def parse_expiry(request):
+    minutes = request.data.get('expires_in_minutes')
+    return timezone.now() + timedelta(minutes=float(minutes)) if minutes not in (None, '') else None
+
+
+class SalesOrderReserveView(APIView):
+    """Reserve stock for every open line of a sales order, all or nothing"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        try:
+            sales_order = SalesOrder.objects.get(id=pk)
+        except SalesOrder.DoesNotExist:
+            return Response({"error": "Sales order not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            reservations = StockReservationService(request.user).reserve_sales_order(
+                sales_order,
+                location=request.data.get('location'),
+                warehouse=request.data.get('warehouse'),
+                expires_at=parse_expiry(request),
+            )
+        except (ValidationError, ValueError) as e:
+            return Response({
+                "success": False,
+                "message": "Sales order could not be reserved",
+                "errors": getattr(e, 'messages', [str(e)]),
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "success": True,
+            "message": f"{len(reservations)} reservations created",
+            "reservations": StockReservationSerializer(reservations, many=True).data,
+        }, status=status.HTTP_201_CREATED)
+
+
+class SalesOrderReleaseView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        try:
+            sales_order = SalesOrder.objects.get(id=pk)
+        except SalesOrder.DoesNotExist:
+            return Response({"error": "Sales order not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        released = StockReservationService(request.user).release_sales_order(sales_order)
+        return Response({"success": True, "message": f"{released} reservations released"})
+
+
+class StockReservationListCreateView(APIView):
+    permission_classes = [IsAuthenticated]
+    pagination_class = PageNumberPagination
+
+    def get(self, request):
+        reservations = StockReservation.objects.select_related('item', 'location')
+
+        for param, field in (('sales_order', 'sales_order_id'), ('item', 'item_id'),
+                             ('location', 'location_id'), ('task', 'task_id'), ('status', 'status')):
+            value = request.query_params.get(param)
+            if value:
+                reservations = reservations.filter(**{field: value})
+
+        paginator = self.pagination_class()
+        paginated_reservations = paginator.paginate_queryset(reservations, request)
+        serializer = StockReservationSerializer(paginated_reservations, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    def post(self, request):
+        try:
+            inventory = Inventory.objects.get(id=request.data.get('inventory'), deleted=False)
+        except (Inventory.DoesNotExist, ValueError, TypeError):
+            return Response({"error": "Inventory not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        sales_order_item = SalesOrderItem.objects.filter(id=request.data.get('sales_order_item')).first() \
+            if request.data.get('sales_order_item') else None
+        task = InventoryTask.objects.filter(id=request.data.get('task'), deleted=False).first() \
+            if request.data.get('task') else None
+
+        try:
+            reservation = StockReservationService(request.user).reserve(
+                inventory,
+                float(request.data.get('quantity') or 0),
+                sales_order_item=sales_order_item,
+                task=task,
+                expires_at=parse_expiry(request),
+            )
+        except (ValidationError, ValueError) as e:
+            return Response({
+                "success": False,
+                "message": "Stock could not be reserved",
+                "errors": getattr(e, 'messages', [str(e)]),
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(StockReservationSerializer(reservation).data, status=status.HTTP_201_CREATED)
+
+
+class StockReservationReleaseView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        try:
+            reservation = StockReservation.objects.get(id=pk)
+        except StockReservation.DoesNotExist:
+            return Response({"error": "Reservation not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        if not StockReservationService(request.user).release([reservation]):
+            return Response({"error": f"Reservation is {reservation.status}"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"success": True, "message": "Reservation released"})
+
+# ------------------- OUTWARD ALLOCATION ------------------- #
+class AllocateOutwardView(APIView):
+    """
+    Post outward quantities without naming stock rows: each line ({item, quantity[, location,
+    warehouse]}) or the open lines of `sales_order` are split across batches, lots and
+    locations (strategy 'fifo' or 'fefo') and posted together. `dry_run` returns the plan only.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        data = request.data
+        service = StockAllocationService(request.user)
+        strategy = data.get('strategy') or StockAllocationService.FIFO
+
+        sales_order = None
+        if data.get('sales_order'):
+            sales_order = SalesOrder.objects.filter(id=data.get('sales_order')).first()
+            if not sales_order:
+                return Response({"error": "Sales order not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            if sales_order:
+                requests = service.sales_order_requests(sales_order)
+                if not requests:
+                    raise ValidationError("Sales order has nothing left to ship")
+            else:
+                lines = data.get('lines') or []
+                if not isinstance(lines, list) or not all(isinstance(line, dict) for line in lines):
+                    raise ValidationError("'lines' must be a list of objects")
+                requests = [
+                    {
+                        'item': int(line['item']),
+                        'quantity': float(line['quantity']),
+                        'location': line.get('location'),
+                        'warehouse': line.get('warehouse'),
+                    }
+                    for line in lines
+                ]
+            if not requests or any(request['quantity'] <= 0 for request in requests):
+                raise ValidationError("A non-empty list of lines with positive quantities is required")
+
+            if data.get('dry_run'):
+                legs, errors = service.allocate(requests, strategy)
+                return Response({"success": not errors, "errors": errors, "legs": legs},
+                                status=status.HTTP_200_OK if not errors else status.HTTP_400_BAD_REQUEST)
+
+            legs, result = service.post(requests, strategy, sales_order=sales_order, extra={
+                'reference_number': data.get('reference_number', ''),
+                'remarks': data.get('remarks', ''),
+            })
+        except (KeyError, TypeError, ValueError):
+            return Response({"error": "Each line needs a numeric item and quantity"}, status=status.HTTP_400_BAD_REQUEST)
+        except ValidationError as e:
+            return Response({
+                "success": False,
+                "message": "Outward could not be allocated",
+                "errors": e.messages,
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "success": result.success,
+            "message": result.message,
+            "legs": [dict(leg, transaction_id=line.get("transaction_id")) for leg, line in zip(legs, result.lines)],
+            "errors": [error for line in result.lines for error in line.get("errors", [])],
+        }, status=status.HTTP_201_CREATED if result.success else status.HTTP_400_BAD_REQUEST)
+
 # ------------------- INVOICE ------------------- #
 class InvoiceCreateView(APIView):
     permission_classes = [IsAuthenticated]
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class MonitoringConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'monitoring'
+
+    def ready(self):
+        if getattr(settings, 'REQUEST_PROFILING', False):
+            from .profiling import install_serializer_timing
+            install_serializer_timing()
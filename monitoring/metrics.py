@@ -0,0 +1,221 @@
+"""
+In-process metrics: aggregates of profiled requests keyed by endpoint, and Prometheus-style
+counters and histograms rendered in the text exposition format.
+
+Each worker process keeps its own figures; they reset on restart and are not shared between
+processes. Latency percentiles come from the most recent SAMPLE_SIZE requests per endpoint.
+"""
+import math
+import threading
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from time import perf_counter
+
+from django.conf import settings
+
+SAMPLE_SIZE = getattr(settings, 'REQUEST_PROFILING_SAMPLE_SIZE', 1000)
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.over_budget = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.sql_time = 0.0
+        self.serializer_time = 0.0
+        self.total_time = 0.0
+        self.latencies = deque(maxlen=SAMPLE_SIZE)
+
+    def add(self, record):
+        self.requests += 1
+        self.errors += record['status'] >= 500
+        self.over_budget += bool(record.get('over_budget'))
+        self.queries += record['queries']
+        self.max_queries = max(self.max_queries, record['queries'])
+        self.sql_time += record['sql_ms']
+        self.serializer_time += record['serializer_ms']
+        self.total_time += record['total_ms']
+        self.latencies.append(record['total_ms'])
+
+    def as_dict(self):
+        ordered = sorted(self.latencies)
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'over_budget': self.over_budget,
+            'avg_queries': round(self.queries / self.requests, 2),
+            'max_queries': self.max_queries,
+            'avg_sql_ms': round(self.sql_time / self.requests, 3),
+            'avg_serializer_ms': round(self.serializer_time / self.requests, 3),
+            'avg_total_ms': round(self.total_time / self.requests, 3),
+            'p50_ms': _percentile(ordered, 0.50),
+            'p95_ms': _percentile(ordered, 0.95),
+            'p99_ms': _percentile(ordered, 0.99),
+            'max_ms': ordered[-1],
+        }
+
+
+class RequestMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, record):
+        key = (record['endpoint'], record['method'])
+        with self._lock:
+            stats = self._endpoints.get(key)
+            if stats is None:
+                stats = self._endpoints[key] = EndpointStats()
+            stats.add(record)
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                {'endpoint': endpoint, 'method': method, **stats.as_dict()}
+                for (endpoint, method), stats in sorted(self._endpoints.items())
+            ]
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+REQUEST_METRICS = RequestMetrics()
+
+
+# ------------------- COUNTERS AND HISTOGRAMS ------------------- #
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def exposition(self):
+        """All registered metrics in the Prometheus text format (version 0.0.4)"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            for metric in self._metrics.values():
+                metric.reset()
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key, extra=()):
+        pairs = [*zip(self.labelnames, key), *extra]
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{self._labels(key)} {_number(value)}" for key, value in values]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket counts (the last one is +Inf), sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the seconds spent in the block"""
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._labels(key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_number(total)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {cumulative}")
+        return lines
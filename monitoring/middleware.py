@@ -0,0 +1,72 @@
+import json
+import logging
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .metrics import REQUEST_METRICS
+from .profiling import declared_budget, end_profile, start_profile
+
+logger = logging.getLogger('monitoring.requests')
+
+
+def _endpoint(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match.route
+
+
+class RequestProfilingMiddleware:
+    """
+    Opt-in (REQUEST_PROFILING = True) profiling of every request: query count, SQL time,
+    serializer time and total latency, tagged by URL name. Each request is logged as one JSON
+    line on the 'monitoring.requests' logger and added to REQUEST_METRICS. A request that runs
+    more queries than its view's query_budget is logged at WARNING.
+
+    Streaming responses are timed up to the first byte; the queries their iterators run while
+    the body is sent are not counted.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile, token = start_profile()
+        started = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile.record_query))
+                response = self.get_response(request)
+            total = perf_counter() - started
+        finally:
+            end_profile(token)
+
+        match = getattr(request, 'resolver_match', None)
+        budget = declared_budget(match.func, request.method) if match else None
+        record = {
+            'endpoint': _endpoint(request),
+            'method': request.method,
+            'status': response.status_code,
+            'queries': profile.queries,
+            'sql_ms': round(profile.sql_time * 1000, 3),
+            'serializer_ms': round(profile.serializer_time * 1000, 3),
+            'serializer_queries': profile.serializer_queries,
+            'total_ms': round(total * 1000, 3),
+        }
+        if budget is not None:
+            record['query_budget'] = budget
+            record['over_budget'] = profile.queries > budget
+
+        REQUEST_METRICS.record(record)
+        if record.get('over_budget'):
+            logger.warning(json.dumps(record), extra={'profile': record})
+        else:
+            logger.info(json.dumps(record), extra={'profile': record})
+        return response
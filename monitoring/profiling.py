@@ -0,0 +1,91 @@
+"""
+Per-request instrumentation: query count, SQL time and serializer time.
+
+The profile of the request being served lives in a context variable. Queries are counted
+by a connection execute_wrapper that the middleware installs around each request, so they
+are seen without DEBUG. Serializer time comes from wrapping BaseSerializer.data and
+is_valid, which is installed once at startup and only when REQUEST_PROFILING is on. Queries
+a serializer triggers (lazy relations, N+1) are counted a second time as serializer_queries.
+"""
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import wraps
+from time import perf_counter
+
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+_current = ContextVar('request_profile', default=None)
+
+
+@dataclass
+class RequestProfile:
+    queries: int = 0
+    sql_time: float = 0.0
+    serializer_time: float = 0.0
+    serializer_queries: int = 0
+    serializing: bool = False
+
+    def record_query(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += perf_counter() - started
+            self.queries += 1
+            if self.serializing:
+                self.serializer_queries += 1
+
+
+def current_profile():
+    return _current.get()
+
+
+def start_profile():
+    """Make a fresh profile current; returns it with the token needed to reset it"""
+    profile = RequestProfile()
+    return profile, _current.set(profile)
+
+
+def end_profile(token):
+    _current.reset(token)
+
+
+def _timed(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        # Nested serializers and ListSerializer -> child calls are timed once, at the top
+        if profile is None or profile.serializing:
+            return func(*args, **kwargs)
+        profile.serializing = True
+        started = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.serializer_time += perf_counter() - started
+            profile.serializing = False
+    wrapper.profiled = True
+    return wrapper
+
+
+def install_serializer_timing():
+    """Time serializer.data and serializer.is_valid for the current request profile"""
+    if getattr(BaseSerializer.data.fget, 'profiled', False):
+        return
+    # Serializer.data and ListSerializer.data both delegate to BaseSerializer.data
+    BaseSerializer.data = property(_timed(BaseSerializer.data.fget))
+    BaseSerializer.is_valid = _timed(BaseSerializer.is_valid)
+    ListSerializer.is_valid = _timed(ListSerializer.is_valid)
+
+
+def declared_budget(view_func, method):
+    """
+    The query budget a view declares through its `query_budget` attribute, either one
+    number for every method or a dict such as {'GET': 3, 'POST': 12}; None when undeclared.
+    Budgets count every query the request runs, authentication included.
+    """
+    view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+    budget = getattr(view_class, 'query_budget', None)
+    if isinstance(budget, dict):
+        return budget.get(method.upper())
+    return budget
@@ -0,0 +1,53 @@
+"""
+Query budget assertions for tests.
+
+    class WarehouseStorageTests(QueryBudgetMixin, APITestCase):
+        def test_grouped_storage(self):
+            self.client.force_authenticate(self.user)
+            self.assertQueryBudget('get', '/warehouse/warehouse-storage/')
+
+assertQueryBudget fails when the request runs more queries than its view's `query_budget`
+(or an explicit `budget=`), listing every statement so the N+1 is visible in the failure.
+Budgets include the authentication query, which force_authenticate skips, so a request
+that passes here has one query of headroom in production.
+"""
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+from .profiling import declared_budget
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(budget, label='block', using=DEFAULT_DB_ALIAS):
+    """Fail with QueryBudgetExceeded if the block runs more than `budget` queries"""
+    with CaptureQueriesContext(connections[using]) as captured:
+        yield captured
+    if len(captured) > budget:
+        statements = "\n".join(
+            f"{number}. {query['sql']}" for number, query in enumerate(captured.captured_queries, start=1)
+        )
+        raise QueryBudgetExceeded(
+            f"{label} ran {len(captured)} queries, budget is {budget}:\n{statements}"
+        )
+
+
+class QueryBudgetMixin:
+    """TestCase mixin; `self.client` must be a Django or DRF test client"""
+
+    def assertQueryBudget(self, method, path, budget=None, **kwargs):
+        if budget is None:
+            match = resolve(urlsplit(path).path)
+            budget = declared_budget(match.func, method)
+            if budget is None:
+                self.fail(f"{match.view_name or match.route} declares no query_budget for {method.upper()}")
+        with query_budget(budget, label=f"{method.upper()} {path}"):
+            response = getattr(self.client, method.lower())(path, **kwargs)
+        return response
@@ -0,0 +1,67 @@
+import re
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from inventory.models import InventoryProcessType, Item
+from inventory.services import InventoryTransactionService
+from tasks.models import TaskType
+from warehouse.models import Location, Warehouse
+
+from .metrics import REGISTRY
+
+# name{labels} value, as in the Prometheus text format
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[a-zA-Z_]+="[^"]*"(,[a-zA-Z_]+="[^"]*")*\})? [-+0-9.eInf]+$')
+
+
+class MetricsExpositionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+        cls.storekeeper = User.objects.create_user(username='storekeeper')
+        InventoryProcessType.objects.create(code='INWARD', name='Inward')
+        TaskType.objects.create(code='PUTAWAY', name='Putaway')
+        warehouse = Warehouse.objects.create(name='Main', address='Dock road', owner=cls.admin)
+        cls.location = Location.objects.create(warehouse=warehouse, code='A1')
+        cls.item = Item.objects.create(name='Widget', sku='W1')
+
+    def setUp(self):
+        REGISTRY.reset()
+        self.client = APIClient()
+
+    def scrape(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/monitoring/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode().splitlines()
+
+    def test_posting_is_counted_and_timed(self):
+        result = InventoryTransactionService(self.storekeeper).create_transaction({
+            'process_type': 'INWARD', 'item': self.item, 'location': self.location, 'quantity': 5,
+        })
+        self.assertTrue(result.success, result.errors)
+
+        lines = self.scrape()
+        for line in lines:
+            if not line.startswith('#'):
+                self.assertRegex(line, SAMPLE)
+        self.assertIn('# TYPE inventory_transactions_posted_total counter', lines)
+        self.assertIn('inventory_transactions_posted_total{process_type="INWARD",path="single"} 1.0', lines)
+
+        self.assertIn('# TYPE inventory_posting_seconds histogram', lines)
+        buckets = [line for line in lines if line.startswith('inventory_posting_seconds_bucket{process_type="INWARD"')]
+        self.assertTrue(buckets[-1].startswith('inventory_posting_seconds_bucket{process_type="INWARD",le="+Inf"}'))
+        counts = [int(line.rsplit(' ', 1)[1]) for line in buckets]
+        self.assertEqual(counts, sorted(counts))
+        self.assertEqual(counts[-1], 1)
+        self.assertIn('inventory_posting_seconds_count{process_type="INWARD"} 1', lines)
+        self.assertTrue(any(line.startswith('inventory_posting_seconds_sum{process_type="INWARD"} ') for line in lines))
+
+    def test_metrics_require_admin(self):
+        self.assertEqual(self.client.get('/monitoring/metrics/').status_code, 401)
+        self.client.force_authenticate(self.storekeeper)
+        self.assertEqual(self.client.get('/monitoring/metrics/').status_code, 403)
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.get('/monitoring/metrics/').status_code, 200)
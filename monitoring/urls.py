@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import *
+
+urlpatterns = [
+    path('requests/', RequestMetricsView.as_view(), name='request-metrics'),
+    path('metrics/', MetricsExpositionView.as_view(), name='metrics'),
+]
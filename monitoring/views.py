@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .metrics import REGISTRY, REQUEST_METRICS
+
+
+# ------------------- REQUEST METRICS ------------------- #
+class RequestMetricsView(APIView):
+    """Per-endpoint request profile aggregates for this process; DELETE clears them"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'enabled': getattr(settings, 'REQUEST_PROFILING', False),
+            'endpoints': REQUEST_METRICS.snapshot(),
+        })
+
+    def delete(self, request):
+        REQUEST_METRICS.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+# ------------------- PROMETHEUS EXPOSITION ------------------- #
+class MetricsExpositionView(APIView):
+    """Counters and histograms of this process in the Prometheus text format"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(REGISTRY.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_hot_query_indexes'),
+        ('tasks', '0002_tasktype_is_active'),
+        ('warehouse', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventorytask',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['assigned_to', 'task_type', 'is_completed'], name='invtask_live_assignee_idx'),
+        ),
+    ]
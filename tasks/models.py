@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.conf import settings
 from inventory.models import *
 from warehouse.models import *
@@ -35,6 +36,12 @@ class InventoryTask(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     deleted = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Task lists and the dashboard: a user's open tasks of one type
+            models.Index(fields=['assigned_to', 'task_type', 'is_completed'], condition=Q(deleted=False), name='invtask_live_assignee_idx'),
+        ]
+
     def __str__(self):
         return f"{self.task_type.name} Task #{self.id} - Item: {self.item.name if self.item else 'Unknown'}"
 
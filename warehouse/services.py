@@ -0,0 +1,73 @@
+from inventory.models import InventorySummary
+from .models import Location
+
+
+class WarehouseStorageService:
+    """
+    Stock grouped by location, read from InventorySummary (one row per item and location,
+    kept current by stock posting). Filtering, grouping and the warehouse join all happen in
+    SQL, and a page or stream chunk of locations costs two queries however many rows it holds.
+    """
+
+    def __init__(self, warehouse=None, location=None, category=None, in_stock: bool = False):
+        self.warehouse = warehouse
+        self.location = location
+        self.category = category
+        self.in_stock = in_stock
+
+    def summaries(self):
+        summaries = InventorySummary.objects.all()
+        if self.warehouse:
+            summaries = summaries.filter(location__warehouse_id=self.warehouse)
+        if self.location:
+            summaries = summaries.filter(location_id=self.location)
+        if self.category:
+            summaries = summaries.filter(item__category_id=self.category)
+        if self.in_stock:
+            summaries = summaries.filter(total_quantity__gt=0)
+        return summaries
+
+    def locations(self):
+        """Locations holding matching stock, with their warehouse, in a stable order"""
+        return Location.objects.filter(pk__in=self.summaries().values('location_id')).values(
+            'id', 'code', 'warehouse_id', 'warehouse__name',
+        ).order_by('warehouse__name', 'code', 'id')
+
+    def groups(self, locations):
+        """One entry per location with its items and totals; `locations` rows come from locations()"""
+        locations = list(locations)
+        items = {}
+        for row in self.summaries().filter(location_id__in=[location['id'] for location in locations]).values(
+            'location_id', 'item_id', 'item__name', 'item__sku', 'total_quantity', 'reserved_quantity',
+        ).order_by('location_id', 'item__name', 'item_id'):
+            items.setdefault(row['location_id'], []).append({
+                "item_id": row['item_id'],
+                "item_name": row['item__name'],
+                "sku": row['item__sku'],
+                "quantity": row['total_quantity'],
+                "reserved_quantity": row['reserved_quantity'],
+            })
+
+        for location in locations:
+            location_items = items.get(location['id'], [])
+            yield {
+                "location_id": location['id'],
+                "location_name": location['code'],
+                "warehouse_id": location['warehouse_id'],
+                "warehouse_name": location['warehouse__name'],
+                "item_count": len(location_items),
+                "total_quantity": sum(item["quantity"] for item in location_items),
+                "reserved_quantity": sum(item["reserved_quantity"] for item in location_items),
+                "items": location_items,
+            }
+
+    def stream(self, chunk_size: int = 500):
+        """Every location group, reading `chunk_size` locations at a time"""
+        chunk = []
+        for location in self.locations().iterator(chunk_size=chunk_size):
+            chunk.append(location)
+            if len(chunk) >= chunk_size:
+                yield from self.groups(chunk)
+                chunk = []
+        if chunk:
+            yield from self.groups(chunk)
@@ -1,3 +1,51 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from inventory.models import Inventory, Item, ItemCategory
+from monitoring.testing import QueryBudgetMixin
+
+from .models import Location, Warehouse
+
+
+class WarehouseStorageTests(QueryBudgetMixin, TestCase):
+    """The storage views stay within their query_budget however many locations hold stock"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='storekeeper')
+        cls.category = ItemCategory.objects.create(name='Parts')
+        cls.warehouses = [
+            Warehouse.objects.create(name=name, address='Dock road', owner=cls.user) for name in ('Main', 'Annex')
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def stock_locations(self, count):
+        start = Location.objects.count()
+        for number in range(start, start + count):
+            location = Location.objects.create(warehouse=self.warehouses[number % 2], code=f'L{number}')
+            for suffix in ('a', 'b'):
+                item = Item.objects.create(name=f'Item {number}{suffix}', sku=f'S{number}{suffix}', category=self.category)
+                Inventory.objects.create(item=item, location=location, quantity=number + 1)
+
+    def test_grouped_storage(self):
+        for count in (1, 10):
+            self.stock_locations(count)
+            with self.subTest(locations=Location.objects.count()):
+                response = self.assertQueryBudget('get', '/warehouse/warehouse-storage/')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data), Location.objects.count())
+
+    def test_storage_by_location(self):
+        for count in (1, 10):
+            self.stock_locations(count)
+            with self.subTest(locations=Location.objects.count()):
+                response = self.assertQueryBudget(
+                    'get', f'/warehouse/warehouse-storage/by-location/?category={self.category.pk}&in_stock=true'
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data['count'], Location.objects.count())
+                self.assertEqual(len(response.data['results'][0]['items']), 2)
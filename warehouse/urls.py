@@ -9,5 +9,6 @@ urlpatterns = [
 
     # path("warehouse-storage/", WarehouseStorageView.as_view()),
     path("warehouse-storage/", WarehouseStorageGroupedView.as_view()),
+    path("warehouse-storage/by-location/", WarehouseStorageByLocationView.as_view(), name='warehouse-storage-by-location'),
 
 ]
@@ -5,8 +5,12 @@ from rest_framework.permissions import IsAuthenticated
 from .models import *
 from .serializers import *
 from django.shortcuts import get_object_or_404
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.pagination import PageNumberPagination
 from api.permission import *
 from inventory.serializers import *
+from .services import WarehouseStorageService
 
 
 class WarehouseListView(APIView):
@@ -69,9 +73,10 @@ class WarehouseStorageView(APIView):
 
 class WarehouseStorageGroupedView(APIView):
     permission_classes = [IsAuthenticated]
+    query_budget = 2
 
     def get(self, request):
-        inventory_qs = Inventory.objects.filter(deleted=False).select_related('item', 'location')
+        inventory_qs = Inventory.objects.filter(deleted=False).select_related('item', 'location__warehouse')
 
         warehouse_map = {}
         for inv in inventory_qs:
@@ -95,3 +100,32 @@ class WarehouseStorageGroupedView(APIView):
             })
 
         return Response(list(warehouse_map.values()))
+
+
+class WarehouseStorageByLocationView(APIView):
+    """
+    Stock grouped by location, grouped and joined in SQL. Filters: ?warehouse=, ?location=,
+    ?category= (item category) and ?in_stock=true. Paginated by location, or streamed as
+    NDJSON, one location per line, with ?output=ndjson.
+    """
+    permission_classes = [IsAuthenticated]
+    pagination_class = PageNumberPagination
+    query_budget = 4
+
+    def get(self, request):
+        service = WarehouseStorageService(
+            warehouse=request.query_params.get('warehouse'),
+            location=request.query_params.get('location'),
+            category=request.query_params.get('category'),
+            in_stock=request.query_params.get('in_stock') == 'true',
+        )
+
+        if request.query_params.get('output') == 'ndjson':
+            encoder = DjangoJSONEncoder(separators=(',', ':'))
+            lines = (encoder.encode(group) + '\n' for group in service.stream())
+            return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+
+        paginator = self.pagination_class()
+        paginated_locations = paginator.paginate_queryset(service.locations(), request)
+        return paginator.get_paginated_response(list(service.groups(paginated_locations)))
+